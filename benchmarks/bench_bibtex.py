@@ -0,0 +1,110 @@
+"""对比收集摘要后生成bibtex的耗时：每条都经过 bibtexparser 解析再写出（之前的做法），
+与直接在dblp格式的bibtex中加入摘要字段（bib_writer.format_entry）。
+
+使用合成的dblp条目，不需要网络。两种方式的输出必须逐字节相同。
+
+    python -m benchmarks.bench_bibtex [--entries 10000] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+
+import bibtexparser.entrypoint
+import bibtexparser.model
+
+from src.bib_writer import escape_abstract, format_entry
+from src.dblp_offline import make_bibtex
+
+abstract_word_list = [
+    "adversarial",
+    "robustness",
+    'the "secure" channel',
+    "50% faster",
+    "O(n^2)",
+    "C:\\path\\to",
+    "Zürich",
+    "{braces}",
+    "tab\there",
+    "line\nbreak",
+    "it's",
+    "&",
+    "$\\epsilon$",
+    "\u2013",
+]
+
+
+def make_entry_list(count: int) -> list[tuple[str, str | None]]:
+    rng = random.Random(0)
+    entry_list = list()
+    for i in range(count):
+        record = {
+            "type": "inproceedings" if i % 2 else "article",
+            "key": f"conf/x/Paper{i}",
+            "author": [f"Author {j} Müller" for j in range(rng.randint(1, 8))],
+            "title": f"Paper {i}: A {{DNN}} Study of TLS & QUIC on IoT.",
+            "journal": "IEEE Trans. Inf. Forensics Secur.",
+            "booktitle": "SP",
+            "volume": "19",
+            "pages": f"{i}-{i + 12}",
+            "year": "2024",
+            "ee": [f"https://doi.org/10.1109/X.{i}"],
+        }
+        proceedings = {
+            "title": "IEEE Symposium on Security and Privacy, SP 2024",
+            "publisher": "IEEE",
+        }
+        bibtex_str = make_bibtex(record, proceedings if i % 2 else None)
+        abstract = None
+        if i % 10:
+            abstract = " ".join(rng.choices(abstract_word_list, k=rng.randint(50, 250)))
+        entry_list.append((bibtex_str, abstract))
+    return entry_list
+
+
+def baseline_format(bibtex_str: str, abstract: str | None) -> tuple[str, str]:
+    library = bibtexparser.entrypoint.parse_string(bibtex_str)
+    if abstract is not None:
+        abstract_field = bibtexparser.model.Field("abstract", escape_abstract(abstract))
+        library.entries[0].set_field(abstract_field)
+    return library.entries[0].key, bibtexparser.entrypoint.write_string(library)
+
+
+def measure(func, entry_list: list, repeat: int) -> tuple[float, list]:
+    result = [func(*entry) for entry in entry_list]
+    start = time.process_time()
+    for _ in range(repeat):
+        for entry in entry_list:
+            func(*entry)
+    return (time.process_time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bibtex assembly.")
+    parser.add_argument("--entries", type=int, default=10000, help="一卷中的论文数量")
+    parser.add_argument("--repeat", type=int, default=3, help="每种情况重复次数")
+    args = parser.parse_args()
+
+    entry_list = make_entry_list(args.entries)
+    size = sum(
+        len(bibtex_str) + len(abstract or "") for bibtex_str, abstract in entry_list
+    )
+    base_time, base_result = measure(baseline_format, entry_list, args.repeat)
+    fast_time, fast_result = measure(format_entry, entry_list, args.repeat)
+    assert fast_result == base_result, "format_entry output differs from bibtexparser"
+
+    print(
+        f"{'method':<28} {'entries':>8} {'size':>9} {'CPU s/volume':>13} {'speedup':>8}"
+    )
+    print(
+        f"{'before (parse_string)':<28} {args.entries:>8} {size / 1024:>7.0f}KB "
+        f"{base_time:>13.3f} {1:>7.2f}x"
+    )
+    print(
+        f"{'after (format_entry)':<28} {args.entries:>8} {size / 1024:>7.0f}KB "
+        f"{fast_time:>13.3f} {base_time / fast_time:>7.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
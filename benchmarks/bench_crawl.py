@@ -0,0 +1,506 @@
+"""端到端的爬取基准测试：在本地启动模拟 dblp、doi.org 和出版社网站的HTTP服务器，
+以请求间隔为0运行 main.main，统计每秒完成的论文数、各阶段请求的 p50/p95 响应时间和内存峰值。
+
+模拟服务器在独立的进程中运行，可以设置响应延迟、5xx错误率和429比例，不访问真实网站。
+出版社页面支持 springer、usenix、ndss（直接请求）和 iospress（需要浏览器，见 settings.py 中的 chrome_path）。
+
+    python -m benchmarks.bench_crawl [--papers 300] [--publisher springer] [--latency 0.02]
+        [--page-latency 0.1] [--error-rate 0] [--throttle-rate 0] [--repeat 1]
+        [--output result.json] [--baseline result.json --tolerance 0.2] [main.py 的其他参数]
+
+未识别的参数原样传给 main.py，e.g. --parse-workers 2 --dblp-workers 4 --adaptive。
+设置 --baseline 时与之前 --output 保存的结果比较，吞吐量下降或 p95/内存峰值增加超过 --tolerance 时以状态码1退出，
+可用于检查性能回退。
+"""
+
+import argparse
+import collections
+import http.server
+import json
+import logging
+import multiprocessing
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+# 仅 Unix 提供，Windows 上不统计内存峰值
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import src.dblp as dblp
+import src.http_client as http_client
+import src.main as crawler
+from src.dblp_offline import make_bibtex
+
+conf_name = "bench"
+conf_year = "2024"
+doi_prefix = "10.5555"
+# 请求数少于此值的阶段不参与 --baseline 的 p95 比较
+min_gate_requests = 20
+
+# 出版社 -> 论文页面中包含摘要的HTML，与各 entry_* 模块的选择器对应
+abstract_template_dict = {
+    "springer": "<section data-title='Abstract'><div class='c-article-section'>"
+    "<div class='c-article-section__content'><p>{abstract}</p></div></div></section>",
+    "usenix": "<div class='content'><div class='field'>Authors</div>"
+    "<div class='field field-name-field-paper-description field-type-text-long field-label-above'>"
+    "<div class='field-items field-items'><div class='field-item odd'><p>{abstract}</p></div></div>"
+    "</div></div>",
+    "ndss": "<div class='entry-content'><div class='paper-data'><p><strong>Authors</strong></p>"
+    "<p><p>{abstract}</p></p></div></div>",
+    "iospress": "<section id='abstract'><div role='paragraph'>{abstract}</div></section>",
+}
+
+
+def make_paper_bibtex(i: int, doi_url: str) -> str:
+    record = {
+        "type": "inproceedings",
+        "key": f"conf/{conf_name}/Paper{i}",
+        "author": [f"Author {i} {j}" for j in range(1, 5)],
+        "title": f"Benchmark Paper {i}: Measuring {{TLS}} Handshakes at Scale.",
+        "pages": f"{i * 10}-{i * 10 + 9}",
+        "year": conf_year,
+        "ee": [doi_url],
+    }
+    proceedings = {
+        "title": f"Benchmark Symposium, BENCH {conf_year}",
+        "publisher": "Benchmark Press",
+    }
+    return make_bibtex(record, proceedings)
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """按服务器的角色（dblp、doi、publisher）返回模拟页面，并按设置注入延迟和错误"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: str = "", headers: dict | None = None):
+        data = body.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server = self.server
+        config = server.config
+        latency = (
+            config["page_latency"] if server.role == "publisher" else config["latency"]
+        )
+        time.sleep(latency * server.rng.uniform(0.5, 1.5))
+
+        value = server.rng.random()
+        retry_after = {"Retry-After": str(config["retry_after"])}
+        if value < config["error_rate"]:
+            self.send_body(
+                503 if value < config["error_rate"] / 2 else 500, "", retry_after
+            )
+            return
+        if value < config["error_rate"] + config["throttle_rate"]:
+            self.send_body(429, "", retry_after)
+            return
+
+        path = urlparse(self.path).path
+        if server.role == "dblp":
+            self.handle_dblp(path)
+        elif server.role == "doi":
+            paper_match = re.fullmatch(rf"/{doi_prefix}/bench\.(\d+)", path)
+            if paper_match is None:
+                self.send_body(404)
+                return
+            location = f"{server.base_url_dict['publisher']}/{config['publisher']}/{paper_match.group(1)}"
+            self.send_body(302, "", {"Location": location})
+        else:
+            paper_match = re.fullmatch(rf"/{config['publisher']}/(\d+)", path)
+            if paper_match is None:
+                self.send_body(404)
+                return
+            self.send_body(200, server.make_page(int(paper_match.group(1))))
+
+    def handle_dblp(self, path: str):
+        server = self.server
+        if path == f"/db/conf/{conf_name}/{conf_name}{conf_year}.html":
+            self.send_body(200, server.toc_page)
+        elif path == "/search/publ/api":
+            query = parse_qs(urlparse(self.path).query)
+            first = int(query.get("f", ["0"])[0])
+            count = int(query.get("h", ["1000"])[0])
+            paper_list = range(first, min(first + count, server.config["papers"]))
+            # 批量导出中缺少一部分论文，这些论文逐篇请求bibtex页面
+            self.send_body(
+                200,
+                "\n".join(
+                    server.bibtex_list[i]
+                    for i in paper_list
+                    if i not in server.bulk_missing_set
+                ),
+            )
+        else:
+            paper_match = re.fullmatch(rf"/rec/conf/{conf_name}/Paper(\d+)\.html", path)
+            if (
+                paper_match is None
+                or int(paper_match.group(1)) >= server.config["papers"]
+            ):
+                self.send_body(404)
+                return
+            bibtex = server.bibtex_list[int(paper_match.group(1))]
+            self.send_body(
+                200,
+                f'<html><body><div class="section" id="bibtex-section">'
+                f'<pre class="verbatim select-on-click">{bibtex}</pre></div></body></html>',
+            )
+
+
+class StandInServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, role: str, config: dict):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.role = role
+        self.config = config
+        self.rng = random.Random(f"{config['seed']}-{role}")
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def prepare(self, base_url_dict: dict[str, str]):
+        """所有服务器的端口确定后生成页面"""
+        self.base_url_dict = base_url_dict
+        config = self.config
+        papers = config["papers"]
+        doi_url_list = [
+            f"{base_url_dict['doi']}/{doi_prefix}/bench.{i}" for i in range(papers)
+        ]
+        self.bibtex_list = [
+            make_paper_bibtex(i, doi_url_list[i]) for i in range(papers)
+        ]
+        self.bulk_missing_set = set(
+            random.Random(config["seed"]).sample(
+                range(papers), int(papers * config["bulk_miss_rate"])
+            )
+        )
+        self.toc_page = (
+            "<html><body><ul class='publ-list'>"
+            + "".join(
+                f'<li class="entry inproceedings" id="conf/{conf_name}/Paper{i}" '
+                f'itemscope itemtype="http://schema.org/ScholarlyArticle">'
+                f'<nav class="publ"><ul><li class="drop-down"><div class="body"><ul><li>'
+                f'<a rel="nofollow" href="{base_url_dict["dblp"]}/rec/conf/{conf_name}/Paper{i}.html?view=bibtex">bibtex</a>'
+                f"</li></ul></div></li></ul></nav>"
+                f'<cite class="data tts-content"><span class="title" itemprop="name">'
+                f"Benchmark Paper {i}: Measuring TLS Handshakes at Scale.</span></cite>"
+                f'<nav><ul><li class="ee"><a href="{doi_url_list[i]}">doi</a></li></ul></nav></li>'
+                for i in range(papers)
+            )
+            + "</ul></body></html>"
+        )
+        # 出版社页面中与摘要无关的部分（导航、脚本、参考文献等）
+        filler_size = config["page_kb"] * 1024
+        self.page_head = f"<html><head><script>{'var x = 1;' * (filler_size // 20)}</script></head><body>"
+        self.page_tail = f"<ol class='refs'>{'<li>reference</li>' * (filler_size // 34)}</ol></body></html>"
+
+    def make_page(self, i: int) -> str:
+        abstract = " ".join(f"word{(i + j) % 97}" for j in range(200))
+        template = abstract_template_dict[self.config["publisher"]]
+        return self.page_head + template.format(abstract=abstract) + self.page_tail
+
+
+def serve(config: dict, url_queue, stop_event):
+    """在子进程中运行所有模拟服务器，直到 stop_event 被设置"""
+    server_dict = {
+        role: StandInServer(role, config) for role in ("dblp", "doi", "publisher")
+    }
+    base_url_dict = {role: server.base_url for role, server in server_dict.items()}
+    for server in server_dict.values():
+        server.prepare(base_url_dict)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    url_queue.put(base_url_dict)
+    stop_event.wait()
+    for server in server_dict.values():
+        server.shutdown()
+
+
+class RequestRecorder:
+    """通过 requests 的 response hook 记录每个请求的阶段、响应时间（到收到响应头为止）和状态码"""
+
+    def __init__(self, base_url_dict: dict[str, str]):
+        self.netloc_dict = {
+            urlparse(url).netloc: role for role, url in base_url_dict.items()
+        }
+        self.latency_dict: dict[str, list[float]] = collections.defaultdict(list)
+        self.status_dict: dict[str, collections.Counter] = collections.defaultdict(
+            collections.Counter
+        )
+        self.lock = threading.Lock()
+
+    def get_stage(self, url: str) -> str:
+        parsed_url = urlparse(url)
+        role = self.netloc_dict.get(parsed_url.netloc, "other")
+        if role == "dblp":
+            if parsed_url.path.startswith("/db/"):
+                return "dblp toc"
+            if parsed_url.path.startswith("/search/"):
+                return "dblp bulk bibtex"
+            return "dblp bibtex page"
+        if role == "doi":
+            return "doi redirect"
+        return f"{role} page"
+
+    def record(self, response, *args, **kwargs):
+        stage = self.get_stage(response.url)
+        with self.lock:
+            self.latency_dict[stage].append(response.elapsed.total_seconds())
+            self.status_dict[stage][response.status_code] += 1
+
+    def install(self):
+        """让 main.py 创建的会话（包括 --http2 的会话）带上 hook"""
+        create_session = http_client.create_requests_session
+        create_http2_session = http_client.create_http2_session
+
+        def create_recorded_session(*args):
+            session = create_session(*args)
+            session.hooks["response"].append(self.record)
+            return session
+
+        def create_recorded_http2_session():
+            session = create_http2_session()
+            session.hooks["response"].append(self.record)
+            return session
+
+        http_client.create_requests_session = create_recorded_session
+        http_client.create_http2_session = create_recorded_http2_session
+
+
+def percentile(value_list: list[float], q: float) -> float:
+    """最近秩法计算百分位数"""
+    sorted_list = sorted(value_list)
+    return sorted_list[max(0, int(round(q / 100 * len(sorted_list))) - 1)]
+
+
+def get_peak_rss() -> tuple[float | None, float | None]:
+    """本进程和已结束的子进程（解析进程）中最大的内存峰值（MB）"""
+    if resource is None:
+        return None, None
+    # Linux 上单位是KB，macOS 上是字节
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit,
+    )
+
+
+def run_crawler(base_url_dict: dict[str, str], config: dict, crawler_args: list[str]):
+    """运行一次 main.main，返回 (耗时, 论文数, 有摘要的论文数)"""
+    dblp.dblp_url = f"{base_url_dict['dblp']}/db/"
+    dblp.dblp_api_url = f"{base_url_dict['dblp']}/search/publ/api"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bib_path = os.path.join(tmp_dir, f"{conf_name}{conf_year}.bib")
+        argv = ["-n", conf_name, "-y", conf_year, "-p", config["publisher"]]
+        argv += ["-d", "0", "-t", "0", "-s", bib_path]
+        argv += ["--no-cache", "--no-abstract-store"] + crawler_args
+        start_time = time.perf_counter()
+        try:
+            crawler.main(argv)
+        except SystemExit as e:
+            # crawl_journal 等在完成后调用 exit(0)
+            if e.code not in (None, 0):
+                raise
+        elapsed = time.perf_counter() - start_time
+        text = ""
+        if os.path.exists(bib_path):
+            with open(bib_path, encoding="utf-8") as f:
+                text = f.read()
+    return (
+        elapsed,
+        text.count("\n@") + text.startswith("@"),
+        text.count("\tabstract = "),
+    )
+
+
+def compare_baseline(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """返回超过容差的性能回退"""
+    regression_list = list()
+    if result["papers_per_sec"] < baseline["papers_per_sec"] * (1 - tolerance):
+        regression_list.append(
+            f"papers/sec {result['papers_per_sec']:.2f} < baseline {baseline['papers_per_sec']:.2f}"
+        )
+    for stage, stats in result["stages"].items():
+        base_stats = baseline["stages"].get(stage)
+        # 目录页等只有几个请求的阶段，p95 受随机延迟影响太大
+        if stats["requests"] < min_gate_requests:
+            continue
+        if base_stats is not None and stats["p95"] > base_stats["p95"] * (
+            1 + tolerance
+        ):
+            regression_list.append(
+                f"{stage} p95 {stats['p95'] * 1000:.1f}ms > baseline {base_stats['p95'] * 1000:.1f}ms"
+            )
+    for key in ("peak_rss_mb", "peak_child_rss_mb"):
+        if (
+            result[key]
+            and baseline.get(key)
+            and result[key] > baseline[key] * (1 + tolerance)
+        ):
+            regression_list.append(
+                f"{key} {result[key]:.0f} > baseline {baseline[key]:.0f}"
+            )
+    return regression_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end crawl benchmark.")
+    parser.add_argument("--papers", type=int, default=300, help="模拟会议的论文数量")
+    parser.add_argument(
+        "--publisher",
+        choices=list(abstract_template_dict),
+        default="springer",
+        help="模拟的出版社页面",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="dblp 和 doi.org 的平均响应延迟（秒）",
+    )
+    parser.add_argument(
+        "--page-latency", type=float, default=0.1, help="出版社页面的平均响应延迟（秒）"
+    )
+    parser.add_argument(
+        "--page-kb", type=int, default=100, help="出版社页面的大小（KB）"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="返回500/503的请求比例"
+    )
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0, help="返回429的请求比例"
+    )
+    parser.add_argument(
+        "--retry-after", type=int, default=0, help="错误响应中 Retry-After 的秒数"
+    )
+    parser.add_argument(
+        "--bulk-miss-rate",
+        type=float,
+        default=0.1,
+        help="dblp批量导出中缺少、需要逐篇请求bibtex的论文比例",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="运行次数，吞吐量取中位数"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", default=False, help="输出爬虫的 DEBUG 日志"
+    )
+    parser.add_argument("--output", type=str, default=None, help="将结果保存为JSON文件")
+    parser.add_argument(
+        "--baseline", type=str, default=None, help="与之前保存的结果比较"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="允许的性能回退比例"
+    )
+    args, crawler_args = parser.parse_known_args()
+
+    # 传给模拟服务器的设置，也用于检查 --baseline 的结果是否可比
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("repeat", "verbose", "output", "baseline", "tolerance")
+    }
+    if not args.verbose:
+        logging.getLogger("src").setLevel(logging.WARNING)
+        logging.getLogger("__main__").setLevel(logging.WARNING)
+
+    url_queue = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+    server_process = multiprocessing.Process(
+        target=serve, args=(config, url_queue, stop_event), daemon=True
+    )
+    server_process.start()
+    try:
+        base_url_dict = url_queue.get(timeout=60)
+        recorder = RequestRecorder(base_url_dict)
+        recorder.install()
+
+        run_list = list()
+        for _ in range(args.repeat):
+            elapsed, papers, with_abstract = run_crawler(
+                base_url_dict, config, crawler_args
+            )
+            run_list.append(
+                {"seconds": elapsed, "papers": papers, "with_abstract": with_abstract}
+            )
+        peak_rss, peak_child_rss = get_peak_rss()
+    finally:
+        stop_event.set()
+        server_process.join(10)
+
+    result = {
+        "config": config,
+        "crawler_args": crawler_args,
+        "runs": run_list,
+        "papers_per_sec": statistics.median(
+            run["papers"] / run["seconds"] for run in run_list
+        ),
+        "stages": {
+            stage: {
+                "requests": len(latency_list),
+                "p50": percentile(latency_list, 50),
+                "p95": percentile(latency_list, 95),
+                "status": {
+                    str(code): count
+                    for code, count in sorted(recorder.status_dict[stage].items())
+                },
+            }
+            for stage, latency_list in recorder.latency_dict.items()
+        },
+        "peak_rss_mb": peak_rss,
+        "peak_child_rss_mb": peak_child_rss,
+    }
+
+    for i, run in enumerate(run_list):
+        print(
+            f"run {i + 1}: {run['papers']} papers ({run['with_abstract']} with abstract) "
+            f"in {run['seconds']:.2f}s, {run['papers'] / run['seconds']:.2f} papers/sec"
+        )
+    print(f"\n{'stage':<20} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9}  status")
+    for stage, stats in result["stages"].items():
+        status_text = " ".join(
+            f"{code}:{count}" for code, count in stats["status"].items()
+        )
+        print(
+            f"{stage:<20} {stats['requests']:>9} {stats['p50'] * 1000:>9.1f} "
+            f"{stats['p95'] * 1000:>9.1f}  {status_text}"
+        )
+    print(f"\npapers/sec (median): {result['papers_per_sec']:.2f}")
+    if peak_rss is not None:
+        print(f"peak RSS: {peak_rss:.0f} MB, child processes: {peak_child_rss:.0f} MB")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline["config"], baseline["crawler_args"]) != (config, crawler_args):
+            print("Baseline was recorded with different settings, cannot compare.")
+            sys.exit(2)
+        regression_list = compare_baseline(result, baseline, args.tolerance)
+        for regression in regression_list:
+            print(f"REGRESSION: {regression}")
+        if regression_list:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
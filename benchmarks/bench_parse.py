@@ -0,0 +1,154 @@
+"""HTML 解析的 CPU 时间基准测试
+
+比较原来的整页 BeautifulSoup(html.parser) 解析与 src.html_parse 在各解析器下的
+每页 CPU 时间。页面是按 dblp 目录页、dblp bibtex 页面和出版社摘要页面结构生成的合成页面，
+不需要网络。
+
+用法（在仓库根目录）::
+
+    python -m benchmarks.bench_parse [--entries 1000] [--repeat 3]
+"""
+
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+import src.html_parse as html_parse
+from src.dblp import bibtex_section_strainer, toc_entry_strainer
+
+entry_selector = (
+    'li.entry.inproceedings[itemscope][itemtype="http://schema.org/ScholarlyArticle"]'
+)
+bibtex_selector = 'div.section[id="bibtex-section"] > pre.verbatim.select-on-click'
+abstract_selector = "section[data-title='Abstract'] > div.c-article-section > div.c-article-section__content > p"
+
+
+def make_toc_page(n: int) -> str:
+    nav = "".join(
+        f'<li><a href="https://dblp.org/db/conf/x/x{y}.html">{y}</a></li>'
+        for y in range(1990, 2025)
+    )
+    entry_list = list()
+    for i in range(n):
+        entry_list.append(
+            f'<li class="entry inproceedings toc" id="conf/x/P{i}" itemscope itemtype="http://schema.org/ScholarlyArticle">'
+            f'<link itemprop="additionalType" href="https://dblp.org/rdf/schema#Publication"/>'
+            f'<div class="box"><img alt="" title="Conference and Workshop Papers" src="https://dblp.org/img/n.png"></div>'
+            f'<nav class="publ"><ul><li><div class="head"><a href="https://doi.org/10.1/{i}">'
+            f'<img alt="" src="https://dblp.org/img/paper.dark.hollow.16x16.png"></a></div>'
+            f'<div class="body"><p><b>view</b></p><ul><li class="ee"><a href="https://doi.org/10.1/{i}">electronic edition via DOI</a></li></ul></div></li>'
+            f'<li class="drop-down"><div class="head"><img alt="" src="https://dblp.org/img/download.dark.hollow.16x16.png"></div>'
+            f'<div class="body"><p><b>export record</b></p><ul><li><a rel="nofollow" href="https://dblp.org/rec/conf/x/P{i}.html?view=bibtex">BibTeX</a></li>'
+            f'<li><a rel="nofollow" href="https://dblp.org/rec/conf/x/P{i}.ris">RIS</a></li></ul></div></li></ul></nav>'
+            f'<cite class="data tts-content" itemprop="headline">'
+            + "".join(
+                f'<span itemprop="author" itemscope itemtype="http://schema.org/Person"><a href="https://dblp.org/pid/{i}/{k}.html" itemprop="url">'
+                f'<span itemprop="name" title="Author {k}">Author {k}</span></a></span>, '
+                for k in range(5)
+            )
+            + f'<span class="title" itemprop="name">Paper {i} &amp; Title.</span> <a href="https://dblp.org/db/conf/x/x2023.html#P{i}">'
+            f'<span itemprop="isPartOf"><span itemprop="name">X</span></span></a> <span itemprop="pagination">{i}-{i + 10}</span></cite></li>'
+        )
+    return (
+        f"<!DOCTYPE html><html><head><title>dblp: X 2023</title>"
+        f'<script>var x = "{"a" * 5000}";</script></head><body>'
+        f'<div id="banner"><ul>{nav}</ul></div><header class="headline"><h1>X 2023</h1></header>'
+        f'<ul class="publ-list">{"".join(entry_list)}</ul>'
+        f'<div id="footer">{"<p>footer text</p>" * 200}</div></body></html>'
+    )
+
+
+def make_bibtex_page() -> str:
+    bibtex = "@inproceedings{DBLP:conf/x/P0,\n  author = {A and B},\n  title = {Paper 0 \\&amp; Title},\n  year = {2023}\n}\n"
+    return (
+        f"<html><head><script>{'var a = 1;' * 2000}</script></head><body>"
+        f'<div id="menu">{"<a href=#>link</a>" * 500}</div>'
+        f'<div class="section" id="bibtex-section"><pre class="verbatim select-on-click">{bibtex}</pre></div>'
+        f'<div id="footer">{"<p>footer</p>" * 500}</div></body></html>'
+    )
+
+
+def make_abstract_page() -> str:
+    return (
+        f"<html><head>{'<meta name=x content=y>' * 200}<script>{'var a = 1;' * 5000}</script></head><body>"
+        f'<div class="nav">{"<a href=#>link</a>" * 1000}</div>'
+        f"<section data-title='Abstract'><div class='c-article-section'><div class='c-article-section__content'>"
+        f"<p>{'abstract words ' * 100}</p></div></div></section>"
+        f'<section class="refs">{"<li><p>reference</p></li>" * 2000}</section></body></html>'
+    )
+
+
+def baseline_toc(text: str):
+    soup = BeautifulSoup(text, "html.parser")
+    return [e.get("id") for e in soup.select(entry_selector)]
+
+
+def scoped_toc(text: str):
+    soup = html_parse.parse_html(text, toc_entry_strainer)
+    return [e.get("id") for e in soup.select(entry_selector)]
+
+
+def baseline_bibtex(text: str):
+    return BeautifulSoup(text, "html.parser").select_one(bibtex_selector).get_text()
+
+
+def scoped_bibtex(text: str):
+    soup = html_parse.parse_html(text, bibtex_section_strainer)
+    return soup.select_one(bibtex_selector).get_text()
+
+
+def baseline_abstract(text: str):
+    return [
+        t.get_text()
+        for t in BeautifulSoup(text, "html.parser").select(abstract_selector)
+    ]
+
+
+def scoped_abstract(text: str):
+    return html_parse.select_text(text, abstract_selector)
+
+
+def measure(func, text: str, repeat: int) -> tuple[float, object]:
+    result = func(text)
+    start = time.process_time()
+    for _ in range(repeat):
+        func(text)
+    return (time.process_time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parsing.")
+    parser.add_argument("--entries", type=int, default=1000, help="目录页中的论文数量")
+    parser.add_argument("--repeat", type=int, default=3, help="每种情况重复次数")
+    args = parser.parse_args()
+
+    page_list = [
+        ("dblp TOC", make_toc_page(args.entries), baseline_toc, scoped_toc),
+        ("dblp bibtex", make_bibtex_page(), baseline_bibtex, scoped_bibtex),
+        ("abstract page", make_abstract_page(), baseline_abstract, scoped_abstract),
+    ]
+    backend_list = ["html.parser", "lxml", "selectolax"]
+
+    print(
+        f"{'page':<14} {'size':>9} {'backend':<22} {'CPU ms/page':>12} {'speedup':>8}"
+    )
+    for page_name, text, baseline_func, scoped_func in page_list:
+        base_time, base_result = measure(baseline_func, text, args.repeat)
+        print(
+            f"{page_name:<14} {len(text) / 1024:>7.0f}KB {'before (full html.parser)':<22} "
+            f"{base_time * 1000:>12.2f} {1:>7.2f}x"
+        )
+        for backend in backend_list:
+            html_parse.configure_parser(backend)
+            scoped_time, scoped_result = measure(scoped_func, text, args.repeat)
+            assert scoped_result == base_result, f"{page_name} differs with {backend}"
+            print(
+                f"{'':<14} {'':>9} {'after (' + backend + ')':<22} "
+                f"{scoped_time * 1000:>12.2f} {base_time / scoped_time:>7.2f}x"
+            )
+    html_parse.configure_parser()
+
+
+if __name__ == "__main__":
+    main()
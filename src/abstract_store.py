@@ -0,0 +1,117 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from src.doi_lookup import get_paper_key
+from src.settings import abstract_store_path
+
+logger = logging.getLogger(__name__)
+
+
+class AbstractStore:
+    """以DOI为键的持久化摘要库，在所有会议/期刊和多次运行之间共享
+
+    URL中没有DOI的论文（e.g. USENIX、NDSS）以规范化的URL为键（见 doi_lookup.get_paper_key），保存在同一列。
+
+    每条记录包含摘要、来源（出版社或 openalex/crossref）、获取时间和提取代码的版本。
+    提取代码的版本是各出版社模块（以及 doi_lookup）中的 extractor_version，修改提取方式时加1，
+    版本较旧的记录视为不存在，摘要会重新获取。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite数据库文件路径
+        """
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS abstracts (
+                doi TEXT PRIMARY KEY,
+                abstract TEXT NOT NULL,
+                source TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                extractor_version INTEGER NOT NULL
+            )""")
+        self.conn.commit()
+
+    def get(self, url: str, version_dict: dict[str, int]) -> str | None:
+        """查询论文的摘要
+
+        Args:
+            url (str): 论文URL或DOI
+            version_dict (dict[str, int]): 来源 -> 当前提取代码的版本
+
+        Returns:
+            str | None: 摘要。没有记录或记录的版本较旧时返回None
+        """
+        doi = get_paper_key(url)
+        if doi is None:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT abstract, source, extractor_version FROM abstracts WHERE doi = ?",
+                (doi,),
+            ).fetchone()
+        if row is None:
+            return None
+        abstract, source, extractor_version = row
+        if extractor_version < version_dict.get(source, 0):
+            return None
+        return abstract
+
+    def put(self, url: str, abstract: str, source: str, extractor_version: int):
+        """保存论文的摘要，url 既不是DOI也不是URL时忽略"""
+        doi = get_paper_key(url)
+        if doi is None:
+            return
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO abstracts VALUES (?, ?, ?, ?, ?)",
+                (doi, abstract, source, time.time(), extractor_version),
+            )
+            self.conn.commit()
+
+    def put_many(self, result_list: list[tuple[str, str, str, int]]):
+        """在一个事务中保存多篇论文的 (URL, 摘要, 来源, 提取代码的版本)"""
+        row_list = list()
+        for url, abstract, source, extractor_version in result_list:
+            doi = get_paper_key(url)
+            if doi is not None:
+                row_list.append((doi, abstract, source, time.time(), extractor_version))
+        if not row_list:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO abstracts VALUES (?, ?, ?, ?, ?)", row_list
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+_store: AbstractStore | None = None
+_store_enabled = abstract_store_path is not None
+_store_lock = threading.Lock()
+
+
+def configure_abstract_store(enabled: bool):
+    """启用或禁用摘要库。禁用时关闭已经打开的数据库。"""
+    global _store, _store_enabled
+    _store_enabled = enabled and abstract_store_path is not None
+    if not _store_enabled and _store is not None:
+        _store.close()
+        _store = None
+
+
+def get_abstract_store() -> AbstractStore | None:
+    """返回进程内共享的摘要库，首次调用时打开数据库。摘要库被禁用时返回None。"""
+    global _store
+    if not _store_enabled:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = AbstractStore(abstract_store_path)
+    return _store
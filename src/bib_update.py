@@ -0,0 +1,150 @@
+import logging
+import re
+
+from src.bib_writer import failed_comment_pattern
+from src.doi_lookup import normalize_doi
+from src.metadata_store import get_dblp_key
+
+logger = logging.getLogger(__name__)
+
+# 只用正则表达式扫描条目的开头和需要的字段，不完整解析bibtex，数万条的文件也能很快建立索引
+entry_key_pattern = re.compile(r"@\w+\s*\{\s*([^,\s]+)\s*,")
+doi_field_pattern = re.compile(r"^\s*doi\s*=\s*[{\"]([^}\"]*)[}\"]", re.M | re.I)
+url_field_pattern = re.compile(r"^\s*url\s*=\s*[{\"]([^}\"]*)[}\"]", re.M | re.I)
+# 空的 abstract 字段视为没有摘要
+abstract_field_pattern = re.compile(r"^\s*abstract\s*=\s*[{\"]\s*[^\s}\"]", re.M | re.I)
+# 条目的开头 "@类型{" 和花括号，用于在花括号外分开各条目
+entry_token_pattern = re.compile(r"(@\w+\s*\{)|[{}]")
+
+
+def get_block_key(block: str) -> str | None:
+    """条目的bibtex key，e.g. "DBLP:conf/sp/X23" """
+    key_match = entry_key_pattern.match(block)
+    return key_match.group(1) if key_match is not None else None
+
+
+def split_blocks(text: str) -> tuple[str, list[str]]:
+    """将bibtex文件分为第一个条目之前的内容（注释等）和各条目的原始文本
+
+    只在花括号之外的 "@类型{" 处开始新的条目，字段值中以 "@" 开头的行仍属于当前条目。
+    bibtex key 重复时写入的 "% WARNING Parsing failed..." 注释属于其后的条目，而不是前一个条目。
+    """
+    start_list = list()
+    depth = 0
+    for token_match in entry_token_pattern.finditer(text):
+        if token_match.group(1) is not None and depth == 0:
+            start = token_match.start()
+            line_start = text.rfind("\n", 0, max(start - 1, 0)) + 1
+            if failed_comment_pattern.fullmatch(text, line_start, start):
+                start = line_start
+            start_list.append(start)
+        if token_match.group() == "}":
+            depth = max(depth - 1, 0)
+        else:
+            depth += 1
+    if not start_list:
+        return text.strip(), []
+    block_list = [
+        text[start:end].strip() + "\n"
+        for start, end in zip(start_list, start_list[1:] + [len(text)])
+    ]
+    return text[: start_list[0]].strip(), block_list
+
+
+class BibIndex:
+    """已有bibtex文件的索引，用于 --update 只获取新增或缺少摘要的论文
+
+    按dblp key和DOI索引文件中的每个条目，保留条目的原始文本，合并时原样写回。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): 已有的bibtex文件路径
+        """
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+        # 第一个条目之前的注释等内容
+        self.preamble, chunk_list = split_blocks(text)
+
+        self.block_list: list[str] = list()
+        self.has_abstract_list: list[bool] = list()
+        self.key_dict: dict[str, int] = dict()
+        self.doi_dict: dict[str, int] = dict()
+        for chunk in chunk_list:
+            idx = len(self.block_list)
+            self.block_list.append(chunk)
+            self.has_abstract_list.append(
+                abstract_field_pattern.search(chunk) is not None
+            )
+            key = get_block_key(chunk)
+            if key is not None:
+                self.key_dict.setdefault(key.removeprefix("DBLP:"), idx)
+            doi_match = doi_field_pattern.search(chunk) or url_field_pattern.search(
+                chunk
+            )
+            doi = normalize_doi(doi_match.group(1)) if doi_match is not None else None
+            if doi is not None:
+                self.doi_dict.setdefault(doi, idx)
+
+        # 与目录页中的论文对应的条目位置
+        self.matched_set: set[int] = set()
+        # 目录页中的新论文、文件中缺少摘要的论文、原样写回的论文数量
+        self.new_count = 0
+        self.missing_count = 0
+        self.unchanged_count = 0
+        logger.debug(
+            f"Indexed {len(self.block_list)} entries of {path}, {sum(self.has_abstract_list)} with abstract."
+        )
+
+    def find(self, dblp_key: str | None, paper_url: str | None) -> int | None:
+        """依次按dblp key和DOI查找论文在文件中的位置"""
+        if dblp_key:
+            idx = self.key_dict.get(dblp_key.removeprefix("DBLP:"))
+            if idx is not None:
+                return idx
+        doi = normalize_doi(paper_url) if paper_url else None
+        if doi is not None:
+            return self.doi_dict.get(doi)
+        return None
+
+    def get_bibtex(self, dblp_key: str | None, paper_url: str | None) -> str | None:
+        """返回文件中已有的bibtex，不需要再向dblp请求"""
+        idx = self.find(dblp_key, paper_url)
+        return self.block_list[idx] if idx is not None else None
+
+    def match(self, entry_metadata: list) -> str | None:
+        """将目录页中的一篇论文与文件中的条目对应起来，每篇论文调用一次
+
+        Args:
+            entry_metadata (list): [论文标题, 论文URL, bibtex字符串]
+
+        Returns:
+            str | None: 已有摘要时返回条目的原始文本，原样写回即可；新论文或缺少摘要时返回None
+        """
+        idx = self.find(get_dblp_key(entry_metadata[2]), entry_metadata[1])
+        if idx is None:
+            self.new_count += 1
+            return None
+        self.matched_set.add(idx)
+        if not self.has_abstract_list[idx]:
+            self.missing_count += 1
+            return None
+        self.unchanged_count += 1
+        return self.block_list[idx]
+
+    def log_diff(self):
+        logger.info(
+            f"Update {self.path}: {self.new_count} new papers, {self.missing_count} papers without abstract, "
+            f"{self.unchanged_count} unchanged."
+        )
+
+    def unmatched_blocks(self) -> list[str]:
+        """文件中不属于目录页的条目（例如手动添加的条目），合并时保留在文件末尾"""
+        return [
+            block
+            for idx, block in enumerate(self.block_list)
+            if idx not in self.matched_set
+        ]
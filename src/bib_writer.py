@@ -0,0 +1,169 @@
+import logging
+import os
+import re
+
+import bibtexparser.entrypoint
+import bibtexparser.model
+from bibtexparser.writer import PARSING_FAILED_COMMENT
+
+logger = logging.getLogger(__name__)
+
+
+# dblp 导出的bibtex：条目头独占一行，每个字段以 "  字段名 = {" 开始，以 "}," 结束
+dblp_entry_pattern = re.compile(r"\s*@(\w+)\{([^,{}\s]+),\n(.*)\n\}\s*\Z", re.S)
+dblp_field_split_pattern = re.compile(r",\n(?=[ \t]*[\w-]+[ \t]*=[ \t]*\{)")
+dblp_field_pattern = re.compile(r"\s*([\w-]+)\s*=\s*(\{.*\})\s*\Z", re.S)
+# 与 bibtexparser 相同，不计算转义的大括号
+brace_pattern = re.compile(r"(?<!\\)[{}]")
+# format_failed_block 写在原始文本前的一行注释
+failed_comment_pattern = re.compile(
+    re.escape(PARSING_FAILED_COMMENT).replace(re.escape("{n}"), r"\d+") + r"[ \t]*\n"
+)
+
+
+def escape_abstract(abstract: str) -> str:
+    """摘要写入bibtex前的转义，与之前通过 bibtexparser 写入的结果相同"""
+    return repr(abstract)[1:-1]
+
+
+def is_enclosed(value: str) -> bool:
+    """value 是否由一对大括号包围，且中间的大括号都已配对"""
+    depth = 0
+    for match in brace_pattern.finditer(value):
+        depth += 1 if match.group(0) == "{" else -1
+        if depth == 0 and match.end() != len(value):
+            return False
+    return depth == 0 and value.endswith("}") and not value.endswith("\\}")
+
+
+def format_dblp_entry(bibtex_str: str, abstract: str | None) -> str | None:
+    """不经过 bibtexparser，直接在dblp格式的bibtex中加入摘要并输出
+
+    输出与 bibtexparser 解析后再写出的结果相同。只处理dblp导出的规整格式，
+    其他格式（引号包围的值、宏、重复的字段等）返回None，由 bibtexparser 处理。
+    """
+    entry_match = dblp_entry_pattern.match(bibtex_str)
+    if entry_match is None or "\n@" in bibtex_str:
+        return None
+    entry_type, key, body = entry_match.groups()
+    field_list = list()
+    key_set = set()
+    for field_str in dblp_field_split_pattern.split(body):
+        field_match = dblp_field_pattern.match(field_str)
+        if field_match is None:
+            return None
+        field_key, value = field_match.groups()
+        if field_key in key_set or not is_enclosed(value):
+            return None
+        key_set.add(field_key)
+        field_list.append([field_key, value])
+
+    if abstract is not None:
+        abstract_value = f"{{{escape_abstract(abstract)}}}"
+        if "abstract" in key_set:
+            for field in field_list:
+                if field[0] == "abstract":
+                    field[1] = abstract_value
+        else:
+            field_list.append(["abstract", abstract_value])
+
+    return (
+        f"@{entry_type.lower()}{{{key},\n"
+        + ",\n".join(f"\t{field_key} = {value}" for field_key, value in field_list)
+        + "\n}\n"
+    )
+
+
+def format_entry(
+    bibtex_str: str, abstract: str | None
+) -> tuple[str | None, str | None]:
+    """解析一篇论文的bibtex并加入摘要
+
+    dblp格式的bibtex直接加入摘要字段，其他格式使用 bibtexparser 解析。
+    只返回字符串，可以在解析进程中运行（--parse-workers）。
+
+    Args:
+        bibtex_str (str): 不含摘要的bibtex字符串
+        abstract (str | None): 摘要
+
+    Returns:
+        tuple[str | None, str | None]: (bibtex key, 写入文件的文本)，解析失败时为 (None, None)
+    """
+    text = format_dblp_entry(bibtex_str, abstract)
+    if text is not None:
+        return dblp_entry_pattern.match(bibtex_str).group(2), text
+
+    library = bibtexparser.entrypoint.parse_string(bibtex_str)
+    if len(library.entries) != 1:
+        return None, None
+    if abstract is not None:
+        abstract_field = bibtexparser.model.Field("abstract", escape_abstract(abstract))
+        library.entries[0].set_field(abstract_field)
+    return library.entries[0].key, bibtexparser.entrypoint.write_string(library)
+
+
+def format_failed_block(raw: str) -> str:
+    """与 bibtexparser 写出 Library.add 时key重复的条目（DuplicateBlockKeyBlock）相同"""
+    raw = raw.strip()
+    return f"{PARSING_FAILED_COMMENT.format(n=len(raw.splitlines()))}\n{raw}\n"
+
+
+class StreamingBibWriter:
+    """逐条追加写入bibtex文件
+
+    每收集完一篇论文就将其写入文件，不在内存中保存整个 Library。每写入 fsync_interval 条
+    调用一次 fsync，运行过程中可以用 tail 等工具查看已经写入的条目。
+    输出格式与 bibtexparser.entrypoint.write_file 一次性写入整个 Library 的结果相同：
+    bibtex key 重复的条目与 Library.add 一样，以 "% WARNING Parsing failed..." 开头的块写入原始文本。
+    """
+
+    # bibtexparser 默认的块分隔符
+    block_separator = "\n\n"
+
+    def __init__(self, path: str, fsync_interval: int):
+        """
+        Args:
+            path (str): bibtex文件路径，已有的文件会被覆盖
+            fsync_interval (int): 每写入多少条调用一次 fsync，小于等于0时只在关闭文件时调用
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.file = open(path, "w", encoding="utf-8")
+        self.entry_count = 0
+        self.block_count = 0
+        self.key_set = set()
+
+    def write_raw(self, block: str, key: str | None = None, raw: str | None = None):
+        """原样写入一段bibtex文本
+
+        Args:
+            block (str): 格式化后的条目，或 --update 时已有的条目
+            key (str | None): 条目的bibtex key
+            raw (str | None): 条目加入摘要前的原始bibtex。key 重复时写入该文本，为None时写入 block
+        """
+        if key is not None:
+            if key in self.key_set:
+                logger.warning(
+                    f"Duplicate bibtex key {key}, written as a parsing failed block."
+                )
+                block = format_failed_block(raw if raw is not None else block)
+                key = None
+            else:
+                self.key_set.add(key)
+
+        if self.block_count > 0:
+            self.file.write(self.block_separator)
+        self.file.write(block.rstrip() + "\n")
+        self.block_count += 1
+        self.file.flush()
+
+        # 注释和解析失败的块不计数，只在条目数增加时检查是否需要 fsync
+        if key is not None:
+            self.entry_count += 1
+            if self.fsync_interval > 0 and self.entry_count % self.fsync_interval == 0:
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+import nodriver as nd
+
+from src.settings import chrome_path, cookie_path
+
+logger = logging.getLogger(__name__)
+
+# 整个进程共用一个事件循环和一个浏览器，多个卷/会议之间不再重复启动 Chrome
+_loop = None
+_browser: nd.Browser | None = None
+_browser_lock: asyncio.Lock | None = None
+# "host:port"，连接到已经运行的 Chrome（--remote-debugging-port），为None时由本程序启动
+_browser_endpoint: str | None = None
+
+
+def configure_browser(endpoint: str | None):
+    """设置要连接的 Chrome 调试地址，e.g. "127.0.0.1:9222"。为None时由本程序启动 Chrome。"""
+    global _browser_endpoint
+    _browser_endpoint = endpoint
+
+
+def get_loop():
+    """返回进程内共用的事件循环。浏览器连接与创建它的事件循环绑定，不能跨循环复用。"""
+    global _loop
+    if _loop is None:
+        _loop = nd.loop()
+    return _loop
+
+
+def run(coro):
+    """在共用的事件循环中运行协程"""
+    return get_loop().run_until_complete(coro)
+
+
+async def get_browser() -> nd.Browser:
+    """返回共用的浏览器，首次调用时启动 Chrome 或连接到已有的 Chrome"""
+    global _browser, _browser_lock
+    # 多个任务可能同时请求浏览器，只启动一次
+    if _browser_lock is None:
+        _browser_lock = asyncio.Lock()
+    async with _browser_lock:
+        if _browser is None:
+            _browser = await start_browser()
+    return _browser
+
+
+async def start_browser() -> nd.Browser:
+    if _browser_endpoint is not None:
+        host, port = _browser_endpoint.rsplit(":", 1)
+        logger.debug(f"Attach to Chrome at {host}:{port}.")
+        # nodriver does not launch a local browser when both host and port are set
+        browser_config = nd.Config(host=host, port=int(port))
+    else:
+        browser_config = nd.Config(
+            headless=False,
+            user_data_dir=cookie_path,
+            browser_executable_path=chrome_path,
+            browser_args=["--disable-gpu"],
+        )
+    return await nd.start(config=browser_config)
+
+
+async def close_browser():
+    """关闭本程序启动的浏览器；连接到的外部 Chrome 只断开连接，保持运行"""
+    global _browser
+    if _browser is None:
+        return
+    if _browser_endpoint is not None:
+        await _browser.connection.aclose()
+    else:
+        _browser.stop()
+    _browser = None
+
+
+def shutdown():
+    """进程结束前调用，关闭浏览器"""
+    if _browser is not None:
+        run(close_browser())
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointJournal:
+    """记录摘要收集进度的日志文件（JSON Lines）
+
+    每完成一篇论文就追加一行并写入磁盘，包含标题、URL、bibtex、摘要和状态。
+    程序中断后，可以从日志中恢复已经成功收集摘要的论文，跳过这些论文继续运行。
+    """
+
+    def __init__(self, path: str, resume: bool):
+        """
+        Args:
+            path (str): 日志文件路径
+            resume (bool): 是否从已有的日志恢复。为False时清空已有的日志。
+        """
+        self.path = path
+        self.done_dict = dict()
+        if resume:
+            self._load()
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self.file.tell() > 0:
+            # 保证新的记录从新的一行开始，不与中断时写了一半的行拼接
+            self.file.write("\n")
+
+    @staticmethod
+    def get_key(entry_metadata: list) -> str:
+        """[论文标题, URL, bibtex] -> 日志中的索引"""
+        return json.dumps(entry_metadata[:2], ensure_ascii=False)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.warning(
+                f"Checkpoint {self.path} does not exist, start from scratch."
+            )
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断时最后一行可能没有写完整
+                    logger.warning(f"Skip broken line in checkpoint {self.path}.")
+                    continue
+                if record["status"] == "ok":
+                    self.done_dict[self.get_key([record["title"], record["url"]])] = (
+                        record
+                    )
+        logger.info(f"Resume from checkpoint {self.path}: {len(self.done_dict)} done.")
+
+    def get_done(self, entry_metadata: list) -> dict | None:
+        """返回已经成功收集摘要的论文记录，未完成或失败时返回None"""
+        return self.done_dict.get(self.get_key(entry_metadata))
+
+    def record(self, entry_metadata: list, abstract: str | None):
+        """追加一篇论文的结果，并立即写入磁盘"""
+        self.record_many([(entry_metadata, abstract)])
+
+    def record_many(self, result_list: list[tuple[list, str | None]]):
+        """追加多篇论文的结果 (论文元数据, 摘要)，全部写入后只同步一次磁盘"""
+        if not result_list:
+            return
+        for entry_metadata, abstract in result_list:
+            record = {
+                "title": entry_metadata[0],
+                "url": entry_metadata[1],
+                "bibtex": entry_metadata[2],
+                "abstract": abstract,
+                "status": "ok" if abstract is not None else "failed",
+            }
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if abstract is not None:
+                self.done_dict[self.get_key(entry_metadata)] = record
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def remove(self):
+        """整个任务完成、结果写入bibtex文件后删除日志"""
+        self.close()
+        os.remove(self.path)
@@ -1,18 +1,29 @@
 import logging
-from time import sleep
+import re
+from concurrent.futures import ThreadPoolExecutor
 
 import bs4
 import requests
-from bs4 import BeautifulSoup
-from rich.progress import (BarColumn, MofNCompleteColumn, Progress,
-                           TaskProgressColumn, TextColumn, TimeElapsedColumn,
-                           TimeRemainingColumn)
-
-from src.request_wrap import make_request
-from src.settings import dblp_url
+from bs4 import SoupStrainer
+
+from src.html_parse import parse_html
+from src.http_cache import invalidate_cached
+from src.http_client import get_session
+from src.parse_pool import get_parse_pool, run_parse
+from src.progress_bar import advance_progress, start_progress, stop_progress
+from src.rate_limit import TokenBucket
+from src.request_wrap import get_host, make_request
+from src.settings import (bibtex_content_types, dblp_api_url,
+                          dblp_bulk_page_size, dblp_url,
+                          parse_toc_chunk_entries)
 
 logger = logging.getLogger(__name__)
 
+toc_entry_strainer = SoupStrainer("li", itemtype="http://schema.org/ScholarlyArticle")
+bibtex_section_strainer = SoupStrainer("div", id="bibtex-section")
+# 目录页中一篇论文条目的开始标签，用于拆分大型目录页
+toc_entry_start_pattern = re.compile(r'<li class="entry ')
+
 
 def get_conf_url(name: str, year: str) -> tuple[str, str]:
     """get URL of dblp.
@@ -78,17 +89,84 @@ def get_paper_title_and_url(entry: bs4.element.Tag) -> list:
     # 找到第一个a标签
     a_tag = entry.select_one("li.ee > a")
     if a_tag is not None:
-        paper_url = a_tag["href"]
-        # 只留下 doi.org 类型的 URL
-        # doi.ieeecomputersociety.org 等URL无法访问，需要排除
-        # e.g. "Space Odyssey: An Experimental Software Security Analysis of Satellites" in https://dblp.org/db/conf/sp/sp2023.html
-        if "doi.ieeecomputersociety.org" in paper_url:
-            logger.warning(f"Unsupported URL {paper_url} of paper {paper_title}.")
-            paper_url = ""
+        paper_url = check_paper_url(a_tag["href"], paper_title)
 
     return [paper_title, paper_url]
 
 
+def check_paper_url(paper_url: str, paper_title: str | None) -> str:
+    """排除无法访问的论文URL，返回空字符串"""
+    # 只留下 doi.org 类型的 URL
+    # doi.ieeecomputersociety.org 等URL无法访问，需要排除
+    # e.g. "Space Odyssey: An Experimental Software Security Analysis of Satellites" in https://dblp.org/db/conf/sp/sp2023.html
+    if "doi.ieeecomputersociety.org" in paper_url:
+        logger.warning(f"Unsupported URL {paper_url} of paper {paper_title}.")
+        return ""
+    return paper_url
+
+
+def get_paper_bibtex_url(entry: bs4.element.Tag) -> str | None:
+    """获取一篇论文的bibtex页面URL
+
+    Args:
+        entry (bs4.element.Tag): 一篇论文经bs4解析后的HTML代码片段
+
+    Returns:
+        str | None: bibtex页面URL
+    """
+    bibtex_url_tag = entry.select_one(
+        'li.drop-down > div.body > ul > li > a[rel="nofollow"]'
+    )
+    if bibtex_url_tag is None:
+        return None
+    return str(bibtex_url_tag["href"])
+
+
+def fetch_paper_bibtex(
+    bibtex_session: requests.Session,
+    bibtex_url: str,
+    req_itv: float = 0,
+    limiter: TokenBucket | None = None,
+) -> str | None:
+    """请求bibtex页面并提取bibtex字符串
+
+    Args:
+        bibtex_session (requests.Session): 复用会话，建立连接
+        bibtex_url (str): bibtex页面URL
+        req_itv (float): 实际发送请求前等待的时间（秒），命中缓存时不等待。
+        limiter (TokenBucket | None): 限速器，设置后代替 req_itv 控制请求速率
+
+    Returns:
+        str | None: bibtex字符串
+    """
+    bibtex_res = make_request(
+        bibtex_session, bibtex_url, req_itv=req_itv, limiter=limiter
+    )
+    if bibtex_res is None:
+        logger.error("Cannot obtain bibtex content: request failed")
+        return None
+
+    bibtex_str = run_parse(extract_bibtex, bibtex_res.text)
+    if bibtex_str is not None:
+        return bibtex_str
+    invalidate_cached(bibtex_url)
+    # TODO 错误处理
+    logger.error("Cannot obtain bibtex content.")
+    return None
+
+
+def extract_bibtex(html: str) -> str | None:
+    """从bibtex页面中提取bibtex字符串"""
+    # 只解析 bibtex 所在的 div
+    bibtex_soup = parse_html(html, bibtex_section_strainer)
+    bibtex_content_tag = bibtex_soup.select_one(
+        'div.section[id="bibtex-section"] > pre.verbatim.select-on-click'
+    )
+    if bibtex_content_tag is None:
+        return None
+    return bibtex_content_tag.get_text()
+
+
 def get_paper_bibtex(
     bibtex_session: requests.Session, entry: bs4.element.Tag, req_itv: float
 ) -> str | None:
@@ -102,96 +180,315 @@ def get_paper_bibtex(
     Returns:
         str: bibtex字符串
     """
-    bibtex_url = None
-    bibtex_url_tag = entry.select_one(
-        'li.drop-down > div.body > ul > li > a[rel="nofollow"]'
-    )
-    if bibtex_url_tag is not None:
-        bibtex_url = bibtex_url_tag["href"]
-    else:
+    bibtex_url = get_paper_bibtex_url(entry)
+    if bibtex_url is None:
         logger.error("Cannot obtain bibtex URL.")
         return None
 
-    if bibtex_url is not None:
-        sleep(req_itv)
-        bibtex_res = make_request(bibtex_session, str(bibtex_url))
-        if bibtex_res is None:
-            logger.error("Cannot obtain bibtex content: request failed")
-            return None
+    return fetch_paper_bibtex(bibtex_session, bibtex_url, req_itv)
+
+
+def fetch_bibtex_concurrently(
+    bibtex_url_list: list[str],
+    req_itv: float,
+    max_workers: int = 1,
+    burst: int = 1,
+    on_done=None,
+) -> list[str | None]:
+    """并发请求多个bibtex页面，使用令牌桶限制请求速率
+
+    Args:
+        bibtex_url_list (list[str]): bibtex页面URL列表
+        req_itv (float): 长期平均的请求间隔（秒）。
+        max_workers (int): 同时进行的请求数量上限。
+        burst (int): 允许连续发出的最大请求数。
+        on_done (Callable[[int, str | None], None] | None): 每完成一个请求后调用，参数为
+            该URL在列表中的位置和bibtex字符串，用于更新进度条和保存结果。
+
+    Returns:
+        list[str | None]: 与输入顺序一致的bibtex字符串列表
+    """
+    limiter = TokenBucket(req_itv, burst)
+
+    def fetch(idx: int, bibtex_url: str) -> str | None:
+        # 所有线程共用一个会话及其连接池
+        bibtex_str = fetch_paper_bibtex(get_session(), bibtex_url, limiter=limiter)
+        if on_done is not None:
+            on_done(idx, bibtex_str)
+        return bibtex_str
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        # map() keeps the input order
+        bibtex_list = list(
+            executor.map(fetch, range(len(bibtex_url_list)), bibtex_url_list)
+        )
+
+    return bibtex_list
+
+
+def get_toc_path(url: str) -> str | None:
+    """目录页URL -> 目录路径，e.g. https://dblp.org/db/conf/sp/sp2023.html -> db/conf/sp/sp2023"""
+    match = re.search(r"/(db/.+)\.html$", url)
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def get_toc_bibtex_url(url: str, first: int = 0) -> str | None:
+    """根据目录页URL构造dblp检索API的批量bibtex导出链接
+
+    Args:
+        url (str): 期刊/会议某一期/某一年的URL。e.g. https://dblp.org/db/conf/sp/sp2023.html
+        first (int): 返回结果的起始偏移量，用于分页。
+
+    Returns:
+        str | None: 导出链接，URL不是dblp目录页时返回None
+    """
+    # e.g. https://dblp.org/db/conf/sp/sp2023.html -> db/conf/sp/sp2023.bht
+    toc_path = get_toc_path(url)
+    if toc_path is None:
+        return None
+    toc = f"{toc_path}.bht"
+    return f"{dblp_api_url}?q=toc%3A{toc}%3A&h={dblp_bulk_page_size}&f={first}&format=bib1&rd=1a"
+
+
+def normalize_title(title: str) -> str:
+    """去除大括号、标点和大小写差异，用于在TOC标题与bibtex标题之间匹配"""
+    return re.sub(
+        r"[^0-9a-z]+", " ", title.replace("{", "").replace("}", "").lower()
+    ).strip()
+
 
-        bibtex_soup = BeautifulSoup(bibtex_res.text, "html.parser")
-        bibtex_content_tag = bibtex_soup.select_one(
-            'div.section[id="bibtex-section"] > pre.verbatim.select-on-click'
+def split_bibtex_entries(bibtex_text: str) -> list[tuple[str, str]]:
+    """将dblp导出的多条bibtex拆分为单条
+
+    Args:
+        bibtex_text (str): 包含多条bibtex的字符串
+
+    Returns:
+        list[tuple[str, str]]: [(bibtex key, 单条bibtex字符串)]，e.g. ("DBLP:conf/sp/AbdelnabiF23", "@inproceedings{...}")
+    """
+    bibtex_list = list()
+    for chunk in re.split(r"\n(?=@)", bibtex_text.strip()):
+        key_match = re.match(r"@\w+\{([^,\s]+),", chunk)
+        if key_match is None:
+            continue
+        bibtex_list.append((key_match.group(1), chunk.strip() + "\n"))
+    return bibtex_list
+
+
+def get_toc_bibtex(
+    bibtex_session: requests.Session, url: str, req_itv: float
+) -> dict[str, str]:
+    """通过dblp检索API的 toc: 查询，一次（或按页数次）获取整个目录页的bibtex
+
+    Args:
+        bibtex_session (requests.Session): 复用会话，建立连接
+        url (str): 期刊/会议某一期/某一年的URL。
+        req_itv (float): 请求之间的时间间隔（秒）。
+
+    Returns:
+        dict[str, str]: 索引到单条bibtex字符串的映射。索引包括dblp key（不含 "DBLP:" 前缀）、
+            "url:" 加上bibtex中的url字段，以及 "title:" 加上规范化的标题。请求失败时返回空字典。
+    """
+    bibtex_dict = dict()
+    first = 0
+    while True:
+        bulk_url = get_toc_bibtex_url(url, first)
+        if bulk_url is None:
+            logger.warning(f"Cannot build bulk bibtex URL for {url}.")
+            break
+        res = make_request(
+            bibtex_session,
+            bulk_url,
+            req_itv=req_itv,
+            content_types=bibtex_content_types,
         )
-        if bibtex_content_tag is not None:
-            bibtex_str = bibtex_content_tag.get_text()
+        if res is None or res.status_code != 200:
+            logger.warning(
+                f"Bulk bibtex request failed: {bulk_url}, status code: {None if res is None else res.status_code}."
+            )
+            break
+
+        bibtex_list = split_bibtex_entries(res.text)
+        for key, bibtex_str in bibtex_list:
+            bibtex_dict[key.removeprefix("DBLP:")] = bibtex_str
+            url_match = re.search(r"^\s*url\s*=\s*\{([^}]*)\}", bibtex_str, re.M)
+            if url_match is not None:
+                bibtex_dict[f"url:{url_match.group(1).strip()}"] = bibtex_str
+            title_match = re.search(
+                r"^\s*title\s*=\s*\{(.*?)\},?\s*$\n\s*\w+\s*=", bibtex_str, re.M | re.S
+            )
+            if title_match is not None:
+                bibtex_dict[f"title:{normalize_title(title_match.group(1))}"] = (
+                    bibtex_str
+                )
+
+        # 最后一页
+        if len(bibtex_list) < dblp_bulk_page_size:
+            break
+        first += dblp_bulk_page_size
+
+    logger.debug(f"Bulk bibtex entries: {sum(1 for k in bibtex_dict if ':' not in k)}")
+    return bibtex_dict
+
+
+def match_toc_bibtex(
+    bibtex_dict: dict[str, str], dblp_key: str | None, title_url_list: list
+) -> str | None:
+    """从批量结果中找到TOC中一篇论文对应的bibtex，依次按dblp key、URL、标题匹配"""
+    if dblp_key is not None and dblp_key in bibtex_dict:
+        return bibtex_dict[dblp_key]
+    paper_title, paper_url = title_url_list
+    if paper_url:
+        bibtex_str = bibtex_dict.get(f"url:{paper_url}")
+        if bibtex_str is not None:
             return bibtex_str
-    # TODO 错误处理
-    logger.error("Cannot obtain bibtex content.")
+    if paper_title:
+        return bibtex_dict.get(f"title:{normalize_title(paper_title)}")
     return None
 
 
-def get_dblp_page_content(url: str, req_itv: float, type: str) -> list:
+def parse_toc_page(html: str, type: str) -> list[tuple[str | None, list, str | None]]:
+    """解析目录页（或 split_toc_page 拆分出的一段）中的论文条目
+
+    结果只包含字符串，可以在解析进程中运行（--parse-workers）。
+
+    Args:
+        html (str): 目录页HTML
+        type (str): "conf" 或 "journal"
+
+    Returns:
+        list[tuple[str | None, list, str | None]]: 每篇论文的 (dblp key, [论文标题, 论文URL], bibtex页面URL)
+    """
+    # 目录页面可能有数MB，只解析论文条目
+    soup = parse_html(html, toc_entry_strainer)
+    entry_class = "inproceedings" if type == "conf" else "article"
+    paper_entries = soup.select(
+        f'li.entry.{entry_class}[itemscope][itemtype="http://schema.org/ScholarlyArticle"]'
+    )
+    return [
+        (
+            str(entry["id"]) if entry.get("id") is not None else None,
+            get_paper_title_and_url(entry),
+            get_paper_bibtex_url(entry),
+        )
+        for entry in paper_entries
+    ]
+
+
+def split_toc_page(html: str, chunk_entries: int) -> list[str]:
+    """在论文条目的开始标签处将目录页拆分为若干段，每段至多 chunk_entries 篇论文"""
+    pos_list = [match.start() for match in toc_entry_start_pattern.finditer(html)]
+    chunk_list = list()
+    start = 0
+    for pos in pos_list[chunk_entries::chunk_entries]:
+        chunk_list.append(html[start:pos])
+        start = pos
+    chunk_list.append(html[start:])
+    return chunk_list
+
+
+def get_dblp_page_content(
+    url: str,
+    req_itv: float,
+    type: str,
+    bulk: bool = True,
+    max_workers: int = 1,
+    burst: int = 1,
+    on_entry=None,
+    known_bibtex=None,
+) -> list:
     """获取页面中的论文网址
 
     Args:
         url (str): 期刊/会议某一期/某一年的URL。e.g. https://dblp.org/db/conf/sp/sp2023.html
         req_itv (float): bibtex请求之间的时间间隔（秒）。
         type (str): 爬取的论文类型。会议或期刊，"conf" or "journal"。
+        bulk (bool): 是否先批量获取整个目录页的bibtex。批量结果中缺失的论文仍逐篇请求。
+        max_workers (int): 逐篇请求bibtex时同时进行的请求数量上限。
+        burst (int): 逐篇请求bibtex时允许连续发出的最大请求数。
+        on_entry (Callable[[int, list], None] | None): 每得到一篇论文的完整元数据就调用，
+            参数为论文在目录页中的位置和 [论文标题, URL, bibtex]，用于增量保存。
+        known_bibtex (Callable[[str | None, str | None], str | None] | None): 参数为论文的
+            dblp key和URL，返回已有的bibtex（--update），这些论文不再请求bibtex。
 
     Returns:
         list: [论文标题, 每篇论文的 doi.org URL, 不含摘要的bibtex字符串]。e.g. [WeRLman: To Tackle Whale (Transactions), Go Deep (RL), https://doi.org/10.1109/SP46215.2023.10179444, @inproceedings...]
     """
-    res = requests.get(url)
-    if res.status_code != 200:
+    bibtex_session = get_session()
+
+    res = make_request(bibtex_session, url)
+    if res is None or res.status_code != 200:
         logger.error(f"{url} cannot be loaded. Make sure your input is valid.")
         return []
-    soup = BeautifulSoup(res.text, "html.parser")
-    if type == "conf":
-        paper_entries = soup.select(
-            'li.entry.inproceedings[itemscope][itemtype="http://schema.org/ScholarlyArticle"]'
-        )
-    elif type == "journal":
-        paper_entries = soup.select(
-            'li.entry.article[itemscope][itemtype="http://schema.org/ScholarlyArticle"]'
-        )
-    else:
+    if type not in ("conf", "journal"):
         logger.error('Invalid type param. Should be "conf" or "journal"')
         return []
+    pool = get_parse_pool()
+    if pool is None:
+        paper_entries = parse_toc_page(res.text, type)
+    else:
+        # 大型目录页拆分后在多个解析进程中同时解析
+        chunk_list = split_toc_page(res.text, parse_toc_chunk_entries)
+        paper_entries = [
+            paper_entry
+            for chunk_entries in pool.map(
+                parse_toc_page, chunk_list, [type] * len(chunk_list)
+            )
+            for paper_entry in chunk_entries
+        ]
 
     entry_metadata_list = list()
-
-    bibtex_session = requests.Session()
-
-    progress = Progress(
-        TextColumn("{task.description}"),
-        TaskProgressColumn(),
-        BarColumn(),
-        MofNCompleteColumn(),
-        TimeElapsedColumn(),
-        TimeRemainingColumn(compact=True),
-        TextColumn("{task.fields[avg_sec_per_it]:>6.2f} s/it"),
-    )
-    progress.start()
-    task_id = progress.add_task(
-        "Collecting Metadata", total=len(paper_entries), avg_sec_per_it=0
-    )
-    for entry in paper_entries:
-        title_url_list = get_paper_title_and_url(entry)
-        bibtex_str = get_paper_bibtex(bibtex_session, entry, req_itv)
+    known_bibtex_list = [None] * len(paper_entries)
+    if known_bibtex is not None:
+        known_bibtex_list = [
+            known_bibtex(dblp_key, title_url_list[1])
+            for dblp_key, title_url_list, _ in paper_entries
+        ]
+
+    bibtex_dict = dict()
+    # 所有论文都已有bibtex时不需要批量请求
+    if bulk and None in known_bibtex_list:
+        bibtex_dict = get_toc_bibtex(bibtex_session, url, req_itv)
+
+    progress, task_id = start_progress("Collecting Metadata", len(paper_entries))
+
+    def finish(idx: int):
+        if on_entry is not None:
+            on_entry(idx, entry_metadata_list[idx])
+        advance_progress(progress, task_id, get_host(url))
+
+    # 批量结果中缺失的论文，记录其在列表中的位置和bibtex页面URL
+    pending_idx_list = list()
+    pending_url_list = list()
+    for (dblp_key, title_url_list, bibtex_url), bibtex_str in zip(
+        paper_entries, known_bibtex_list
+    ):
+        if bibtex_str is None:
+            bibtex_str = match_toc_bibtex(bibtex_dict, dblp_key, title_url_list)
         entry_metadata_list.append(title_url_list + [bibtex_str])
-
-        # set speed display
-        task_fields = progress.tasks[task_id]
-        avg_speed = (
-            task_fields.elapsed / (task_fields.completed + 1)
-            if task_fields.elapsed
-            else 0
-        )
-        progress.update(task_id, advance=1, avg_sec_per_it=avg_speed)
-    progress.stop()
-
-    bibtex_session.close()
+        if bibtex_str is not None:
+            finish(len(entry_metadata_list) - 1)
+            continue
+        if bulk:
+            logger.debug(f"Paper not in bulk bibtex, fallback: {title_url_list[0]}")
+        if bibtex_url is None:
+            logger.error("Cannot obtain bibtex URL.")
+            finish(len(entry_metadata_list) - 1)
+            continue
+        pending_idx_list.append(len(entry_metadata_list) - 1)
+        pending_url_list.append(bibtex_url)
+
+    def on_fetched(pending_idx: int, bibtex_str: str | None):
+        idx = pending_idx_list[pending_idx]
+        entry_metadata_list[idx][2] = bibtex_str
+        finish(idx)
+
+    fetch_bibtex_concurrently(
+        pending_url_list, req_itv, max_workers, burst, on_done=on_fetched
+    )
+    stop_progress(progress, task_id)
 
     return entry_metadata_list
 
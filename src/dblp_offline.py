@@ -0,0 +1,375 @@
+import gzip
+import html.entities
+import json
+import logging
+import os
+import re
+import sqlite3
+import textwrap
+import threading
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from src.dblp import check_paper_url, get_toc_path
+
+logger = logging.getLogger(__name__)
+
+# 建立索引时每多少条记录写入一次数据库
+_insert_batch_size = 10000
+
+# 从XML中保存的字段。author/editor/ee/isbn 可能出现多次，保存为列表
+_list_fields = {"author", "editor", "ee", "isbn"}
+_text_fields = {
+    "title",
+    "booktitle",
+    "journal",
+    "volume",
+    "number",
+    "pages",
+    "year",
+    "publisher",
+    "series",
+    "crossref",
+    "url",
+}
+
+# dblp区分同名作者的编号，e.g. "Wei Wang 0042"，bibtex中不包含
+homonym_number_pattern = re.compile(r"\s\d{4}$")
+
+# 组合附加符号 -> LaTeX 重音命令
+_latex_accents = {
+    "\u0300": "`",
+    "\u0301": "'",
+    "\u0302": "^",
+    "\u0303": "~",
+    "\u0304": "=",
+    "\u0306": "u",
+    "\u0308": '"',
+    "\u030a": "r",
+    "\u030b": "H",
+    "\u030c": "v",
+    "\u0327": "c",
+    "\u0328": "k",
+}
+_latex_letters = {
+    "ß": r"{\ss}",
+    "ø": r"{\o}",
+    "Ø": r"{\O}",
+    "æ": r"{\ae}",
+    "Æ": r"{\AE}",
+    "œ": r"{\oe}",
+    "Œ": r"{\OE}",
+    "ł": r"{\l}",
+    "Ł": r"{\L}",
+    "ı": r"{\i}",
+    "&": r"{\&}",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+}
+
+
+def latex_escape(text: str) -> str:
+    """将非ASCII字符和BibTeX特殊字符转换为dblp使用的LaTeX写法，e.g. ü -> {\\"{u}}"""
+    char_list = list()
+    for char in unicodedata.normalize("NFD", text):
+        if char in _latex_accents and char_list:
+            base = char_list.pop()
+            char_list.append(f"{{\\{_latex_accents[char]}{{{base}}}}}")
+        else:
+            char_list.append(_latex_letters.get(char, char))
+    return unicodedata.normalize("NFC", "".join(char_list))
+
+
+def protect_case(text: str) -> str:
+    """与dblp相同，用大括号保护全大写的缩写，e.g. IEEE -> {IEEE}，DIANE: -> {DIANE:}
+
+    以空白分隔的单词中至少有两个大写字母、没有小写字母时才保护。单独的大写字母（"A"）、
+    大小写混合的单词（"IoT"）和以逗号结尾的地名缩写（"CA, USA,"）保持原样。
+    """
+
+    def protect(match: re.Match) -> str:
+        word = match.group(0)
+        if (
+            word.endswith(",")
+            or any(c.islower() for c in word)
+            or sum(c.isupper() for c in word) < 2
+        ):
+            return word
+        return f"{{{word}}}"
+
+    return re.sub(r"\S+", protect, text)
+
+
+def format_timestamp(mdate: str) -> str:
+    """记录的修改日期 -> dblp的timestamp，e.g. 2019-10-19 -> "Sat, 19 Oct 2019 00:00:00 +0000"
+
+    XML中只有日期，时间记为UTC的零点。
+    """
+    return format_datetime(
+        datetime.strptime(mdate, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    )
+
+
+def format_field(name: str, value: str) -> str:
+    """按dblp的格式输出一个字段：字段名左对齐，值超过一行时换行并缩进"""
+    prefix = f"  {name:<12} = {{"
+    if "\n" in value:
+        # 作者列表已经按行排列
+        return prefix + value + "}"
+    wrapped = textwrap.fill(
+        value,
+        width=80,
+        initial_indent=" " * len(prefix),
+        subsequent_indent=" " * len(prefix),
+        break_long_words=False,
+        break_on_hyphens=False,
+    )
+    return prefix + wrapped[len(prefix) :] + "}"
+
+
+def format_names(name_list: list[str]) -> str:
+    return (" and\n" + " " * 18).join(
+        latex_escape(homonym_number_pattern.sub("", name)) for name in name_list
+    )
+
+
+def make_bibtex(record: dict, proceedings: dict | None) -> str:
+    """由XML字段生成dblp格式的bibtex
+
+    Args:
+        record (dict): article 或 inproceedings 记录的字段
+        proceedings (dict | None): inproceedings 的 crossref 指向的 proceedings 记录
+
+    Returns:
+        str: bibtex字符串
+    """
+    proceedings = proceedings or {}
+    field_list = list()
+
+    def add(name: str, value: str | None, raw: bool = False):
+        if value:
+            field_list.append((name, value if raw else latex_escape(value)))
+
+    if record.get("author"):
+        field_list.append(("author", format_names(record["author"])))
+    if record["type"] == "inproceedings" and proceedings.get("editor"):
+        field_list.append(("editor", format_names(proceedings["editor"])))
+    add("title", latex_escape(protect_case(record["title"].removesuffix("."))), True)
+    if record["type"] == "inproceedings":
+        booktitle = proceedings.get("title", record.get("booktitle", ""))
+        add("booktitle", latex_escape(protect_case(booktitle.removesuffix("."))), True)
+        add("series", proceedings.get("series"))
+        add("volume", proceedings.get("volume"))
+    else:
+        add("journal", latex_escape(protect_case(record.get("journal", ""))), True)
+        add("volume", record.get("volume"))
+        add("number", record.get("number"))
+    add("pages", record.get("pages", "").replace("-", "--"))
+    if record["type"] == "inproceedings":
+        add(
+            "publisher",
+            latex_escape(protect_case(proceedings.get("publisher", ""))),
+            True,
+        )
+    add("year", record.get("year"))
+    ee_list = record.get("ee", [])
+    if ee_list:
+        add("url", ee_list[0], True)
+        if ee_list[0].startswith("https://doi.org/"):
+            add("doi", ee_list[0].removeprefix("https://doi.org/"), True)
+    if record.get("mdate"):
+        add("timestamp", format_timestamp(record["mdate"]), True)
+    add("biburl", f"https://dblp.org/rec/{record['key']}.bib", True)
+    add("bibsource", "dblp computer science bibliography, https://dblp.org", True)
+
+    bibtex_type = "inproceedings" if record["type"] == "inproceedings" else "article"
+    return (
+        f"@{bibtex_type}{{DBLP:{record['key']},\n"
+        + ",\n".join(format_field(name, value) for name, value in field_list)
+        + "\n}\n"
+    )
+
+
+def parse_record(elem: ET.Element) -> dict:
+    record = {"type": elem.tag, "key": elem.get("key"), "mdate": elem.get("mdate")}
+    for child in elem:
+        # 标题中可能有 <i>、<sub> 等标签
+        text = "".join(child.itertext()).strip()
+        if child.tag in _list_fields:
+            record.setdefault(child.tag, []).append(text)
+        elif child.tag in _text_fields:
+            record[child.tag] = text
+    return record
+
+
+def build_index(dump_path: str, index_path: str):
+    """流式解析dblp的XML数据（dblp.xml 或 dblp.xml.gz），建立按目录页索引的SQLite数据库
+
+    逐条解析并立即释放XML元素，内存占用不随数据量增长。索引先写入临时文件，完成后替换 index_path。
+
+    Args:
+        dump_path (str): https://dblp.org/xml/ 中的 dblp.xml.gz 或解压后的 dblp.xml，
+            不需要 dblp.dtd，实体按HTML实体解析
+        index_path (str): 索引文件路径
+    """
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE records (toc TEXT NOT NULL, type TEXT NOT NULL, data TEXT NOT NULL)"
+    )
+    conn.execute("CREATE TABLE proceedings (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    parser = ET.XMLParser()
+    # dblp.xml 使用 dblp.dtd 中定义的 HTML 实体（e.g. &uuml;）
+    parser.entity.update(html.entities.entitydefs)
+
+    record_rows = list()
+    proceedings_rows = list()
+    count = 0
+    start_time = time.monotonic()
+    with (gzip.open if dump_path.endswith(".gz") else open)(dump_path, "rb") as f:
+        root = None
+        depth = 0
+        for event, elem in ET.iterparse(f, events=("start", "end"), parser=parser):
+            if event == "start":
+                if root is None:
+                    root = elem
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+
+            if elem.tag in ("article", "inproceedings", "proceedings"):
+                record = parse_record(elem)
+                if elem.tag == "proceedings":
+                    proceedings_rows.append(
+                        (record["key"], json.dumps(record, ensure_ascii=False))
+                    )
+                elif record.get("url", "").startswith("db/"):
+                    # e.g. db/conf/sp/sp2023.html#AbdelnabiF23 -> db/conf/sp/sp2023
+                    toc = record["url"].split("#", 1)[0].removesuffix(".html")
+                    record_rows.append(
+                        (toc, elem.tag, json.dumps(record, ensure_ascii=False))
+                    )
+            # 释放已经处理的元素
+            elem.clear()
+            root.clear()
+
+            count += 1
+            if len(record_rows) + len(proceedings_rows) >= _insert_batch_size:
+                conn.executemany("INSERT INTO records VALUES (?, ?, ?)", record_rows)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO proceedings VALUES (?, ?)", proceedings_rows
+                )
+                record_rows.clear()
+                proceedings_rows.clear()
+            if count % 1000000 == 0:
+                logger.info(
+                    f"Parsed {count} dblp records in {time.monotonic() - start_time:.0f} s."
+                )
+
+    conn.executemany("INSERT INTO records VALUES (?, ?, ?)", record_rows)
+    conn.executemany(
+        "INSERT OR REPLACE INTO proceedings VALUES (?, ?)", proceedings_rows
+    )
+    conn.execute("CREATE INDEX idx_toc ON records(toc)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, index_path)
+    logger.info(
+        f"Built dblp index {index_path} from {count} records in {time.monotonic() - start_time:.0f} s."
+    )
+
+
+class DblpIndex:
+    """离线的dblp索引，由 build_index 生成"""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    def get_toc_content(self, url: str, type: str) -> list:
+        """与 dblp.get_dblp_page_content 相同，但从本地索引中读取，不发送请求
+
+        Args:
+            url (str): 期刊/会议某一期/某一年的dblp URL。
+            type (str): "conf" 或 "journal"，对应 inproceedings 或 article 记录
+
+        Returns:
+            list: [论文标题, 论文URL, 不含摘要的bibtex字符串]
+        """
+        toc_path = get_toc_path(url)
+        record_type = {"conf": "inproceedings", "journal": "article"}.get(type)
+        if toc_path is None or record_type is None:
+            logger.error(f"Invalid dblp URL {url} or type {type}.")
+            return []
+
+        with self.lock:
+            record_list = [
+                json.loads(row[0])
+                for row in self.conn.execute(
+                    "SELECT data FROM records WHERE toc = ? AND type = ? ORDER BY rowid",
+                    (toc_path, record_type),
+                )
+            ]
+            proceedings_dict = dict()
+            for crossref in {r["crossref"] for r in record_list if "crossref" in r}:
+                row = self.conn.execute(
+                    "SELECT data FROM proceedings WHERE key = ?", (crossref,)
+                ).fetchone()
+                if row is not None:
+                    proceedings_dict[crossref] = json.loads(row[0])
+
+        entry_metadata_list = list()
+        for record in record_list:
+            # 与目录页中的标题一致，去掉末尾的英文句号
+            paper_title = record.get("title", "").strip()[:-1]
+            paper_url = None
+            if record.get("ee"):
+                paper_url = check_paper_url(record["ee"][0], paper_title)
+            bibtex_str = make_bibtex(
+                record, proceedings_dict.get(record.get("crossref"))
+            )
+            entry_metadata_list.append([paper_title, paper_url, bibtex_str])
+        logger.debug(f"Found {len(entry_metadata_list)} papers of {toc_path} offline.")
+        return entry_metadata_list
+
+    def close(self):
+        self.conn.close()
+
+
+_index: DblpIndex | None = None
+_index_path: str | None = None
+_index_lock = threading.Lock()
+
+
+def configure_index(path: str | None):
+    """设置离线索引的路径，为None时在线访问dblp"""
+    global _index, _index_path
+    if _index is not None:
+        _index.close()
+        _index = None
+    _index_path = path
+
+
+def get_index() -> DblpIndex | None:
+    """返回进程内共享的离线索引，首次调用时打开。未设置索引时返回None。"""
+    global _index
+    if _index_path is None:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = DblpIndex(_index_path)
+    return _index
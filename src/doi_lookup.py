@@ -0,0 +1,191 @@
+import logging
+import re
+from urllib.parse import unquote, urlencode, urlparse
+
+import requests
+
+from src.html_parse import html_to_text, is_truncated
+from src.http_client import get_session
+from src.request_wrap import make_request
+from src.settings import (crossref_api_url, doi_lookup_batch_size,
+                          doi_lookup_interval, doi_lookup_mailto,
+                          json_content_types, openalex_api_url)
+
+logger = logging.getLogger(__name__)
+
+extractor_version = 1
+
+# Crossref 的摘要是 JATS XML，通常以 <jats:title>Abstract</jats:title> 开头
+jats_title_pattern = re.compile(r"<jats:title>.*?</jats:title>", re.DOTALL)
+
+
+def normalize_doi(text: str | None) -> str | None:
+    """将 doi.org 链接、"doi:" 前缀或DOI字符串规范化为小写的DOI，其他内容返回None"""
+    if not text:
+        return None
+    text = text.strip()
+    parsed_url = urlparse(text)
+    if parsed_url.netloc in ("doi.org", "dx.doi.org"):
+        text = parsed_url.path.lstrip("/")
+    elif text.lower().startswith("doi:"):
+        text = text[4:]
+    doi = unquote(text).strip().lower()
+    return doi if doi.startswith("10.") else None
+
+
+def normalize_url(url: str | None) -> str | None:
+    """将论文URL规范化：统一为 https、域名小写，去掉 #fragment 和末尾的 "/"，不是URL时返回None"""
+    if not url:
+        return None
+    parsed_url = urlparse(url.strip())
+    if not parsed_url.netloc:
+        return None
+    query = f"?{parsed_url.query}" if parsed_url.query else ""
+    return f"https://{parsed_url.netloc.lower()}{parsed_url.path.rstrip('/')}{query}"
+
+
+def get_paper_key(url: str | None) -> str | None:
+    """论文在摘要库和页面库中的键：DOI。URL中没有DOI（e.g. USENIX、NDSS的论文页面）时为规范化的URL"""
+    return normalize_doi(url) or normalize_url(url)
+
+
+def extract_doi(url: str | None) -> str | None:
+    """从 doi.org 链接中提取小写的DOI，其他链接返回None"""
+    if not url or urlparse(url).netloc not in ("doi.org", "dx.doi.org"):
+        return None
+    doi = normalize_doi(url)
+    # 过滤条件以 "|" 和 "," 分隔多个DOI，包含这些字符的DOI无法批量查询
+    if doi is None or "|" in doi or "," in doi:
+        return None
+    return doi
+
+
+def rebuild_inverted_index(inverted_index: dict[str, list[int]]) -> str:
+    """将 OpenAlex 的 abstract_inverted_index（词 -> 位置列表）还原为摘要文本"""
+    position_list = [
+        (position, word)
+        for word, positions in inverted_index.items()
+        for position in positions
+    ]
+    return " ".join(word for _, word in sorted(position_list))
+
+
+def strip_jats(abstract: str) -> str:
+    """去除 Crossref 摘要中的 JATS 标签"""
+    return html_to_text(jats_title_pattern.sub("", abstract))
+
+
+def query_openalex(
+    session: requests.Session, doi_list: list[str], api_url: str, req_itv: float
+) -> dict[str, str]:
+    params = {
+        "filter": "doi:" + "|".join(doi_list),
+        "per-page": len(doi_list),
+        "select": "doi,abstract_inverted_index",
+    }
+    if doi_lookup_mailto:
+        params["mailto"] = doi_lookup_mailto
+    res = make_request(
+        session,
+        f"{api_url}?{urlencode(params, safe=':|/')}",
+        req_itv=req_itv,
+        content_types=json_content_types,
+    )
+    if res is None or res.status_code != 200:
+        logger.warning(f"OpenAlex lookup failed for {len(doi_list)} DOIs.")
+        return {}
+    try:
+        # 代理或登录页面可能返回状态码200的HTML
+        work_list = res.json().get("results", [])
+    except ValueError:
+        logger.warning(f"OpenAlex returned invalid JSON for {len(doi_list)} DOIs.")
+        return {}
+
+    abstract_dict = dict()
+    for work in work_list:
+        if not work.get("doi") or not work.get("abstract_inverted_index"):
+            continue
+        doi = work["doi"].removeprefix("https://doi.org/").lower()
+        abstract_dict[doi] = rebuild_inverted_index(work["abstract_inverted_index"])
+    return abstract_dict
+
+
+def query_crossref(
+    session: requests.Session, doi_list: list[str], api_url: str, req_itv: float
+) -> dict[str, str]:
+    params = {
+        "filter": ",".join(f"doi:{doi}" for doi in doi_list),
+        "rows": len(doi_list),
+        "select": "DOI,abstract",
+    }
+    if doi_lookup_mailto:
+        params["mailto"] = doi_lookup_mailto
+    res = make_request(
+        session,
+        f"{api_url}?{urlencode(params, safe=':,/')}",
+        req_itv=req_itv,
+        content_types=json_content_types,
+    )
+    if res is None or res.status_code != 200:
+        logger.warning(f"Crossref lookup failed for {len(doi_list)} DOIs.")
+        return {}
+    try:
+        work_list = res.json().get("message", {}).get("items", [])
+    except ValueError:
+        logger.warning(f"Crossref returned invalid JSON for {len(doi_list)} DOIs.")
+        return {}
+
+    abstract_dict = dict()
+    for work in work_list:
+        if not work.get("DOI") or not work.get("abstract"):
+            continue
+        abstract_dict[work["DOI"].lower()] = strip_jats(work["abstract"])
+    return abstract_dict
+
+
+def lookup_abstracts(
+    entry_metadata_list: list,
+    openalex_url: str = openalex_api_url,
+    crossref_url: str = crossref_api_url,
+    req_itv: float = doi_lookup_interval,
+) -> dict[str, tuple[str, str]]:
+    """通过 OpenAlex 和 Crossref 批量查询论文摘要
+
+    从 doi.org 链接中提取DOI，每个请求查询至多 settings.doi_lookup_batch_size 个DOI。
+    先查询 OpenAlex，没有找到摘要的DOI再查询 Crossref。被截断或过短的摘要不采用。
+
+    Args:
+        entry_metadata_list (list): [论文标题, URL, bibtex] 的列表
+        openalex_url (str): OpenAlex works API 的地址
+        crossref_url (str): Crossref works API 的地址
+        req_itv (float): 请求间隔（秒）
+
+    Returns:
+        dict[str, tuple[str, str]]: 论文URL -> (摘要, 来源 "openalex" 或 "crossref")，只包含找到摘要的论文
+    """
+    url_dict = dict()
+    for entry_metadata in entry_metadata_list:
+        doi = extract_doi(entry_metadata[1])
+        if doi is not None:
+            url_dict[doi] = entry_metadata[1]
+    logger.debug(f"Number of DOIs to look up: {len(url_dict)}")
+
+    found_dict = dict()
+    session = get_session()
+    for source, query_func, api_url in (
+        ("openalex", query_openalex, openalex_url),
+        ("crossref", query_crossref, crossref_url),
+    ):
+        remaining_list = [doi for doi in url_dict if doi not in found_dict]
+        for i in range(0, len(remaining_list), doi_lookup_batch_size):
+            doi_list = remaining_list[i : i + doi_lookup_batch_size]
+            for doi, abstract in query_func(
+                session, doi_list, api_url, req_itv
+            ).items():
+                if doi in url_dict and not is_truncated(abstract):
+                    found_dict[doi] = (abstract, source)
+        logger.debug(
+            f"Abstracts found after querying {source}: {len(found_dict)}/{len(url_dict)}"
+        )
+
+    return {url_dict[doi]: result for doi, result in found_dict.items()}
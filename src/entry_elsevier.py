@@ -1,34 +1,52 @@
 import logging
-from time import sleep
 
 import nodriver as nd
 
-from src.request_wrap import retry_async
+from src import metrics
+from src.html_parse import join_text, select_text
+from src.meta_extract import extract_embedded_abstract
+from src.page_archive import archive_page_async
+from src.page_ready import wait_for_any
+from src.parse_pool import run_parse_async
+from src.request_wrap import run_paced
 
 logger = logging.getLogger(__name__)
 
+extractor_version = 1
 
-@retry_async
-async def get_abs_impl(url: str, driver: nd.Browser) -> str:
-    css_selector = "div.abstract.author > div > div"
+css_selector = "div.abstract.author > div > div"
 
-    # 访问目标网页
-    tab = await driver.get(url)
-    await tab.wait(5)
-    await tab.wait_for(selector=css_selector, timeout=15)
-    await tab.get_content()
 
-    abs_elems = await tab.select_all(css_selector)
-    abstract = " ".join(abs_elem.text_all for abs_elem in abs_elems)
+def extract_abstract(html: str) -> str | None:
+    """从渲染后的DOM或静态HTML中提取摘要，不发送请求，也用于 --reextract"""
+    abstract = join_text(select_text(html, css_selector))
+    if abstract is not None:
+        return abstract
+    return extract_embedded_abstract(html)
+
+
+async def get_abs_impl(url: str, driver: nd.Browser | nd.Tab) -> str | None:
+    # 访问目标网页。driver 为 Tab 时在该标签页中打开
+    with metrics.timed("browser_navigate", publisher="elsevier"):
+        tab = await driver.get(url)
+    await wait_for_any(tab, [css_selector], "elsevier")
+    with metrics.timed("browser_extract", publisher="elsevier"):
+        # 与 --reextract 使用相同的提取代码
+        html = await tab.get_content()
+        await archive_page_async(url, html, __name__, rendered=True)
+        abstract = await run_parse_async(extract_abstract, html)
     return abstract
 
 
-async def get_full_abstract(url: str, driver: nd.Browser, req_itv: float) -> str | None:
+async def get_full_abstract(
+    url: str, driver: nd.Browser | nd.Tab, req_itv: float, wait_first: bool = True
+) -> str | None:
     if url == "":
         return None
 
-    sleep(req_itv)
-    abstract = await get_abs_impl(url, driver)
+    abstract = await run_paced(
+        url, req_itv, get_abs_impl, url, driver, wait_first=wait_first
+    )
     return abstract
 
 
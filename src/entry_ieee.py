@@ -1,44 +1,82 @@
+import json
 import logging
-from time import sleep
+import re
 
 import nodriver as nd
 
-from src.request_wrap import retry_async
+from src import metrics
+from src.html_parse import select_text
+from src.meta_extract import extract_embedded_abstract
+from src.page_archive import archive_page_async
+from src.page_ready import wait_for_any
+from src.parse_pool import run_parse_async
+from src.request_wrap import run_paced
 
 logger = logging.getLogger(__name__)
 
+extractor_version = 1
 
-@retry_async
-async def get_abs_impl(url: str, driver: nd.Browser) -> str:
+# 页面中内联的论文元数据，包含完整的摘要
+metadata_blob_pattern = re.compile(
+    r"xplGlobal\.document\.metadata\s*=\s*(\{.*?\});\s*$", re.MULTILINE
+)
+css_selector = "div[xplmathjax]"
+
+
+async def get_abs_impl(url: str, driver: nd.Browser | nd.Tab) -> str | None:
     # "Show More" button of abstract
     button_css_selector = "a.abstract-text-view-all"
-    css_selector = "div[xplmathjax]"
 
-    # 访问目标网页
-    tab = await driver.get(url)
-    await tab.wait(5)
-    await tab.wait_for(selector=css_selector, timeout=10)
+    # 访问目标网页。driver 为 Tab 时在该标签页中打开
+    with metrics.timed("browser_navigate", publisher="ieee"):
+        tab = await driver.get(url)
+    await wait_for_any(tab, [css_selector], "ieee")
 
     if await tab.query_selector(button_css_selector) is not None:
         show_more_button = await tab.select(button_css_selector)
         await show_more_button.click()
 
-    await tab.get_content()
-
-    abs_elem = await tab.select(css_selector)
-    abstract = abs_elem.text_all
+    with metrics.timed("browser_extract", publisher="ieee"):
+        # 与 --reextract 使用相同的提取代码
+        html = await tab.get_content()
+        await archive_page_async(url, html, __name__, rendered=True)
+        abstract = await run_parse_async(extract_abstract, html)
     return abstract
 
 
-async def get_full_abstract(url: str, driver: nd.Browser, req_itv: float) -> str | None:
+async def get_full_abstract(
+    url: str, driver: nd.Browser | nd.Tab, req_itv: float, wait_first: bool = True
+) -> str | None:
     if url == "":
         return None
 
-    sleep(req_itv)
-    abstract = await get_abs_impl(url, driver)
+    abstract = await run_paced(
+        url, req_itv, get_abs_impl, url, driver, wait_first=wait_first
+    )
     return abstract
 
 
+def extract_metadata_blob(html: str) -> str | None:
+    """从页面内联的 xplGlobal.document.metadata JSON 中提取摘要"""
+    match = metadata_blob_pattern.search(html)
+    if match is None:
+        return None
+    try:
+        metadata = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+    abstract = metadata.get("abstract")
+    return abstract if isinstance(abstract, str) else None
+
+
+def extract_abstract(html: str) -> str | None:
+    """从渲染后的DOM或静态HTML中提取摘要，不发送请求，也用于 --reextract"""
+    text_list = select_text(html, css_selector)
+    if text_list and text_list[0] != "":
+        return text_list[0]
+    return extract_embedded_abstract(html, extract_metadata_blob)
+
+
 # async def main():
 #     config = zd.Config(
 #         headless=True,
@@ -1,47 +1,76 @@
+import asyncio
 import logging
-from time import sleep
 from urllib.parse import urlparse
 
 import requests
 import nodriver as nd
-from bs4 import BeautifulSoup
 
-from src.request_wrap import make_request, retry_async
+from src import metrics
+from src.html_parse import join_text, select_attr, select_text
+from src.page_archive import archive_page_async
+from src.page_ready import wait_for_any
+from src.parse_pool import run_parse_async
+from src.request_wrap import make_request, run_paced
 from src.settings import req_headers
 
 logger = logging.getLogger(__name__)
 
+extractor_version = 1
 
-@retry_async
-async def get_abs_impl(url: str, driver: nd.Browser) -> str:
+# journals.sagepub.com 渲染后的摘要
+css_selector = "section[id='abstract'] > div[role='paragraph']"
+# content.iospress.com 静态页面中的摘要属性
+article_css_selector = "h1[data-p13n='journal-article']"
+
+
+def extract_abstract(html: str) -> str | None:
+    """从 content.iospress.com 的页面或 sagepub 渲染后的DOM中提取摘要，也用于 --reextract"""
+    abstract = select_attr(html, article_css_selector, "data-abstract")
+    if abstract is not None:
+        # iospress.com对于Special issue等非期刊论文的条目的设置
+        return str(abstract) if abstract != "No abstract" else None
+    return join_text(select_text(html, css_selector))
+
+
+async def get_abs_impl(
+    url: str, driver: nd.Browser | nd.Tab, archive_url: str | None = None
+) -> str | None:
     button_css_selector = "button[id='onetrust-reject-all-handler']"
-    css_selector = "section[id='abstract'] > div[role='paragraph']"
 
-    tab = await driver.get(url)
-    await tab.wait(5)
+    with metrics.timed("browser_navigate", publisher="iospress"):
+        tab = await driver.get(url)
+    await wait_for_any(tab, [css_selector], "iospress")
 
     if await tab.query_selector(button_css_selector) is not None:
         cookie_policy_button = await tab.select(button_css_selector)
         await cookie_policy_button.click()
 
-    await tab.wait_for(selector=css_selector, timeout=15)
-    await tab.get_content()
-
-    abs_elems = await tab.select_all(css_selector)
-    abstract = " ".join(abs_elem.text_all for abs_elem in abs_elems)
+    with metrics.timed("browser_extract", publisher="iospress"):
+        # 重定向后的页面按原来的论文URL（doi.org 链接）保存
+        html = await tab.get_content()
+        await archive_page_async(archive_url or url, html, __name__, rendered=True)
+        abstract = await run_parse_async(extract_abstract, html)
     return abstract
 
 
 async def get_full_abstract(
-    abs_session: requests.Session, url: str, req_itv: float, driver: nd.Browser
+    abs_session: requests.Session,
+    url: str,
+    req_itv: float,
+    driver: nd.Browser | nd.Tab,
 ) -> str | None:
     abstract = None
 
     if url == "":
         return None
 
-    sleep(req_itv)
-    res = make_request(abs_session, url, headers=req_headers)
+    # 在线程中发送请求，不阻塞其他标签页所在的事件循环
+    res = await asyncio.to_thread(
+        make_request, abs_session, url, headers=req_headers, req_itv=req_itv
+    )
+    if res is None:
+        logger.warning(f"Request to {url} failed.")
+        return None
 
     parsed_domain = urlparse(res.url).netloc
     if parsed_domain == "content.iospress.com":
@@ -49,18 +78,15 @@ async def get_full_abstract(
             logger.warning(f"Cannot access {url} , status code: {res.status_code}.")
             # print(res.text)
         else:
-            abs_soup = BeautifulSoup(res.text, "html.parser")
-            css_selector = "h1[data-p13n='journal-article']"
-            abs_tags = abs_soup.select_one(css_selector)
-            if abs_tags is not None:
-                abstract = abs_tags["data-abstract"]
-            # iospress.com对于Special issue等非期刊论文的条目的设置
-            if abstract == "No abstract":
-                abstract = None
+            await archive_page_async(url, res.text, __name__)
+            abstract = await run_parse_async(extract_abstract, res.text)
     # TODO not sure whether we should keep "journals" or not
     elif parsed_domain == "journals.sagepub.com":
         # sagepub is a new website
-        abstract = await get_abs_impl(res.url, driver)
+        # 上面的请求已经按请求间隔访问过该网站，浏览器第一次打开页面前不再等待
+        abstract = await run_paced(
+            res.url, req_itv, get_abs_impl, res.url, driver, url, wait_first=False
+        )
     else:
         return None
 
@@ -3,16 +3,25 @@ import logging
 import requests
 
 from src.get_abstract_base import get_abstract_base
+from src.html_parse import join_text, select_text
 
 logger = logging.getLogger(__name__)
 
+extractor_version = 1
+
+# 摘要在 p 标签中的 p 标签里，只有 html.parser 保留这种嵌套
+css_selector = "div.entry-content > div.paper-data > p:nth-child(2) > p"
+
+
+def extract_abstract(html: str) -> str | None:
+    """从论文页面中提取摘要，不发送请求，也用于 --reextract"""
+    return join_text(select_text(html, css_selector, html_parser=True))
+
 
 def get_full_abstract(
     abs_session: requests.Session, url: str, req_itv: float
 ) -> str | None:
-    css_selector = "div.entry-content > div.paper-data > p:nth-child(2) > p"
-
-    abstract = get_abstract_base(abs_session, url, req_itv, css_selector)
+    abstract = get_abstract_base(abs_session, url, req_itv, extract_abstract)
     return abstract
 
 
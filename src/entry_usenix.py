@@ -3,18 +3,26 @@ import logging
 import requests
 
 from src.get_abstract_base import get_abstract_base
+from src.html_parse import join_text, select_text
 
 logger = logging.getLogger(__name__)
 
+extractor_version = 1
+
+# 有两个一样的 `div.field...`，选取第二个标签，
+# 以及最后需要选取全部的p标签
+css_selector = "div.content > div.field.field-name-field-paper-description.field-type-text-long.field-label-above:nth-child(2) > div.field-items.field-items > div.field-item.odd > p"
+
+
+def extract_abstract(html: str) -> str | None:
+    """从论文页面中提取摘要，不发送请求，也用于 --reextract"""
+    return join_text(select_text(html, css_selector))
+
 
 def get_full_abstract(
     abs_session: requests.Session, url: str, req_itv: float
 ) -> str | None:
-    # 有两个一样的 `div.field...`，选取第二个标签，
-    # 以及最后需要选取全部的p标签
-    css_selector = "div.content > div.field.field-name-field-paper-description.field-type-text-long.field-label-above:nth-child(2) > div.field-items.field-items > div.field-item.odd > p"
-
-    abstract = get_abstract_base(abs_session, url, req_itv, css_selector)
+    abstract = get_abstract_base(abs_session, url, req_itv, extract_abstract)
     return abstract
 
 
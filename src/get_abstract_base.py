@@ -1,41 +1,51 @@
 import logging
-from time import sleep
 
 import requests
-from bs4 import BeautifulSoup
 
-from src.request_wrap import make_request
+from src.http_cache import invalidate_cached
+from src.page_archive import archive_page
+from src.parse_pool import run_parse
+from src.request_wrap import default_retry_policy, make_request
 from src.settings import req_headers
 
 logger = logging.getLogger(__name__)
 
 
 def get_abstract_base(
-    abs_session: requests.Session, url: str, req_itv: float, css_selector: str
+    abs_session: requests.Session, url: str, req_itv: float, extract_func
 ) -> str | None:
+    """请求论文页面并提取摘要
+
+    Args:
+        abs_session (requests.Session): 复用会话，建立连接
+        url (str): 论文URL
+        req_itv (float): 请求前等待的时间（秒）
+        extract_func (Callable[[str], str | None]): 出版社模块的 extract_abstract，
+            启用 --archive 时页面按该函数所在的模块保存
+
+    Returns:
+        str | None: 摘要
+    """
     abstract = None
 
     if url == "":
         return None
 
-    sleep(req_itv)
-
-    res = make_request(abs_session, url, headers=req_headers)
+    res = make_request(abs_session, url, headers=req_headers, req_itv=req_itv)
     # 请求失败
     if res is None:
         logger.warning(f"Request to {url} failed.")
         return None
 
-    if res.status_code != 200:
+    if default_retry_policy.is_permanent_status(res.status_code):
+        logger.warning(f"{url} does not exist, status code: {res.status_code}.")
+    elif res.status_code != 200:
         logger.warning(f"Cannot access {url} , status code: {res.status_code}.")
     else:
-        abs_soup = BeautifulSoup(res.text, "html.parser")
-        abs_tags = abs_soup.select(css_selector)
-        if abs_tags != []:
-            abstract = " ".join([abs_tag.get_text() for abs_tag in abs_tags])
-
-        # 额外检查，可能是多余的
-        if abstract == "":
-            abstract = None
+        archive_page(url, res.text, extract_func.__module__)
+        abstract = run_parse(extract_func, res.text)
+        if abstract is None:
+            # 可能是状态码为200的人机验证或拒绝访问页面，不在缓存的有效期内一直使用
+            invalidate_cached(url)
 
     return abstract
@@ -0,0 +1,108 @@
+import importlib.util
+import logging
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from src.settings import static_abstract_min_length
+
+# 可选依赖：安装了 lxml 时 bs4 使用 lxml 解析，安装了 selectolax 时用它提取文本，否则使用 html.parser
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+_has_lxml = importlib.util.find_spec("lxml") is not None
+_has_selectolax = LexborHTMLParser is not None
+
+_bs4_features = "html.parser"
+_use_selectolax = False
+
+
+def configure_parser(backend: str = "auto"):
+    """选择HTML解析器
+
+    Args:
+        backend (str): "auto" 使用已安装的最快的解析器；"html.parser"、"lxml" 或 "selectolax" 指定解析器。
+            selectolax 只用于 select_text/select_attr，构建 bs4 树时使用 lxml 或 html.parser。
+    """
+    global _bs4_features, _use_selectolax
+    if backend == "lxml" and not _has_lxml:
+        logger.warning("lxml is not installed, fallback to html.parser.")
+    if backend == "selectolax" and not _has_selectolax:
+        logger.warning("selectolax is not installed, fallback to bs4.")
+
+    _bs4_features = (
+        "lxml"
+        if _has_lxml and backend in ("auto", "lxml", "selectolax")
+        else "html.parser"
+    )
+    _use_selectolax = _has_selectolax and backend in ("auto", "selectolax")
+
+
+configure_parser()
+
+
+def parse_html(text: str, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    """用 bs4 解析HTML
+
+    Args:
+        text (str): HTML
+        parse_only (SoupStrainer | None): 只解析匹配的标签及其子树，跳过页面的其他部分
+
+    Returns:
+        BeautifulSoup: 解析结果
+    """
+    return BeautifulSoup(text, _bs4_features, parse_only=parse_only)
+
+
+def select_text(text: str, css_selector: str, html_parser: bool = False) -> list[str]:
+    """返回HTML中所有匹配CSS选择器的标签的文本
+
+    Args:
+        text (str): HTML
+        css_selector (str): CSS选择器
+        html_parser (bool): 总是使用 html.parser。选择器依赖 html.parser 保留的不规范嵌套
+            （例如 p 标签中的 p 标签）时设置，lxml 和 selectolax 会按HTML5的规则拆开这类嵌套。
+    """
+    if html_parser:
+        return [
+            tag.get_text()
+            for tag in BeautifulSoup(text, "html.parser").select(css_selector)
+        ]
+    if _use_selectolax:
+        return [node.text() for node in LexborHTMLParser(text).css(css_selector)]
+    return [tag.get_text() for tag in parse_html(text).select(css_selector)]
+
+
+def html_to_text(text: str) -> str:
+    """去除摘要中可能存在的HTML标签和多余的空白"""
+    if "<" in text:
+        text = parse_html(text).get_text(" ")
+    return " ".join(text.split())
+
+
+def is_truncated(abstract: str) -> bool:
+    """判断摘要是否被截断（如 og:description 常见的 "..." 结尾或长度过短）"""
+    abstract = abstract.rstrip()
+    return (
+        len(abstract) < static_abstract_min_length
+        or abstract.endswith("...")
+        or abstract.endswith("…")
+    )
+
+
+def join_text(text_list: list[str]) -> str | None:
+    """将 select_text 得到的多段文本用空格连接，没有文本时返回None"""
+    text = " ".join(text_list)
+    return text if text != "" else None
+
+
+def select_attr(text: str, css_selector: str, attr: str) -> str | None:
+    """返回HTML中第一个匹配CSS选择器的标签的属性值，没有匹配的标签或属性时返回None"""
+    if _use_selectolax:
+        node = LexborHTMLParser(text).css_first(css_selector)
+        return node.attributes.get(attr) if node is not None else None
+    tag = parse_html(text).select_one(css_selector)
+    return tag.get(attr) if tag is not None else None
@@ -0,0 +1,235 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.settings import http_cache_max_bytes, http_cache_path, http_cache_ttl
+
+logger = logging.getLogger(__name__)
+
+# 响应体已解压保存，这些响应头不再适用
+_dropped_headers = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class HttpCache:
+    """基于SQLite的持久化HTTP响应缓存
+
+    以请求URL为键保存状态码为200、内容类型符合预期的响应，响应体经zlib压缩。每个域名有各自的有效期（TTL），
+    过期的响应在带有 ETag / Last-Modified 时通过条件请求重新验证。缓存总大小超过上限时，
+    按最近访问时间淘汰（LRU）。
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_dict: dict[str, float]):
+        """
+        Args:
+            path (str): SQLite数据库文件路径
+            max_bytes (int): 压缩后响应体的总大小上限（字节）
+            ttl_dict (dict[str, float]): 域名到有效期（秒）的映射，"default" 为默认值
+        """
+        self.max_bytes = max_bytes
+        self.ttl_dict = ttl_dict
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                final_url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)"
+        )
+        self.conn.commit()
+        self.total_size = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get_ttl(self, url: str) -> float:
+        host = urlparse(url).netloc
+        return self.ttl_dict.get(host, self.ttl_dict.get("default", 0))
+
+    def lookup(self, url: str) -> tuple[requests.Response | None, bool, dict]:
+        """查询缓存
+
+        Args:
+            url (str): 请求URL
+
+        Returns:
+            tuple[requests.Response | None, bool, dict]: (缓存的响应，是否在有效期内，
+                重新验证时需要附加的条件请求头)。未命中时响应为None。
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT final_url, status, headers, encoding, body, etag, last_modified, stored_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None, False, {}
+            self.conn.execute(
+                "UPDATE responses SET last_access = ? WHERE url = ?",
+                (time.time(), url),
+            )
+            self.conn.commit()
+
+        final_url, status, headers, encoding, body, etag, last_modified, stored_at = row
+        res = requests.Response()
+        res.status_code = status
+        res.reason = "OK"
+        res.url = final_url
+        res.headers = CaseInsensitiveDict(json.loads(headers))
+        res.encoding = encoding
+        res._content = zlib.decompress(body)
+
+        fresh = time.time() - stored_at < self.get_ttl(url)
+        cond_headers = dict()
+        if etag is not None:
+            cond_headers["If-None-Match"] = etag
+        if last_modified is not None:
+            cond_headers["If-Modified-Since"] = last_modified
+        return res, fresh, cond_headers
+
+    def store(
+        self,
+        url: str,
+        res: requests.Response,
+        content_types: tuple[str, ...] | None = None,
+    ):
+        """保存状态码为200的响应
+
+        Args:
+            url (str): 请求URL
+            res (requests.Response): 响应
+            content_types (tuple[str, ...] | None): 预期的内容类型（不含参数，e.g. "text/html"），
+                响应的 Content-Type 不在其中时不保存。为None时不检查
+        """
+        if res.status_code != 200:
+            return
+        if content_types is not None:
+            content_type = res.headers.get("Content-Type", "")
+            if content_type.split(";", 1)[0].strip().lower() not in content_types:
+                logger.debug(
+                    f"Not caching {url} , unexpected content type {content_type!r}."
+                )
+                return
+        body = zlib.compress(res.content)
+        headers = {
+            k: v for k, v in res.headers.items() if k.lower() not in _dropped_headers
+        }
+        now = time.time()
+        with self.lock:
+            old_row = self.conn.execute(
+                "SELECT size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if old_row is not None:
+                self.total_size -= old_row[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    res.url,
+                    res.status_code,
+                    json.dumps(headers),
+                    res.encoding,
+                    body,
+                    len(body),
+                    res.headers.get("ETag"),
+                    res.headers.get("Last-Modified"),
+                    now,
+                    now,
+                ),
+            )
+            self.total_size += len(body)
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, url: str):
+        """条件请求返回304后，重置缓存响应的保存时间"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET stored_at = ?, last_access = ? WHERE url = ?",
+                (now, now, url),
+            )
+            self.conn.commit()
+
+    def invalidate(self, url: str):
+        """删除缓存的响应，例如出版社返回状态码200的人机验证页面，无法从中提取摘要时"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.conn.commit()
+            self.total_size -= row[0]
+        logger.debug(f"Invalidated cached response of {url}.")
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小降到上限的90%以下。调用者需持有锁。"""
+        if self.total_size <= self.max_bytes:
+            return
+        target_size = self.max_bytes * 0.9
+        evicted = 0
+        cursor = self.conn.execute(
+            "SELECT url, size FROM responses ORDER BY last_access ASC"
+        )
+        url_list = list()
+        for url, size in cursor:
+            if self.total_size <= target_size:
+                break
+            url_list.append((url,))
+            self.total_size -= size
+            evicted += 1
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", url_list)
+        logger.debug(f"Evicted {evicted} responses from HTTP cache.")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_cache: HttpCache | None = None
+_cache_enabled = http_cache_path is not None
+_cache_lock = threading.Lock()
+
+
+def configure_cache(enabled: bool):
+    """启用或禁用缓存。禁用时关闭已经打开的缓存数据库。"""
+    global _cache, _cache_enabled
+    _cache_enabled = enabled and http_cache_path is not None
+    if not _cache_enabled and _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def invalidate_cached(url: str):
+    """无法从响应中提取需要的内容时调用，下次运行重新请求，而不是在有效期内一直使用该响应"""
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(url)
+
+
+def get_cache() -> HttpCache | None:
+    """返回进程内共享的缓存对象，首次调用时打开数据库。缓存被禁用时返回None。"""
+    global _cache
+    if not _cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = HttpCache(http_cache_path, http_cache_max_bytes, http_cache_ttl)
+    return _cache
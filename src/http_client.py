@@ -0,0 +1,158 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from src.settings import http_pool_hosts, http_pool_maxsize
+
+# 可选依赖：--http2 需要 httpx 和 h2（uv sync --extra http2 或 pip install httpx[http2]）
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+def convert_response(httpx_res) -> requests.Response:
+    """httpx.Response -> requests.Response，包含耗时（elapsed），不包含跳转记录"""
+    res = requests.Response()
+    res.status_code = httpx_res.status_code
+    res.reason = httpx_res.reason_phrase
+    res.headers = CaseInsensitiveDict(httpx_res.headers)
+    res.url = str(httpx_res.url)
+    res.encoding = httpx_res.encoding
+    res.elapsed = httpx_res.elapsed
+    res._content = httpx_res.content
+    return res
+
+
+class Http2Session:
+    """基于 httpx 的 HTTP/2 会话，提供与 requests.Session 相同的 get/close 和响应 hook，返回 requests.Response
+
+    httpx.Client 可以在多个线程中同时使用，所有线程共用一个会话。
+    """
+
+    def __init__(self):
+        self.client = httpx.Client(
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=http_pool_hosts
+                * http_pool_maxsize["default"],
+            ),
+        )
+        # 与 requests.Session.hooks 相同，每次跳转和最终的响应都会调用
+        self.hooks = {"response": []}
+
+    def get(self, url: str, headers=None) -> requests.Response:
+        httpx_res = self.client.get(url, headers=headers)
+        # doi.org 等跳转的响应，用于按实际访问的域名记录耗时
+        history = [convert_response(hop) for hop in httpx_res.history]
+        res = convert_response(httpx_res)
+        res.history = history
+        for hop_res in history + [res]:
+            for hook in self.hooks["response"]:
+                hook(hop_res)
+        return res
+
+    def close(self):
+        self.client.close()
+
+
+def create_adapter_list() -> list[tuple[str, HTTPAdapter]]:
+    """按 settings.py 中的 http_pool_* 创建连接池，返回 [(URL前缀, HTTPAdapter)]"""
+    default_adapter = HTTPAdapter(
+        pool_connections=http_pool_hosts, pool_maxsize=http_pool_maxsize["default"]
+    )
+    adapter_list = [("http://", default_adapter), ("https://", default_adapter)]
+    for host, maxsize in http_pool_maxsize.items():
+        if host == "default":
+            continue
+        host_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=maxsize)
+        adapter_list.append((f"http://{host}/", host_adapter))
+        adapter_list.append((f"https://{host}/", host_adapter))
+    return adapter_list
+
+
+def create_requests_session(
+    adapter_list: list[tuple[str, HTTPAdapter]] | None = None,
+    cookie_jar: requests.cookies.RequestsCookieJar | None = None,
+) -> requests.Session:
+    """创建 requests 会话，挂载 adapter_list 中的连接池并使用 cookie_jar，未指定时新建"""
+    session = requests.Session()
+    if cookie_jar is not None:
+        session.cookies = cookie_jar
+    for prefix, adapter in adapter_list or create_adapter_list():
+        session.mount(prefix, adapter)
+    return session
+
+
+def create_http2_session() -> Http2Session:
+    return Http2Session()
+
+
+_http2_session: Http2Session | None = None
+_adapter_list: list[tuple[str, HTTPAdapter]] | None = None
+_cookie_jar: requests.cookies.RequestsCookieJar | None = None
+# close_client 后加1，各线程的会话随之失效
+_generation = 0
+_thread_local = threading.local()
+_use_http2 = False
+_session_lock = threading.Lock()
+
+
+def configure_client(http2: bool = False):
+    """设置是否使用 HTTP/2（--http2），未安装 httpx 时使用 requests"""
+    global _use_http2
+    if http2 and httpx is None:
+        logger.warning("httpx is not installed, fallback to HTTP/1.1 (requests).")
+    close_client()
+    _use_http2 = http2 and httpx is not None
+
+
+def get_session() -> requests.Session | Http2Session:
+    """返回当前线程使用的HTTP会话，首次调用时创建
+
+    所有非浏览器请求共用同一组连接池，保持长连接和cookie，每篇论文不再重新建立TCP和TLS连接。
+    requests.Session 不保证线程安全，每个线程使用自己的会话；这些会话挂载同一组 HTTPAdapter
+    （urllib3 的连接池可以在多个线程中同时使用）并共用一个 cookie jar（http.cookiejar 内部加锁）。
+    --http2 时所有线程共用一个 Http2Session。
+    """
+    global _http2_session, _adapter_list, _cookie_jar
+    with _session_lock:
+        if _use_http2:
+            if _http2_session is None:
+                _http2_session = create_http2_session()
+            return _http2_session
+        if _adapter_list is None:
+            _adapter_list = create_adapter_list()
+            _cookie_jar = requests.cookies.RequestsCookieJar()
+        adapter_list, cookie_jar, generation = _adapter_list, _cookie_jar, _generation
+
+    session = getattr(_thread_local, "session", None)
+    if session is None or _thread_local.generation != generation:
+        session = create_requests_session(adapter_list, cookie_jar)
+        _thread_local.session = session
+        _thread_local.generation = generation
+    return session
+
+
+def close_client():
+    global _http2_session, _adapter_list, _cookie_jar, _generation
+    with _session_lock:
+        if _http2_session is not None:
+            _http2_session.close()
+            _http2_session = None
+        if _adapter_list is not None:
+            # 各线程的会话不再使用，关闭共用的连接池即可
+            for adapter in {
+                id(adapter): adapter for _, adapter in _adapter_list
+            }.values():
+                adapter.close()
+            _adapter_list = None
+            _cookie_jar = None
+            _generation += 1
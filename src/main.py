@@ -1,21 +1,22 @@
 import argparse
 import asyncio
+import collections
+import dataclasses
+import functools
+import itertools
 import logging
+import os
 import pickle
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 
-import bibtexparser
-import bibtexparser.entrypoint
-import bibtexparser.library
-import bibtexparser.model
-import nodriver as nd
-import requests
 from rich.logging import RichHandler
-from rich.progress import (BarColumn, MofNCompleteColumn, Progress,
-                           TaskProgressColumn, TextColumn, TimeElapsedColumn,
-                           TimeRemainingColumn)
 
+import src.abstract_store as abstract_store
+import src.browser_manager as browser_manager
 import src.dblp as dblp
+import src.dblp_offline as dblp_offline
+import src.doi_lookup as doi_lookup_module
 import src.entry_acm as entry_acm
 import src.entry_elsevier as entry_elsevier
 import src.entry_ieee as entry_ieee
@@ -23,7 +24,29 @@ import src.entry_iospress as entry_iospress
 import src.entry_ndss as entry_ndss
 import src.entry_springer as entry_springer
 import src.entry_usenix as entry_usenix
-from src.settings import chrome_path, cj_pub_dict, cookie_path
+import src.http_cache as http_cache
+import src.metadata_store as metadata_store
+import src.metrics as metrics
+import src.page_archive as page_archive
+from src.bib_update import BibIndex, get_block_key
+from src.bib_writer import StreamingBibWriter, format_entry
+from src.checkpoint import CheckpointJournal
+from src.doi_lookup import lookup_abstracts
+from src.http_client import close_client, configure_client, get_session
+from src.manifest import HostScheduler, load_manifest
+from src.meta_extract import get_embedded_abstract
+from src.page_ready import log_ready_stats
+from src.parse_pool import (configure_parse_pool, run_parse_async,
+                            shutdown_parse_pool)
+from src.progress_bar import (advance_progress, start_progress, stop_progress,
+                              use_shared_progress)
+from src.rate_limit import configure_adaptive
+from src.request_wrap import get_host
+from src.resource_block import ResourceBlocker
+from src.settings import (bib_fsync_interval, cj_pub_dict,
+                          metadata_store_chunk_size, parse_queue_size,
+                          publisher_host)
+from src.tab_pool import TabPool
 
 
 def setup_logging():
@@ -69,6 +92,37 @@ publisher_module_dict = {
     "iospress": entry_iospress,
 }
 
+# 摘要来源 -> 提取代码的版本，摘要库中由旧版本提取的摘要会重新获取
+extractor_version_dict = {
+    publisher: module.extractor_version
+    for publisher, module in publisher_module_dict.items()
+}
+extractor_version_dict["openalex"] = doi_lookup_module.extractor_version
+extractor_version_dict["crossref"] = doi_lookup_module.extractor_version
+
+# 支持 --http-first 的出版社 -> 从静态HTML中提取摘要时使用的出版社专用提取函数
+static_extractor_dict = {
+    "ieee": entry_ieee.extract_metadata_blob,
+    "acm": None,
+    "elsevier": None,
+}
+
+
+@dataclass
+class CrawlOptions:
+    """所有会议/期刊共用的运行选项，由命令行参数决定"""
+
+    dblp_bulk: bool
+    dblp_workers: int
+    dblp_burst: int
+    resume: bool
+    tabs: int
+    block_resources: bool
+    http_first: bool
+    doi_lookup: bool
+    from_store: bool
+    update: bool
+
 
 @dataclass
 class JournalObj:
@@ -81,6 +135,7 @@ class JournalObj:
     from_pkl: str | None
     dblp_req_interval: float
     req_interval: float
+    options: CrawlOptions
 
 
 @dataclass
@@ -94,6 +149,63 @@ class ConferenceObj:
     from_pkl: str | None
     dblp_req_interval: float
     req_interval: float
+    options: CrawlOptions
+
+
+def load_existing_bib(entry: JournalObj | ConferenceObj) -> BibIndex | None:
+    """设置了 --update 时读取已有的bibtex文件并建立索引"""
+    if not entry.options.update:
+        return None
+    if not os.path.exists(entry.bib_fn):
+        logger.warning(f"{entry.bib_fn} does not exist, collect all papers.")
+        return None
+    return BibIndex(entry.bib_fn)
+
+
+def get_toc_content(
+    url: str,
+    type: str,
+    entry: JournalObj | ConferenceObj,
+    existing_bib: BibIndex | None = None,
+) -> Sequence:
+    """获取目录页中的论文元数据
+
+    设置了 --from-store 时从元数据数据库读取；设置了 --dblp-offline 时从本地索引读取，否则请求dblp。
+    设置了 --store 时，从dblp得到的每篇论文都写入元数据数据库。
+    设置了 --update 时，已有文件中的论文直接使用其中的bibtex，不再向dblp请求。
+    """
+    venue = entry.name
+    part = entry.year if isinstance(entry, ConferenceObj) else entry.volume
+    store = metadata_store.get_store()
+    if entry.options.from_store:
+        return store.get_papers(venue, part)
+
+    dblp_index = dblp_offline.get_index()
+    if dblp_index is not None:
+        entry_metadata_list = dblp_index.get_toc_content(url, type)
+        if store is not None:
+            store.add_all(venue, part, entry_metadata_list)
+        return entry_metadata_list
+
+    on_entry = None
+    if store is not None:
+        store.clear(venue, part)
+        on_entry = functools.partial(store.add, venue, part)
+    try:
+        return dblp.get_dblp_page_content(
+            url,
+            entry.dblp_req_interval,
+            type,
+            entry.options.dblp_bulk,
+            entry.options.dblp_workers,
+            entry.options.dblp_burst,
+            on_entry,
+            existing_bib.get_bibtex if existing_bib is not None else None,
+        )
+    finally:
+        # 提交最后不足 metadata_store_chunk_size 篇的论文，中断时已得到的论文也保留
+        if store is not None:
+            store.commit()
 
 
 def collect_conf_metadata(*, entry: ConferenceObj):
@@ -101,8 +213,9 @@ def collect_conf_metadata(*, entry: ConferenceObj):
     if conf_url is None:
         logger.error(f"Cannot get dblp URL for {entry.name}, {entry.year}")
         return []
-    entry_metadata_list = dblp.get_dblp_page_content(
-        conf_url, entry.dblp_req_interval, entry_type_in_url
+    existing_bib = load_existing_bib(entry)
+    entry_metadata_list = get_toc_content(
+        conf_url, entry_type_in_url, entry, existing_bib
     )
     logger.debug(f"Number of papers: {len(entry_metadata_list)}")
     if len(entry_metadata_list) <= 0:
@@ -113,26 +226,27 @@ def collect_conf_metadata(*, entry: ConferenceObj):
         pkl_filename = f"{entry.name}{entry.year}_dblp.pkl"
         logger.debug(f"Save collected dblp data to {pkl_filename}.")
         with open(pkl_filename, "wb") as f:
-            pickle.dump(entry_metadata_list, f)
+            pickle.dump(list(entry_metadata_list), f)
 
     if entry.need_abs:
-        nd.loop().run_until_complete(
+        browser_manager.run(
             collect_abstract(
                 entry.name,
                 entry_metadata_list,
                 entry.bib_fn,
                 entry.publisher,
                 entry.req_interval,
+                entry.options,
+                existing_bib,
             )
         )
     return entry_metadata_list
 
 
 def collect_journal_metadata(*, entry: JournalObj) -> list:
-    entry_metadata_list = dblp.get_dblp_page_content(
-        dblp.get_journal_url(entry.name, entry.volume),
-        entry.dblp_req_interval,
-        "journal",
+    existing_bib = load_existing_bib(entry)
+    entry_metadata_list = get_toc_content(
+        dblp.get_journal_url(entry.name, entry.volume), "journal", entry, existing_bib
     )
     logger.debug(f"Number of papers: {len(entry_metadata_list)}")
     if len(entry_metadata_list) <= 0:
@@ -143,172 +257,368 @@ def collect_journal_metadata(*, entry: JournalObj) -> list:
         pkl_filename = f"{entry.name}{entry.volume}_dblp.pkl"
         logger.debug(f"Save collected dblp data to {pkl_filename}.")
         with open(pkl_filename, "wb") as f:
-            pickle.dump(entry_metadata_list, f)
+            pickle.dump(list(entry_metadata_list), f)
 
     if entry.need_abs:
-        nd.loop().run_until_complete(
+        browser_manager.run(
             collect_abstract(
                 entry.name,
                 entry_metadata_list,
                 entry.bib_fn,
                 entry.publisher,
                 entry.req_interval,
+                entry.options,
+                existing_bib,
             )
         )
 
     return entry_metadata_list
 
 
+def iter_windows(entry_metadata_list: Sequence, size: int) -> Iterator[list]:
+    """按顺序每次取出至多 size 篇论文，entry_metadata_list 为 PaperSequence 时只遍历一次"""
+    iterator = iter(entry_metadata_list)
+    while window := list(itertools.islice(iterator, size)):
+        yield window
+
+
 async def collect_abstract_impl(
     entry_func,
-    library: bibtexparser.library.Library,
-    entry_metadata_list: list,
+    writer: StreamingBibWriter,
+    entry_metadata_list: Sequence,
     need_webdriver: bool,
     req_itv: float = 10,
     driver=None,
+    journal: CheckpointJournal | None = None,
+    tab_pool: TabPool | None = None,
+    http_first: bool = False,
+    doi_lookup: bool = False,
+    existing_bib: BibIndex | None = None,
 ):
-    progress = Progress(
-        TextColumn("{task.description}"),
-        TaskProgressColumn(),
-        BarColumn(),
-        MofNCompleteColumn(),
-        TimeElapsedColumn(),
-        TimeRemainingColumn(compact=True),
-        TextColumn("{task.fields[avg_sec_per_it]:>6.2f} s/it"),
-    )
-    progress.start()
-    task_id = progress.add_task(
-        "Collecting Abstracts", total=len(entry_metadata_list), avg_sec_per_it=0
-    )
-
-    for entry_metadata in entry_metadata_list:
-        if need_webdriver:
-            if entry_func == entry_iospress:
-                # special case for iospress
-                abs_session = requests.Session()
-                abstract = await entry_func.get_full_abstract(
-                    abs_session, entry_metadata[1], req_itv, driver
-                )
-                abs_session.close()
+    # e.g. src.entry_ieee -> ieee，作为摘要库中的来源
+    source = entry_func.__name__.rsplit(".entry_", 1)[-1]
+    store = abstract_store.get_abstract_store()
+
+    def save_abstract(entry_metadata: list, abstract: str | None, source: str = source):
+        # 完成后立即写入日志，不必等待前面的论文
+        if journal is not None:
+            journal.record(entry_metadata, abstract)
+        if store is not None and abstract is not None:
+            store.put(
+                entry_metadata[1], abstract, source, extractor_version_dict[source]
+            )
+
+    def is_done(entry_metadata: list, existing_block: str | None) -> bool:
+        if existing_block is not None:
+            return True
+        return journal is not None and journal.get_done(entry_metadata) is not None
+
+    progress, task_id = start_progress("Collecting Abstracts", len(entry_metadata_list))
+
+    async def get_abstract(
+        entry_metadata: list, driver, wait_first: bool = True
+    ) -> str | None:
+        with metrics.timed("paper", publisher=source):
+            if need_webdriver:
+                if entry_func == entry_iospress:
+                    # special case for iospress
+                    abstract = await entry_func.get_full_abstract(
+                        get_session(), entry_metadata[1], req_itv, driver
+                    )
+                else:
+                    abstract = await entry_func.get_full_abstract(
+                        entry_metadata[1], driver, req_itv, wait_first
+                    )
             else:
-                abstract = await entry_func.get_full_abstract(
-                    entry_metadata[1], driver, req_itv
+                # 在线程中发送请求，不阻塞同时运行的其他任务
+                abstract = await asyncio.to_thread(
+                    entry_func.get_full_abstract,
+                    get_session(),
+                    entry_metadata[1],
+                    req_itv,
                 )
-        else:
-            abs_session = requests.Session()
-            abstract = entry_func.get_full_abstract(
-                abs_session, entry_metadata[1], req_itv
+        save_abstract(entry_metadata, abstract)
+        return abstract
+
+    # 先请求静态页面的论文与标签页一样，最多 tab_pool.size 篇同时进行，各自按 req_itv 的间隔发送请求
+    static_semaphore = asyncio.Semaphore(tab_pool.size if tab_pool else 1)
+
+    async def get_abstract_http_first(entry_metadata: list) -> str | None:
+        sent = False
+        if entry_metadata[1] != "":
+            async with static_semaphore:
+                abstract, sent = await asyncio.to_thread(
+                    get_embedded_abstract,
+                    get_session(),
+                    entry_metadata[1],
+                    req_itv,
+                    static_extractor_dict[source],
+                    module_name=entry_func.__name__,
+                )
+            if abstract is not None:
+                save_abstract(entry_metadata, abstract)
+                return abstract
+        # 刚刚已经按请求间隔请求过该论文的静态页面时，浏览器打开页面前不再等待
+        return await tab_pool.run(
+            entry_metadata[1],
+            functools.partial(get_abstract, entry_metadata, wait_first=not sent),
+        )
+
+    use_static = http_first and source in static_extractor_dict
+
+    stored_count = 0
+    lookup_count = 0
+    lookup_total = 0
+
+    async def prepare_window(window: list, existing_list: list) -> list:
+        """返回窗口内每篇论文在摘要库或DOI查询中找到的摘要，没有找到时为None"""
+        nonlocal stored_count, lookup_count, lookup_total
+        known_list = [None] * len(window)
+        # 摘要库中已有的论文不再发送任何请求。摘要库已经写入磁盘，不再记入日志
+        if store is not None:
+            for idx, entry_metadata in enumerate(window):
+                if is_done(entry_metadata, existing_list[idx]) or not entry_metadata[1]:
+                    continue
+                known_list[idx] = store.get(entry_metadata[1], extractor_version_dict)
+                if known_list[idx] is not None:
+                    stored_count += 1
+
+        if doi_lookup:
+            # 再通过 OpenAlex/Crossref 批量查询摘要，找到的论文不再访问出版社网站
+            pending_idx_list = [
+                idx
+                for idx, entry_metadata in enumerate(window)
+                if known_list[idx] is None
+                and not is_done(entry_metadata, existing_list[idx])
+            ]
+            if not pending_idx_list:
+                return known_list
+            found_dict = await asyncio.to_thread(
+                lookup_abstracts, [window[idx] for idx in pending_idx_list]
             )
-            abs_session.close()
+            result_list = list()
+            for idx in pending_idx_list:
+                if window[idx][1] in found_dict:
+                    abstract, lookup_source = found_dict[window[idx][1]]
+                    known_list[idx] = abstract
+                    result_list.append((window[idx], abstract, lookup_source))
+            # 整批结果一次写入：有摘要库时写入摘要库，否则记入日志
+            if store is not None:
+                store.put_many(
+                    [
+                        (
+                            entry_metadata[1],
+                            abstract,
+                            lookup_source,
+                            extractor_version_dict[lookup_source],
+                        )
+                        for entry_metadata, abstract, lookup_source in result_list
+                    ]
+                )
+            elif journal is not None:
+                journal.record_many(
+                    [
+                        (entry_metadata, abstract)
+                        for entry_metadata, abstract, _ in result_list
+                    ]
+                )
+            lookup_count += len(found_dict)
+            lookup_total += len(pending_idx_list)
+        return known_list
+
+    def schedule_window(window: list, existing_list: list, known_list: list) -> list:
+        # 使用多个标签页时，窗口内的论文同时开始排队，由标签页数量和域名并发上限控制实际的并发数。
+        # 结果仍按原顺序写入bibtex文件。
+        abstract_task_list = list()
+        for entry_metadata, existing_block, known_abstract in zip(
+            window, existing_list, known_list
+        ):
+            done_record = journal.get_done(entry_metadata) if journal else None
+            if existing_block is not None:
+                abstract_task_list.append(None)
+            elif known_abstract is not None:
+                abstract_task_list.append(known_abstract)
+            elif done_record is not None:
+                abstract_task_list.append(done_record["abstract"])
+            elif tab_pool is not None and use_static:
+                abstract_task_list.append(
+                    asyncio.ensure_future(get_abstract_http_first(entry_metadata))
+                )
+            elif tab_pool is not None:
+                abstract_task_list.append(
+                    asyncio.ensure_future(
+                        tab_pool.run(
+                            entry_metadata[1],
+                            functools.partial(get_abstract, entry_metadata),
+                        )
+                    )
+                )
+            else:
+                abstract_task_list.append(None)
+        return abstract_task_list
+
+    # 解析bibtex、加入摘要的工作在解析进程中进行（--parse-workers），与等待后面论文的摘要同时进行。
+    # 至多 parse_queue_size 篇论文排队，按原顺序写入文件
+    format_queue = collections.deque()
+
+    async def format_timed(entry_metadata: list, abstract: str | None):
+        with metrics.timed("bibtex_format", publisher=source):
+            return await run_parse_async(format_entry, entry_metadata[2], abstract)
+
+    def write_formatted(entry_metadata: list, key: str | None, text: str | None):
         # if parse failed, the number of entries in library is 0, print warning and process the next paper.
-        tmp_library = bibtexparser.entrypoint.parse_string(entry_metadata[2])
-        if len(tmp_library.entries) != 1:
+        if text is None:
             logger.warning(
                 f'Cannot parse bibtex string to entry of paper "{entry_metadata[0]}", string is: {repr(entry_metadata[2])}.'
             )
-            continue
-
-        if abstract is not None:
-            abstract_field = bibtexparser.model.Field("abstract", repr(abstract)[1:-1])
-            tmp_library.entries[0].set_field(abstract_field)
+            return
+        writer.write_raw(text, key, entry_metadata[2])
+        advance_progress(progress, task_id, get_host(entry_metadata[1] or ""))
+
+    async def write_next():
+        entry_metadata, format_task = format_queue.popleft()
+        if isinstance(format_task, asyncio.Future):
+            key, text = await format_task
         else:
-            logger.warning(f'Cannot collect abstract of paper "{entry_metadata[0]}".')
-        library.add(tmp_library.blocks)
-
-        # set speed display
-        task_fields = progress.tasks[task_id]
-        avg_speed = (
-            task_fields.elapsed / (task_fields.completed + 1)
-            if task_fields.elapsed
-            else 0
-        )
-        progress.update(task_id, advance=1, avg_sec_per_it=avg_speed)
-
-    progress.stop()
-    return library
+            key, text = format_task
+        write_formatted(entry_metadata, key, text)
+
+    abstract_task_list = list()
+    try:
+        # 每次处理 metadata_store_chunk_size 篇论文：查询摘要库和DOI、开始请求、按顺序写入。
+        # 同时排队的请求和内存中的论文数量与整卷的论文数量无关
+        for window in iter_windows(entry_metadata_list, metadata_store_chunk_size):
+            # --update 时已有摘要的条目原样写回。每篇论文只与已有文件对应一次
+            existing_list = [
+                existing_bib.match(entry_metadata) if existing_bib is not None else None
+                for entry_metadata in window
+            ]
+            known_list = await prepare_window(window, existing_list)
+            abstract_task_list = schedule_window(window, existing_list, known_list)
+            for entry_metadata, existing_block, abstract_task in zip(
+                window, existing_list, abstract_task_list
+            ):
+                if existing_block is not None:
+                    format_queue.append(
+                        (
+                            entry_metadata,
+                            (get_block_key(existing_block), existing_block),
+                        )
+                    )
+                    metrics.inc("papers_total", publisher=source, result="existing")
+                else:
+                    if isinstance(abstract_task, asyncio.Future):
+                        abstract = await abstract_task
+                    elif abstract_task is not None:
+                        abstract = abstract_task
+                    else:
+                        abstract = await get_abstract(entry_metadata, driver)
+                    if abstract is None:
+                        logger.warning(
+                            f'Cannot collect abstract of paper "{entry_metadata[0]}".'
+                        )
+                    metrics.inc(
+                        "papers_total",
+                        publisher=source,
+                        result="no_abstract" if abstract is None else "abstract",
+                    )
+                    format_queue.append(
+                        (
+                            entry_metadata,
+                            asyncio.ensure_future(
+                                format_timed(entry_metadata, abstract)
+                            ),
+                        )
+                    )
+                while len(format_queue) >= parse_queue_size:
+                    await write_next()
+        while format_queue:
+            await write_next()
+    finally:
+        for abstract_task in abstract_task_list:
+            if isinstance(abstract_task, asyncio.Future):
+                abstract_task.cancel()
+        for _, format_task in format_queue:
+            if isinstance(format_task, asyncio.Future):
+                format_task.cancel()
+        stop_progress(progress, task_id)
+    if store is not None:
+        logger.info(f"Abstracts found in abstract store: {stored_count}.")
+    if doi_lookup:
+        logger.info(f"Abstracts found by DOI lookup: {lookup_count}/{lookup_total}.")
 
 
 async def collect_abstract(
     name: str,
-    entry_metadata_list: list,
+    entry_metadata_list: Sequence,
     export_bib_path: str,
     publisher: str,
-    req_itv: float = 10,
+    req_itv: float,
+    options: CrawlOptions,
+    existing_bib: BibIndex | None = None,
 ):
-    library = bibtexparser.library.Library()
-
     logger.debug(f"Publisher: {publisher}.")
 
+    if publisher not in publisher_module_dict:
+        logger.error("Invalid publisher.")
+        return
+
+    # 每完成一篇论文就写入日志，中断后可通过 --resume 继续
+    journal = CheckpointJournal(f"{export_bib_path}.journal.jsonl", options.resume)
+    # 每完成一篇论文就追加到bibtex文件；恢复运行时，已完成的论文从日志中重新写入
+    # --update 时先写入临时文件，完成后替换原文件
+    bib_path = export_bib_path
+    if existing_bib is not None:
+        bib_path = f"{export_bib_path}.update"
+    writer = StreamingBibWriter(bib_path, bib_fsync_interval)
+    if existing_bib is not None and existing_bib.preamble:
+        writer.write_raw(existing_bib.preamble)
+    blocker = ResourceBlocker(publisher) if options.block_resources else None
+
     match publisher:
-        case "ieee":
-            browser_config = nd.Config(
-                headless=False,
-                user_data_dir=cookie_path,
-                browser_executable_path=chrome_path,
-                browser_args=["--disable-gpu"],
-            )
-            browser = await nd.start(config=browser_config)
-            library = await collect_abstract_impl(
-                entry_ieee,
-                library,
+        case "ieee" | "elsevier" | "iospress" | "acm":
+            # 共用的浏览器在整个进程中只启动一次，处理完本卷/会议后不关闭。
+            # 标签页在第一次需要时才打开，--http-first 时可能完全不需要浏览器
+            tab_pool = TabPool(options.tabs, blocker)
+            await collect_abstract_impl(
+                publisher_module_dict[publisher],
+                writer,
                 entry_metadata_list,
                 need_webdriver=True,
                 req_itv=req_itv,
-                driver=browser,
-            )
-            browser.stop()
-        case "elsevier" | "iospress" | "acm":
-            browser_config = nd.Config(
-                headless=False,
-                user_data_dir=cookie_path,
-                browser_executable_path=chrome_path,
-                browser_args=["--disable-gpu"],
+                journal=journal,
+                tab_pool=tab_pool,
+                http_first=options.http_first,
+                doi_lookup=options.doi_lookup,
+                existing_bib=existing_bib,
             )
-            browser = await nd.start(config=browser_config)
-            if publisher == "elsevier":
-                library = await collect_abstract_impl(
-                    entry_elsevier,
-                    library,
-                    entry_metadata_list,
-                    need_webdriver=True,
-                    req_itv=req_itv,
-                    driver=browser,
-                )
-            elif publisher == "iospress":
-                library = await collect_abstract_impl(
-                    entry_iospress,
-                    library,
-                    entry_metadata_list,
-                    need_webdriver=True,
-                    req_itv=req_itv,
-                    driver=browser,
-                )
-            elif publisher == "acm":
-                library = await collect_abstract_impl(
-                    entry_acm,
-                    library,
-                    entry_metadata_list,
-                    need_webdriver=True,
-                    req_itv=req_itv,
-                    driver=browser,
-                )
-            browser.stop()
+            await tab_pool.close()
         case _:
-            selected_module = publisher_module_dict.get(publisher)
-            if selected_module is not None:
-                library = await collect_abstract_impl(
-                    selected_module,
-                    library,
-                    entry_metadata_list,
-                    need_webdriver=False,
-                    req_itv=req_itv,
-                )
-            else:
-                logger.error("Invalid publisher.")
-                return
+            await collect_abstract_impl(
+                publisher_module_dict[publisher],
+                writer,
+                entry_metadata_list,
+                need_webdriver=False,
+                req_itv=req_itv,
+                journal=journal,
+                doi_lookup=options.doi_lookup,
+                existing_bib=existing_bib,
+            )
 
-    logger.debug(f"entries in bibtex db: {len(library.entries)}.")
-    bibtexparser.entrypoint.write_file(export_bib_path, library, encoding="utf-8")
+    if existing_bib is not None:
+        existing_bib.log_diff()
+        # 不在目录页中的已有条目保留在文件末尾
+        for block in existing_bib.unmatched_blocks():
+            writer.write_raw(block, get_block_key(block))
+    writer.close()
+    if existing_bib is not None:
+        os.replace(bib_path, export_bib_path)
+    logger.debug(f"entries in bibtex db: {writer.entry_count}.")
+    if blocker is not None:
+        blocker.log_stats()
+    log_ready_stats()
+    metrics.write_metrics()
+    journal.remove()
 
 
 def collect_abstract_from_dblp_pkl(*, entry: JournalObj | ConferenceObj):
@@ -316,24 +626,33 @@ def collect_abstract_from_dblp_pkl(*, entry: JournalObj | ConferenceObj):
         logger.error("from_pkl is None.")
         return
 
+    store = metadata_store.get_store()
+    if store is not None:
+        # 导入元数据数据库，之后可以用 --from-store 读取
+        part = entry.year if isinstance(entry, ConferenceObj) else entry.volume
+        count = metadata_store.import_pickle(store, entry.from_pkl, entry.name, part)
+        logger.debug(f"Imported {count} papers from {entry.from_pkl} into the store.")
     with open(entry.from_pkl, "rb") as f:
         entry_metadata_list = pickle.load(f)
-    nd.loop().run_until_complete(
+    browser_manager.run(
         collect_abstract(
             entry.name,
             entry_metadata_list,
             entry.bib_fn,
             entry.publisher,
             entry.req_interval,
+            entry.options,
+            load_existing_bib(entry),
         )
     )
 
 
 def parse_args(parser: argparse.ArgumentParser, argv: list[str] | None):
-    parser.add_argument("--name", "-n", type=str, required=True, help="会议/期刊标识")
+    # 设置 --manifest 时不需要 --name 和 --year/--volume，在解析后检查
+    parser.add_argument("--name", "-n", type=str, default=None, help="会议/期刊标识")
 
     # conference or journal
-    grp1 = parser.add_mutually_exclusive_group(required=True)
+    grp1 = parser.add_mutually_exclusive_group()
     grp1.add_argument(
         "--year", "-y", type=str, default=None, help="会议举办时间（年）e.g. 2023"
     )
@@ -376,6 +695,96 @@ def parse_args(parser: argparse.ArgumentParser, argv: list[str] | None):
     parser.add_argument(
         "--interval", "-t", type=float, default=10, help="收集摘要的请求发送间隔（秒）"
     )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        default=False,
+        help="根据服务器的响应自动调整每个域名的请求间隔：以 --interval/--dblp-interval 为初始值，遇到429/503、人机验证或响应变慢时成倍延长，响应正常时逐渐缩短，默认不低于初始值。参数见 settings.py 中的 adaptive_*",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=None,
+        help="设置 --adaptive 时请求间隔的下限（秒）。默认为 --interval/--dblp-interval 本身，即只在被限流时延长间隔；设置为更小的值时，响应正常的域名的间隔可以缩短到该值",
+    )
+    parser.add_argument(
+        "--no-bulk",
+        action="store_true",
+        default=False,
+        help="不通过dblp目录的批量导出获取bibtex，改为逐篇请求每篇论文的bibtex页面",
+    )
+    parser.add_argument(
+        "--dblp-workers",
+        type=int,
+        default=1,
+        help="逐篇请求dblp bibtex时同时进行的请求数量上限",
+    )
+    parser.add_argument(
+        "--dblp-burst",
+        type=int,
+        default=1,
+        help="逐篇请求dblp bibtex时允许连续发出的最大请求数，长期平均速率仍由 --dblp-interval 决定",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=False,
+        help="不使用持久化HTTP响应缓存（位置和有效期见 settings.py 中的 http_cache_*）",
+    )
+    parser.add_argument(
+        "--no-abstract-store",
+        action="store_true",
+        default=False,
+        help="不使用以DOI为键的全局摘要库（位置见 settings.py 中的 abstract_store_path）。默认情况下摘要库中已有的论文不再请求",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="从上次中断的位置继续收集摘要，跳过日志文件 [bibtex文件名].journal.jsonl 中已经完成的论文",
+    )
+    parser.add_argument(
+        "--tabs",
+        type=int,
+        default=1,
+        help="使用浏览器收集摘要时（ieee, acm, elsevier, iospress）同时打开的标签页数量。每个标签页各自按 --interval 的间隔发送请求",
+    )
+    parser.add_argument(
+        "--block-resources",
+        action="store_true",
+        default=False,
+        help="在浏览器标签页中屏蔽图片、字体、视频和统计脚本等不需要的请求，规则见 settings.py 中的 block_*",
+    )
+    parser.add_argument(
+        "--http-first",
+        action="store_true",
+        default=False,
+        help="对于使用浏览器的出版社（ieee, acm, elsevier），先直接请求论文页面，从静态HTML的 meta 标签、JSON-LD 或内联元数据中提取摘要，失败或摘要被截断时再使用浏览器",
+    )
+    parser.add_argument(
+        "--doi-lookup",
+        action="store_true",
+        default=False,
+        help="收集摘要前，先根据 doi.org 链接中的DOI通过 OpenAlex 和 Crossref 批量查询摘要，只有查不到的论文才访问出版社网站",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="解析HTML和bibtex的进程数量。大于0时解析在独立的进程中进行，与网络请求同时进行，大型目录页拆分后并行解析。默认为0，在发送请求的线程中解析",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=False,
+        help="不使用浏览器的请求使用 HTTP/2，需要安装 httpx[http2]",
+    )
+    parser.add_argument(
+        "--browser-endpoint",
+        type=str,
+        default=None,
+        help="连接到已经运行的 Chrome 调试端口（host:port，e.g. 127.0.0.1:9222），而不是启动新的 Chrome。Chrome 需以 --remote-debugging-port 启动",
+    )
     # 保存不含摘要的bibtex不在设计意图内
     parser.add_argument(
         "--save",
@@ -384,9 +793,93 @@ def parse_args(parser: argparse.ArgumentParser, argv: list[str] | None):
         default=None,
         help="bibtex文件的保存位置，默认是[name][year].bib, 对于期刊，该选项只支持volume为数字的输入（e.g. -u 72），不支持多卷的输入（e.g. -u 72-79）",
     )
+    parser.add_argument(
+        "--update",
+        type=str,
+        default=None,
+        help="增量更新已有的bibtex文件：按dblp key和DOI与dblp目录页比较，只获取新增论文和缺少摘要的论文，合并后写回该文件。不支持多卷的输入（e.g. -u 72-79）",
+    )
+
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="元数据数据库（SQLite）的位置。设置后从dblp得到的每篇论文都写入数据库，同时设置 --from-pkl 时导入pickle文件",
+    )
+    parser.add_argument(
+        "--from-store",
+        action="store_true",
+        default=False,
+        help="从 --store 指定的元数据数据库读取论文元数据并收集摘要，不访问dblp。支持多卷的输入（e.g. -u 72-79）。同时设置 --save-pkl (-e) 时导出为pickle文件",
+    )
+    parser.add_argument(
+        "--dblp-offline",
+        type=str,
+        default=None,
+        help="从本地的dblp索引（由 --build-dblp-index 生成的SQLite文件）读取论文元数据，不访问dblp",
+    )
+    parser.add_argument(
+        "--build-dblp-index",
+        type=str,
+        default=None,
+        help="读取dblp的XML数据（https://dblp.org/xml/ 中的 dblp.xml.gz），在 --dblp-offline 指定的位置建立索引后退出",
+    )
+
+    parser.add_argument(
+        "--archive",
+        type=str,
+        default=None,
+        help="页面库（SQLite）的位置。设置后保存每个出版社页面的原始HTML（浏览器出版社保存渲染后的DOM），按内容去重并压缩，记录DOI和获取时间",
+    )
+    parser.add_argument(
+        "--reextract",
+        action="store_true",
+        default=False,
+        help="不访问网络，用当前的提取代码重新提取 --archive 页面库中每篇论文最近一次获取的页面，结果写入摘要库后退出。使用 --parse-workers 个进程，未设置时使用所有CPU核心",
+    )
+
+    parser.add_argument(
+        "--manifest",
+        "-m",
+        type=str,
+        default=None,
+        help="批量爬取清单文件（TOML/JSON），列出多个会议年份和期刊卷号。不同域名（dblp 和各出版社）的任务同时运行，同一域名的任务依次运行。格式见 src/manifest.py",
+    )
+
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        default=None,
+        help="指标文件的位置。记录各阶段（请求、限速等待、浏览器导航、页面就绪、提取、bibtex格式化）按域名/出版社的耗时分布，以及请求数、重试次数和缓存命中率，每处理完一卷/会议及运行结束时写入。以 .json 结尾时输出JSON摘要，否则输出 Prometheus textfile",
+    )
 
     args = parser.parse_args(argv)
 
+    if args.from_store and args.store is None:
+        parser.error("--from-store requires --store")
+    if args.update is not None:
+        if args.save is not None:
+            parser.error("--update cannot be set together with --save (-s)")
+        if args.no_abs:
+            parser.error("--update cannot be set together with --no-abs")
+        if args.manifest is not None:
+            parser.error("--update cannot be set together with --manifest (-m)")
+    if args.from_store and args.from_pkl is not None:
+        parser.error("--from-store cannot be set together with --from-pkl (-f)")
+    if args.reextract:
+        if args.archive is None:
+            parser.error("--reextract requires --archive")
+        if args.no_abstract_store:
+            parser.error("--reextract cannot be set together with --no-abstract-store")
+    if args.build_dblp_index is not None:
+        if args.dblp_offline is None:
+            parser.error("--build-dblp-index requires --dblp-offline")
+    elif args.manifest is None and not args.reextract:
+        if args.name is None:
+            parser.error("the following arguments are required: --name/-n")
+        if args.year is None and args.volume is None:
+            parser.error("one of the arguments --year/-y --volume/-u is required")
+
     return args
 
 
@@ -434,6 +927,7 @@ def crawl_journal(
     from_pkl: str | None,
     dblp_req_itv: float,
     req_itv: float,
+    options: CrawlOptions,
 ):
     # format: 19
     if volume.isdigit():
@@ -451,6 +945,7 @@ def crawl_journal(
             from_pkl=from_pkl,
             dblp_req_interval=dblp_req_itv,
             req_interval=req_itv,
+            options=options,
         )
         logger.debug(f"journal_entry: {journal_entry}")
         if journal_entry.from_pkl is None:
@@ -477,6 +972,11 @@ def crawl_journal(
             '--from-pkl (-f) is not compatible with "72-79" format of volume parameter.'
         )
         exit(1)
+    if options.update:
+        logger.error(
+            '--update is not compatible with "72-79" format of volume parameter.'
+        )
+        exit(1)
 
     journal_entry = JournalObj(
         name=name,
@@ -488,6 +988,7 @@ def crawl_journal(
         from_pkl=from_pkl,
         dblp_req_interval=dblp_req_itv,
         req_interval=req_itv,
+        options=options,
     )
 
     for vol in range(start_vol, end_vol + 1):
@@ -508,6 +1009,7 @@ def crawl_conference(
     from_pkl: str | None,
     dblp_req_itv: float,
     req_itv: float,
+    options: CrawlOptions,
 ):
     # Conference
     if bib_fn is None:
@@ -525,6 +1027,7 @@ def crawl_conference(
         from_pkl=from_pkl,
         dblp_req_interval=dblp_req_itv,
         req_interval=req_itv,
+        options=options,
     )
     logger.debug(f"conference_entry: {conference_entry}")
     if from_pkl is None:
@@ -537,6 +1040,83 @@ def crawl_conference(
         collect_abstract_from_dblp_pkl(entry=conference_entry)
 
 
+async def crawl_manifest_impl(entry_list: list[JournalObj | ConferenceObj]):
+    scheduler = HostScheduler()
+
+    async def crawl_entry(entry: JournalObj | ConferenceObj):
+        # dblp 阶段与摘要阶段分别在 dblp 和出版社域名的队列中执行
+        metadata_entry = dataclasses.replace(entry, need_abs=False)
+        if isinstance(entry, ConferenceObj):
+            collect_func = functools.partial(
+                collect_conf_metadata, entry=metadata_entry
+            )
+        else:
+            collect_func = functools.partial(
+                collect_journal_metadata, entry=metadata_entry
+            )
+        try:
+            entry_metadata_list = await scheduler.submit(
+                "dblp", asyncio.to_thread, collect_func
+            )
+            if entry.need_abs and len(entry_metadata_list) > 0:
+                await scheduler.submit(
+                    publisher_host[entry.publisher],
+                    collect_abstract,
+                    entry.name,
+                    entry_metadata_list,
+                    entry.bib_fn,
+                    entry.publisher,
+                    entry.req_interval,
+                    entry.options,
+                    load_existing_bib(entry),
+                )
+        except Exception:
+            logger.exception(f"Failed to crawl {entry.bib_fn}.")
+
+    await asyncio.gather(*(crawl_entry(entry) for entry in entry_list))
+    await scheduler.close()
+
+
+def crawl_manifest(
+    *,
+    manifest_path: str,
+    need_abs: bool,
+    save_pkl: bool,
+    dblp_req_itv: float,
+    req_itv: float,
+    options: CrawlOptions,
+):
+    entry_list = list()
+    for job in load_manifest(manifest_path):
+        name = job["name"]
+        publisher = job.get("publisher", cj_pub_dict.get(name))
+        if publisher not in publisher_host:
+            logger.error(f"Cannot find publisher of {name}, skipped.")
+            continue
+        common_kwargs = dict(
+            name=name,
+            publisher=publisher,
+            need_abs=need_abs and not job.get("no_abs", False),
+            save_pkl=save_pkl,
+            bib_fn=job["save"],
+            from_pkl=None,
+            dblp_req_interval=job.get("dblp_interval", dblp_req_itv),
+            req_interval=job.get("interval", req_itv),
+            options=options,
+        )
+        if job["year"] is not None:
+            entry_list.append(ConferenceObj(year=job["year"], **common_kwargs))
+        else:
+            entry_list.append(JournalObj(volume=job["volume"], **common_kwargs))
+
+    # 多个任务同时运行，共用一个进度条
+    use_shared_progress(True)
+    try:
+        browser_manager.run(crawl_manifest_impl(entry_list))
+    finally:
+        use_shared_progress(False)
+
+
 def main(argv: list[str] | None):
     parser = argparse.ArgumentParser(description="Collect paper metadata.")
 
@@ -552,6 +1132,66 @@ def main(argv: list[str] | None):
     dblp_req_itv: float = args.dblp_interval
     # 收集摘要的发送请求时间间隔
     req_itv: float = args.interval
+    options = CrawlOptions(
+        dblp_bulk=not args.no_bulk,
+        dblp_workers=args.dblp_workers,
+        dblp_burst=args.dblp_burst,
+        resume=args.resume,
+        tabs=args.tabs,
+        block_resources=args.block_resources,
+        http_first=args.http_first,
+        doi_lookup=args.doi_lookup,
+        from_store=args.from_store,
+        update=args.update is not None,
+    )
+
+    if args.build_dblp_index is not None:
+        dblp_offline.build_index(args.build_dblp_index, args.dblp_offline)
+        return
+
+    http_cache.configure_cache(not args.no_cache)
+    dblp_offline.configure_index(args.dblp_offline)
+    metadata_store.configure_store(args.store)
+    abstract_store.configure_abstract_store(not args.no_abstract_store)
+    configure_adaptive(args.adaptive, args.min_interval)
+    configure_client(args.http2)
+    configure_parse_pool(args.parse_workers)
+    page_archive.configure_archive(args.archive)
+    browser_manager.configure_browser(args.browser_endpoint)
+    metrics.configure_metrics(args.metrics_out)
+
+    if args.reextract:
+        configure_parse_pool(args.parse_workers or os.cpu_count() or 1)
+        try:
+            page_archive.reextract_archive(
+                abstract_store.get_abstract_store(),
+                {
+                    publisher: module.extract_abstract
+                    for publisher, module in publisher_module_dict.items()
+                },
+                extractor_version_dict,
+            )
+        finally:
+            shutdown_parse_pool()
+            metrics.write_metrics()
+        return
+
+    if args.manifest is not None:
+        try:
+            crawl_manifest(
+                manifest_path=args.manifest,
+                need_abs=need_abs,
+                save_pkl=save_pkl,
+                dblp_req_itv=dblp_req_itv,
+                req_itv=req_itv,
+                options=options,
+            )
+        finally:
+            browser_manager.shutdown()
+            close_client()
+            shutdown_parse_pool()
+            metrics.write_metrics()
+        return
 
     publisher = validate_publisher(args.publisher, name, from_pkl)
 
@@ -559,29 +1199,38 @@ def main(argv: list[str] | None):
         logger.error("--no-abs cannot be set together with --from-pkl (-f).")
         exit(1)
 
-    if year is None:
-        # Journal
-        volume: str = args.volume
-        crawl_journal(
-            name=name,
-            volume=volume,
-            publisher=publisher,
-            need_abs=need_abs,
-            save_pkl=save_pkl,
-            bib_fn=args.save,
-            from_pkl=from_pkl,
-            dblp_req_itv=dblp_req_itv,
-            req_itv=req_itv,
-        )
-    else:
-        crawl_conference(
-            name=name,
-            year=year,
-            publisher=publisher,
-            need_abs=need_abs,
-            save_pkl=save_pkl,
-            bib_fn=args.save,
-            from_pkl=from_pkl,
-            dblp_req_itv=dblp_req_itv,
-            req_itv=req_itv,
-        )
+    # 所有卷/会议共用一个浏览器，结束（包括 exit()）时关闭
+    try:
+        if year is None:
+            # Journal
+            volume: str = args.volume
+            crawl_journal(
+                name=name,
+                volume=volume,
+                publisher=publisher,
+                need_abs=need_abs,
+                save_pkl=save_pkl,
+                bib_fn=args.save or args.update,
+                from_pkl=from_pkl,
+                dblp_req_itv=dblp_req_itv,
+                req_itv=req_itv,
+                options=options,
+            )
+        else:
+            crawl_conference(
+                name=name,
+                year=year,
+                publisher=publisher,
+                need_abs=need_abs,
+                save_pkl=save_pkl,
+                bib_fn=args.save or args.update,
+                from_pkl=from_pkl,
+                dblp_req_itv=dblp_req_itv,
+                req_itv=req_itv,
+                options=options,
+            )
+    finally:
+        browser_manager.shutdown()
+        close_client()
+        shutdown_parse_pool()
+        metrics.write_metrics()
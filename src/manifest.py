@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import tomllib
+
+logger = logging.getLogger(__name__)
+
+
+def expand_volumes(volumes) -> list[str]:
+    """将 "16-18"、16、["16", "18-19"] 等格式展开为卷号列表"""
+    if not isinstance(volumes, list):
+        volumes = [volumes]
+    volume_list = list()
+    for volume in volumes:
+        volume = str(volume)
+        if "-" in volume:
+            start_vol, end_vol = volume.split("-", 1)
+            volume_list.extend(str(v) for v in range(int(start_vol), int(end_vol) + 1))
+        else:
+            volume_list.append(volume)
+    return volume_list
+
+
+def load_manifest(path: str) -> list[dict]:
+    """读取批量爬取的清单文件（TOML 或 JSON），展开为每个会议年份/期刊卷一个任务
+
+    清单格式（TOML）::
+
+        [defaults]        # 可选，所有条目共用的设置
+        interval = 8
+
+        [[venue]]
+        name = "sp"
+        years = [2022, 2023]   # 或 year = 2023
+
+        [[venue]]
+        name = "tifs"
+        volumes = "16-18"      # 或 volume = 16，或 ["16", "18-19"]
+        publisher = "ieee"     # 可选，默认使用 settings.cj_pub_dict
+
+    条目中还可以设置 dblp_interval、interval、no_abs 以及 save（输出的bibtex文件名）。
+    save 中可以使用 {name}、{year}、{volume}，e.g. save = "{name}{year}_full.bib"；
+    没有这些占位符的 save 只能用于展开为单个年份/卷的条目，不能写在 [defaults] 中，
+    否则多个任务会写入同一个文件和日志。
+
+    Args:
+        path (str): 清单文件路径，扩展名为 .json 时按 JSON 解析，否则按 TOML 解析
+
+    Returns:
+        list[dict]: 任务列表，每个任务包含 name、year 或 volume 之一、save（各不相同），和条目中的其他设置
+    """
+    with open(path, "rb") as f:
+        if path.endswith(".json"):
+            manifest = json.load(f)
+        else:
+            manifest = tomllib.load(f)
+
+    defaults = manifest.get("defaults", {})
+    job_list = list()
+    save_set = set()
+    for venue in manifest.get("venue", []):
+        save_in_defaults = "save" in defaults and "save" not in venue
+        venue = {**defaults, **venue}
+        settings = {
+            k: v
+            for k, v in venue.items()
+            if k not in ("year", "years", "volume", "volumes")
+        }
+        if "year" in venue or "years" in venue:
+            years = venue.get("years", [venue.get("year")])
+            venue_job_list = [
+                {**settings, "year": str(year), "volume": None} for year in years
+            ]
+        elif "volume" in venue or "volumes" in venue:
+            venue_job_list = [
+                {**settings, "year": None, "volume": volume}
+                for volume in expand_volumes(venue.get("volumes", venue.get("volume")))
+            ]
+        else:
+            logger.error(f"No year or volume for {venue.get('name')} in manifest.")
+            continue
+
+        save = venue.get("save")
+        if save is not None:
+            if "{" not in save and (save_in_defaults or len(venue_job_list) > 1):
+                logger.error(
+                    f'"save = {save}" of {venue.get("name")} would be shared by several jobs, '
+                    "use {name}, {year} or {volume} in it. Skipped."
+                )
+                continue
+            try:
+                for job in venue_job_list:
+                    job["save"] = save.format(
+                        name=job.get("name"),
+                        year=job["year"] or "",
+                        volume=job["volume"] or "",
+                    )
+            except (KeyError, IndexError, ValueError):
+                logger.error(
+                    f'Invalid "save = {save}" of {venue.get("name")}, only {{name}}, {{year}} and {{volume}} are allowed. Skipped.'
+                )
+                continue
+
+        for job in venue_job_list:
+            job.setdefault(
+                "save", f"{job.get('name')}{job['year'] or job['volume']}.bib"
+            )
+            if job["save"] in save_set:
+                logger.error(
+                    f"{job['save']} is already written by another job in manifest, "
+                    f"{job.get('name')} {job['year'] or job['volume']} skipped."
+                )
+                continue
+            save_set.add(job["save"])
+            job_list.append(job)
+
+    logger.debug(f"Number of jobs in manifest: {len(job_list)}")
+    return job_list
+
+
+class HostScheduler:
+    """按域名排队执行任务
+
+    每个域名一条队列，同一域名的任务依次执行，保持各自的请求间隔；
+    不同域名的任务同时执行，一个域名等待时不会阻塞其他域名。
+    """
+
+    def __init__(self):
+        self.queue_dict: dict[str, asyncio.Queue] = dict()
+        self.worker_list: list[asyncio.Task] = list()
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            func, args, kwargs, future = item
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, host: str, func, *args, **kwargs) -> asyncio.Future:
+        """将协程函数 func(*args, **kwargs) 加入 host 的队列，返回其结果的 Future"""
+        if host not in self.queue_dict:
+            self.queue_dict[host] = asyncio.Queue()
+            self.worker_list.append(
+                asyncio.ensure_future(self._worker(self.queue_dict[host]))
+            )
+        future = asyncio.get_running_loop().create_future()
+        self.queue_dict[host].put_nowait((func, args, kwargs, future))
+        return future
+
+    async def close(self):
+        """等待所有队列中的任务完成"""
+        for queue in self.queue_dict.values():
+            queue.put_nowait(None)
+        await asyncio.gather(*self.worker_list)
@@ -0,0 +1,116 @@
+import json
+import logging
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from src.html_parse import html_to_text, is_truncated, parse_html
+from src.page_archive import archive_page
+from src.parse_pool import run_parse
+from src.request_wrap import make_request
+from src.settings import req_headers
+
+logger = logging.getLogger(__name__)
+
+# 按优先级排列的 meta 标签，name 或 property 属性，不区分大小写
+abstract_meta_names = [
+    "citation_abstract",
+    "dc.description",
+    "dcterms.abstract",
+    "og:description",
+    "description",
+]
+
+
+def extract_from_meta(soup: BeautifulSoup) -> str | None:
+    meta_dict = dict()
+    for meta_tag in soup.find_all("meta"):
+        meta_name = meta_tag.get("name") or meta_tag.get("property")
+        content = meta_tag.get("content")
+        if meta_name and content:
+            meta_dict.setdefault(str(meta_name).lower(), str(content))
+    for meta_name in abstract_meta_names:
+        content = meta_dict.get(meta_name)
+        if content and not is_truncated(html_to_text(content)):
+            return html_to_text(content)
+    return None
+
+
+def extract_from_json_ld(soup: BeautifulSoup) -> str | None:
+    for script_tag in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script_tag.get_text())
+        except json.JSONDecodeError:
+            continue
+        # 可能是单个对象、对象列表或带有 @graph 的对象
+        item_list = data if isinstance(data, list) else [data]
+        if isinstance(data, dict) and isinstance(data.get("@graph"), list):
+            item_list += data["@graph"]
+        for item in item_list:
+            if not isinstance(item, dict):
+                continue
+            for key in ("abstract", "description"):
+                content = item.get(key)
+                if isinstance(content, str) and not is_truncated(html_to_text(content)):
+                    return html_to_text(content)
+    return None
+
+
+def extract_embedded_abstract(html: str, extra_extractor=None) -> str | None:
+    """从静态HTML中嵌入的结构化数据提取摘要
+
+    依次尝试出版社专用的提取函数、meta 标签和 JSON-LD，忽略被截断的文本。
+
+    Args:
+        html (str): 页面HTML
+        extra_extractor (Callable[[str], str | None] | None): 出版社专用的提取函数，
+            例如解析页面中内联的元数据JSON
+
+    Returns:
+        str | None: 摘要
+    """
+    if extra_extractor is not None:
+        abstract = extra_extractor(html)
+        if abstract and not is_truncated(html_to_text(abstract)):
+            return html_to_text(abstract)
+    # 只解析 meta 标签和 JSON-LD 所在的 script 标签
+    soup = parse_html(html, SoupStrainer(["meta", "script"]))
+    abstract = extract_from_meta(soup)
+    if abstract is None:
+        abstract = extract_from_json_ld(soup)
+    return abstract
+
+
+def get_embedded_abstract(
+    abs_session: requests.Session,
+    url: str,
+    req_itv: float,
+    extra_extractor=None,
+    module_name: str | None = None,
+) -> tuple[str | None, bool]:
+    """不启动浏览器，直接请求页面并从静态HTML中提取摘要（--http-first）
+
+    Args:
+        abs_session (requests.Session): 复用会话，建立连接
+        url (str): 论文URL
+        req_itv (float): 请求前等待的时间（秒）
+        extra_extractor (Callable[[str], str | None] | None): 出版社专用的提取函数
+        module_name (str | None): 出版社模块名，启用 --archive 时按该模块保存页面
+
+    Returns:
+        tuple[str | None, bool]: 摘要，请求失败或页面中没有完整的摘要时为None；以及是否按请求间隔
+            向出版社发送了请求，直接使用缓存时为False。之后用浏览器打开页面时据此决定是否再等待
+    """
+    if url == "":
+        return None, False
+    res = make_request(abs_session, url, headers=req_headers, req_itv=req_itv)
+    sent = not getattr(res, "from_cache", False)
+    if res is None or res.status_code != 200:
+        logger.debug(f"Static fetch of {url} failed, fallback to browser.")
+        return None, sent
+    if module_name is not None:
+        archive_page(url, res.text, module_name)
+    abstract = run_parse(extract_embedded_abstract, res.text, extra_extractor)
+    if abstract is None:
+        logger.debug(f"No embedded abstract in {url}, fallback to browser.")
+    return abstract, sent
@@ -0,0 +1,215 @@
+import logging
+import pickle
+import re
+import sqlite3
+import threading
+from collections.abc import Iterator, Sequence
+
+from src.doi_lookup import normalize_doi
+from src.settings import metadata_store_chunk_size
+
+logger = logging.getLogger(__name__)
+
+
+def get_dblp_key(bibtex_str: str | None) -> str | None:
+    """从dblp的bibtex中提取dblp key，e.g. "@inproceedings{DBLP:conf/sp/X23," -> "conf/sp/X23" """
+    if bibtex_str is None:
+        return None
+    match = re.match(r"\s*@\w+\{DBLP:([^,\s]+),", bibtex_str)
+    return match.group(1) if match is not None else None
+
+
+def make_row(venue: str, part: str, pos: int, entry_metadata: list) -> tuple:
+    """papers 表中的一行"""
+    paper_title, paper_url, bibtex_str = entry_metadata
+    return (
+        venue,
+        part,
+        pos,
+        paper_title,
+        paper_url,
+        normalize_doi(paper_url),
+        get_dblp_key(bibtex_str),
+        bibtex_str,
+    )
+
+
+class MetadataStore:
+    """保存dblp论文元数据的SQLite数据库
+
+    每篇论文一行，以 (会议/期刊标识, 年份/卷号, 在目录页中的位置) 为主键，并按DOI和dblp key建立索引。
+    dblp阶段每得到一篇论文就写入，每 metadata_store_chunk_size 篇提交一次；收集摘要时按块读取。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite数据库文件路径
+        """
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS papers (
+                venue TEXT NOT NULL,
+                part TEXT NOT NULL,
+                pos INTEGER NOT NULL,
+                title TEXT,
+                url TEXT,
+                doi TEXT,
+                dblp_key TEXT,
+                bibtex TEXT,
+                PRIMARY KEY (venue, part, pos)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_doi ON papers(doi)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_dblp_key ON papers(dblp_key)")
+        self.conn.commit()
+        # 已写入但尚未提交的论文数量
+        self.pending_count = 0
+
+    def clear(self, venue: str, part: str):
+        """删除一个会议年份/期刊卷的所有论文，重新从dblp获取前调用"""
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM papers WHERE venue = ? AND part = ?", (venue, part)
+            )
+            self.conn.commit()
+
+    def add(self, venue: str, part: str, pos: int, entry_metadata: list):
+        """写入一篇论文，每 metadata_store_chunk_size 篇提交一次，其余的由 commit 提交
+
+        Args:
+            venue (str): 会议/期刊标识
+            part (str): 会议年份或期刊卷号
+            pos (int): 论文在目录页中的位置
+            entry_metadata (list): [论文标题, 论文URL, bibtex字符串]
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                make_row(venue, part, pos, entry_metadata),
+            )
+            self.pending_count += 1
+            if self.pending_count >= metadata_store_chunk_size:
+                self.conn.commit()
+                self.pending_count = 0
+
+    def commit(self):
+        """提交 add 写入但尚未提交的论文"""
+        with self.lock:
+            self.conn.commit()
+            self.pending_count = 0
+
+    def add_all(self, venue: str, part: str, entry_metadata_list: list):
+        """替换一个会议年份/期刊卷的所有论文，在一个事务中完成"""
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM papers WHERE venue = ? AND part = ?", (venue, part)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    make_row(venue, part, pos, entry_metadata)
+                    for pos, entry_metadata in enumerate(entry_metadata_list)
+                ),
+            )
+            self.conn.commit()
+            self.pending_count = 0
+
+    def count(self, venue: str, part: str) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM papers WHERE venue = ? AND part = ?",
+                (venue, part),
+            ).fetchone()[0]
+
+    def iter_entries(
+        self, venue: str, part: str, chunk_size: int = metadata_store_chunk_size
+    ) -> Iterator[list]:
+        """按目录页中的顺序逐块读取论文，每次查询至多 chunk_size 篇
+
+        Yields:
+            list: [论文标题, 论文URL, bibtex字符串]
+        """
+        last_pos = -1
+        while True:
+            with self.lock:
+                row_list = self.conn.execute(
+                    "SELECT pos, title, url, bibtex FROM papers WHERE venue = ? AND part = ? AND pos > ? ORDER BY pos LIMIT ?",
+                    (venue, part, last_pos, chunk_size),
+                ).fetchall()
+            for row in row_list:
+                yield [row[1], row[2], row[3]]
+            if len(row_list) < chunk_size:
+                break
+            last_pos = row_list[-1][0]
+
+    def get_papers(self, venue: str, part: str) -> "PaperSequence":
+        """返回一个会议年份/期刊卷的论文序列，遍历时按块读取"""
+        return PaperSequence(self, venue, part)
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+class PaperSequence(Sequence):
+    """数据库中一个会议年份/期刊卷的论文，可以代替 entry_metadata_list 使用，遍历时按块读取"""
+
+    def __init__(self, store: MetadataStore, venue: str, part: str):
+        self.store = store
+        self.venue = venue
+        self.part = part
+        self.length = store.count(venue, part)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[list]:
+        return self.store.iter_entries(self.venue, self.part)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        with self.store.lock:
+            row = self.store.conn.execute(
+                "SELECT title, url, bibtex FROM papers WHERE venue = ? AND part = ? ORDER BY pos LIMIT 1 OFFSET ?",
+                (self.venue, self.part, index),
+            ).fetchone()
+        if row is None:
+            raise IndexError(index)
+        return list(row)
+
+
+def import_pickle(store: MetadataStore, pkl_path: str, venue: str, part: str) -> int:
+    """将 --save-pkl 保存的pickle文件导入数据库，返回论文数量"""
+    with open(pkl_path, "rb") as f:
+        entry_metadata_list = pickle.load(f)
+    store.add_all(venue, part, entry_metadata_list)
+    return len(entry_metadata_list)
+
+
+_store: MetadataStore | None = None
+_store_path: str | None = None
+_store_lock = threading.Lock()
+
+
+def configure_store(path: str | None):
+    """设置元数据数据库的路径，为None时不使用数据库"""
+    global _store, _store_path
+    if _store is not None:
+        _store.close()
+        _store = None
+    _store_path = path
+
+
+def get_store() -> MetadataStore | None:
+    """返回进程内共享的元数据数据库，首次调用时打开。未设置路径时返回None。"""
+    global _store
+    if _store_path is None:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = MetadataStore(_store_path)
+    return _store
@@ -0,0 +1,232 @@
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+from src.settings import metrics_latency_buckets, metrics_prefix
+
+logger = logging.getLogger(__name__)
+
+# 指标名 -> (类型, 说明)，用于 Prometheus textfile 中的 TYPE 和 HELP
+metric_info_dict = {
+    "stage_seconds": (
+        "histogram",
+        "Time spent in each stage (http, redirect, rate_limit_wait, browser_navigate, page_ready, browser_extract, paper, bibtex_format).",
+    ),
+    "requests_total": ("counter", "HTTP request attempts by host and status code."),
+    "retries_total": ("counter", "Retries scheduled by the retry policy."),
+    "retry_give_up_total": (
+        "counter",
+        "Requests abandoned after the last retry attempt.",
+    ),
+    "cache_lookups_total": (
+        "counter",
+        "HTTP cache lookups by result (hit, revalidated, stale, miss).",
+    ),
+    "page_ready_total": (
+        "counter",
+        "Browser page-ready waits by result (ready, timeout).",
+    ),
+    "papers_total": (
+        "counter",
+        "Papers written to bibtex files by publisher and result.",
+    ),
+}
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(label_tuple: tuple) -> str:
+    """Prometheus 格式的标签，e.g. {host="dblp.org",status="200"}"""
+    item_list = [f'{key}="{escape_label(value)}"' for key, value in label_tuple]
+    return "{" + ",".join(item_list) + "}" if item_list else ""
+
+
+class MetricsRegistry:
+    """进程内的计数器和延迟直方图
+
+    指标以 (名称, 标签) 为键，标签为 stage、host、publisher、status 等。直方图只保存各区间的计数、
+    总和与最大值（区间见 settings.py 中的 metrics_latency_buckets），长时间运行时内存占用不变。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.counter_dict: dict[tuple[str, tuple], float] = dict()
+        # (名称, 标签) -> [各区间的计数（最后一个为 +Inf）, 总和, 最大值]
+        self.histogram_dict: dict[tuple[str, tuple], list] = dict()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counter_dict[key] = self.counter_dict.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histogram_dict.get(key)
+            if histogram is None:
+                histogram = [[0] * (len(metrics_latency_buckets) + 1), 0.0, 0.0]
+                self.histogram_dict[key] = histogram
+            histogram[0][bisect.bisect_left(metrics_latency_buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] = max(histogram[2], value)
+
+    def to_prometheus(self) -> str:
+        """Prometheus textfile 格式，可由 node_exporter 的 textfile collector 读取"""
+        line_list = list()
+        with self.lock:
+            counter_list = sorted(self.counter_dict.items())
+            histogram_list = sorted(
+                (key, [list(value[0]), value[1], value[2]])
+                for key, value in self.histogram_dict.items()
+            )
+
+        described_set = set()
+
+        def describe(name: str):
+            if name in described_set:
+                return
+            described_set.add(name)
+            metric_type, help_text = metric_info_dict.get(name, ("untyped", name))
+            line_list.append(f"# HELP {metrics_prefix}_{name} {help_text}")
+            line_list.append(f"# TYPE {metrics_prefix}_{name} {metric_type}")
+
+        for (name, label_tuple), value in counter_list:
+            describe(name)
+            line_list.append(
+                f"{metrics_prefix}_{name}{format_labels(label_tuple)} {value:g}"
+            )
+        for (name, label_tuple), (bucket_list, total, _) in histogram_list:
+            describe(name)
+            cumulative = 0
+            for bound, count in zip(metrics_latency_buckets + ["+Inf"], bucket_list):
+                cumulative += count
+                bucket_labels = format_labels(label_tuple + (("le", str(bound)),))
+                line_list.append(
+                    f"{metrics_prefix}_{name}_bucket{bucket_labels} {cumulative}"
+                )
+            line_list.append(
+                f"{metrics_prefix}_{name}_sum{format_labels(label_tuple)} {total:.6f}"
+            )
+            line_list.append(
+                f"{metrics_prefix}_{name}_count{format_labels(label_tuple)} {cumulative}"
+            )
+
+        line_list.append(f"# TYPE {metrics_prefix}_run_start_time_seconds gauge")
+        line_list.append(
+            f"{metrics_prefix}_run_start_time_seconds {self.start_time:.3f}"
+        )
+        line_list.append(f"# TYPE {metrics_prefix}_last_update_time_seconds gauge")
+        line_list.append(f"{metrics_prefix}_last_update_time_seconds {time.time():.3f}")
+        return "\n".join(line_list) + "\n"
+
+    def to_json(self) -> dict:
+        """JSON摘要：计数器、各直方图的次数/总和/平均/最大值/区间计数，以及各域名的缓存命中率"""
+        with self.lock:
+            counter_list = [
+                {"name": name, "labels": dict(label_tuple), "value": value}
+                for (name, label_tuple), value in sorted(self.counter_dict.items())
+            ]
+            histogram_list = [
+                {
+                    "name": name,
+                    "labels": dict(label_tuple),
+                    "count": sum(bucket_list),
+                    "sum": total,
+                    "mean": total / sum(bucket_list),
+                    "max": max_value,
+                    "buckets": dict(
+                        zip(map(str, metrics_latency_buckets + ["+Inf"]), bucket_list)
+                    ),
+                }
+                for (name, label_tuple), (bucket_list, total, max_value) in sorted(
+                    self.histogram_dict.items()
+                )
+            ]
+
+        lookup_dict: dict[str, dict[str, float]] = dict()
+        for counter in counter_list:
+            if counter["name"] == "cache_lookups_total":
+                host_dict = lookup_dict.setdefault(counter["labels"]["host"], dict())
+                host_dict[counter["labels"]["result"]] = counter["value"]
+        cache_hit_ratio = {
+            host: (result_dict.get("hit", 0) + result_dict.get("revalidated", 0))
+            / sum(result_dict.values())
+            for host, result_dict in lookup_dict.items()
+        }
+        return {
+            "start_time": self.start_time,
+            "update_time": time.time(),
+            "counters": counter_list,
+            "histograms": histogram_list,
+            "cache_hit_ratio": cache_hit_ratio,
+        }
+
+
+_registry = MetricsRegistry()
+_metrics_path: str | None = None
+
+
+def configure_metrics(path: str | None):
+    """设置指标的输出文件（--metrics-out），并清空已有的指标
+
+    Args:
+        path (str | None): 以 .json 结尾时输出JSON摘要，否则输出 Prometheus textfile；为None时不输出
+    """
+    global _registry, _metrics_path
+    _registry = MetricsRegistry()
+    _metrics_path = path
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def inc(name: str, amount: float = 1, **labels):
+    """计数器加 amount，值为None的标签不记录"""
+    _registry.inc(
+        name,
+        amount,
+        **{key: str(value) for key, value in labels.items() if value is not None},
+    )
+
+
+def observe(stage: str, seconds: float, **labels):
+    """记录一次阶段耗时，值为None的标签不记录"""
+    _registry.observe(
+        "stage_seconds",
+        seconds,
+        stage=stage,
+        **{key: str(value) for key, value in labels.items() if value is not None},
+    )
+
+
+@contextlib.contextmanager
+def timed(stage: str, **labels):
+    """记录 with 代码块的耗时，代码块中可以 await。抛出异常时也记录。"""
+    start_time = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(stage, time.monotonic() - start_time, **labels)
+
+
+def write_metrics():
+    """将当前的指标写入 --metrics-out 指定的文件，先写临时文件再替换，读取方不会读到写了一半的文件"""
+    if _metrics_path is None:
+        return
+    if _metrics_path.endswith(".json"):
+        text = json.dumps(_registry.to_json(), indent=2, ensure_ascii=False)
+    else:
+        text = _registry.to_prometheus()
+    tmp_path = f"{_metrics_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, _metrics_path)
+    logger.debug(f"Metrics written to {_metrics_path}.")
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+from src.doi_lookup import get_paper_key, normalize_doi
+from src.parse_pool import get_parse_pool
+from src.progress_bar import advance_progress, start_progress, stop_progress
+from src.settings import page_archive_compress_level, reextract_batch_size
+
+logger = logging.getLogger(__name__)
+
+
+class PageArchive:
+    """出版社页面的原始HTML库（--archive）
+
+    直接请求的页面保存响应的HTML，浏览器出版社保存渲染后的DOM。页面内容按SHA-256寻址、
+    用zlib压缩后保存，内容相同的页面只保存一份；每次获取记录URL、DOI、来源和获取时间。
+    出版社修改页面结构后，修改提取代码并用 --reextract 重新提取即可，不需要重新访问出版社网站。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite数据库文件路径
+        """
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            )""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                doi TEXT,
+                source TEXT NOT NULL,
+                rendered INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                sha256 TEXT NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_doi ON pages (doi)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_url ON pages (url, source)")
+        self.conn.commit()
+
+    def put(self, url: str, html: str, source: str, rendered: bool = False):
+        """保存一次获取的页面
+
+        Args:
+            url (str): 论文URL（doi.org 链接）
+            html (str): 页面HTML或渲染后的DOM
+            source (str): 出版社，e.g. "springer"
+            rendered (bool): 是否为浏览器渲染后的DOM
+        """
+        data = html.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if (
+                self.conn.execute(
+                    "SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)
+                ).fetchone()
+                is None
+            ):
+                self.conn.execute(
+                    "INSERT INTO blobs VALUES (?, ?)",
+                    (sha256, zlib.compress(data, page_archive_compress_level)),
+                )
+            self.conn.execute(
+                "INSERT INTO pages (url, doi, source, rendered, fetched_at, sha256) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    normalize_doi(url),
+                    source,
+                    rendered,
+                    time.time(),
+                    sha256,
+                ),
+            )
+            self.conn.commit()
+
+    def get(self, url: str) -> str | None:
+        """返回论文最近一次获取的页面，修改提取代码时可用于检查页面结构
+
+        Args:
+            url (str): 论文URL或DOI。URL中没有DOI时按保存时的URL查找
+        """
+        doi = normalize_doi(url)
+        with self.lock:
+            row = self.conn.execute(
+                f"""SELECT blobs.data FROM pages JOIN blobs ON pages.sha256 = blobs.sha256
+                WHERE pages.{"doi" if doi is not None else "url"} = ?
+                ORDER BY pages.id DESC LIMIT 1""",
+                (doi if doi is not None else url,),
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row is not None else None
+
+    def count_latest(self) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM pages GROUP BY COALESCE(doi, url), source)"
+            ).fetchone()[0]
+
+    def iter_latest(self, batch_size: int):
+        """按批返回每篇论文、每个来源最近一次获取的页面
+
+        论文以DOI区分，URL中没有DOI的页面（e.g. USENIX、NDSS）以URL区分。
+
+        Yields:
+            list[tuple[str, str, bytes]]: [(摘要库中的键, 来源, 压缩后的页面)]，键见 doi_lookup.get_paper_key
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                """SELECT pages.doi, pages.url, pages.source, blobs.data
+                FROM pages JOIN blobs ON pages.sha256 = blobs.sha256
+                WHERE pages.id IN (
+                    SELECT MAX(id) FROM pages GROUP BY COALESCE(doi, url), source
+                )
+                ORDER BY pages.id"""
+            )
+            row_list = cursor.fetchmany(batch_size)
+        while row_list:
+            yield [
+                (doi or get_paper_key(url), source, data)
+                for doi, url, source, data in row_list
+            ]
+            with self.lock:
+                row_list = cursor.fetchmany(batch_size)
+
+    def close(self):
+        self.conn.close()
+
+
+_archive: PageArchive | None = None
+_archive_path: str | None = None
+_archive_lock = threading.Lock()
+
+
+def configure_archive(path: str | None):
+    """设置页面库的路径（--archive），为None时不保存页面"""
+    global _archive, _archive_path
+    if _archive is not None:
+        _archive.close()
+        _archive = None
+    _archive_path = path
+
+
+def get_archive() -> PageArchive | None:
+    """返回进程内共享的页面库，首次调用时打开。未设置路径时返回None。"""
+    global _archive
+    if _archive_path is None:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = PageArchive(_archive_path)
+    return _archive
+
+
+def archive_page(url: str, html: str, module_name: str, rendered: bool = False):
+    """启用 --archive 时保存获取到的页面
+
+    Args:
+        url (str): 论文URL（doi.org 链接）
+        html (str): 页面HTML或渲染后的DOM
+        module_name (str): 出版社模块名，e.g. "src.entry_springer"，与摘要库中的来源对应
+        rendered (bool): 是否为浏览器渲染后的DOM
+    """
+    archive = get_archive()
+    if archive is None or not url:
+        return
+    archive.put(url, html, module_name.rsplit(".entry_", 1)[-1], rendered)
+
+
+async def archive_page_async(
+    url: str, html: str, module_name: str, rendered: bool = False
+):
+    """与 archive_page 相同，在线程中写入数据库，不阻塞浏览器所在的事件循环"""
+    if _archive_path is None or not url:
+        return
+    await asyncio.to_thread(archive_page, url, html, module_name, rendered)
+
+
+def extract_archived(extract_func, data: bytes) -> str | None:
+    """解压页面并提取摘要，在解析进程中运行"""
+    try:
+        return extract_func(zlib.decompress(data).decode("utf-8"))
+    except Exception:
+        logger.exception("Failed to extract abstract from archived page.")
+        return None
+
+
+def reextract_archive(store, extractor_dict: dict, version_dict: dict[str, int]):
+    """用当前的提取代码重新提取页面库中每篇论文最近一次获取的页面，结果写入摘要库
+
+    摘要库中没有该论文、或记录由旧版本的提取代码得到时写入，不访问网络。摘要库以DOI为键，
+    URL中没有DOI的页面（e.g. USENIX、NDSS）以规范化的URL为键。
+    页面在解析进程（get_parse_pool）中并行解压和提取。
+
+    Args:
+        store (abstract_store.AbstractStore): 摘要库
+        extractor_dict (dict[str, Callable[[str], str | None]]): 来源 -> 出版社模块的 extract_abstract
+        version_dict (dict[str, int]): 来源 -> 当前提取代码的版本
+    """
+    archive = get_archive()
+    if archive is None:
+        logger.error("--reextract requires --archive.")
+        return
+
+    pool = get_parse_pool()
+    found_count = 0
+    saved_count = 0
+    progress, task_id = start_progress("Re-extracting", archive.count_latest())
+    try:
+        for row_list in archive.iter_latest(reextract_batch_size):
+            job_list = [
+                (key, source, data)
+                for key, source, data in row_list
+                if key is not None and source in extractor_dict
+            ]
+            for _ in range(len(row_list) - len(job_list)):
+                advance_progress(progress, task_id)
+            func_list = [extractor_dict[source] for _, source, _ in job_list]
+            data_list = [data for _, _, data in job_list]
+            if pool is not None:
+                abstract_list = pool.map(extract_archived, func_list, data_list)
+            else:
+                abstract_list = map(extract_archived, func_list, data_list)
+
+            for (key, source, _), abstract in zip(job_list, abstract_list):
+                advance_progress(progress, task_id)
+                if not abstract:
+                    continue
+                found_count += 1
+                if store.get(key, version_dict) is None:
+                    store.put(key, abstract, source, version_dict[source])
+                    saved_count += 1
+    finally:
+        stop_progress(progress, task_id)
+
+    logger.info(
+        f"Re-extracted abstracts from {found_count} archived pages, {saved_count} saved to abstract store."
+    )
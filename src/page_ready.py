@@ -0,0 +1,73 @@
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections import defaultdict
+
+import nodriver as nd
+
+from src import metrics
+from src.settings import page_ready_deadline, page_ready_poll_interval
+
+logger = logging.getLogger(__name__)
+
+# publisher -> 每个页面从开始等待到摘要出现的时间（秒）
+ready_time_dict: dict[str, list[float]] = defaultdict(list)
+
+
+async def wait_for_any(tab: nd.Tab, selector_list: list[str], publisher: str) -> str:
+    """同时等待多个CSS选择器，任何一个出现在页面中就立即返回
+
+    每次轮询在页面中用一次 JS 调用检查所有选择器，不会因为按顺序尝试而叠加超时时间。
+
+    Args:
+        tab (nd.Tab): 标签页
+        selector_list (list[str]): 候选的CSS选择器
+        publisher (str): 出版社，用于选取 settings.page_ready_deadline 中的总等待时间并记录耗时
+
+    Raises:
+        asyncio.TimeoutError: 超过总等待时间仍然没有任何选择器出现
+
+    Returns:
+        str: 第一个出现的选择器
+    """
+    deadline = page_ready_deadline.get(publisher, page_ready_deadline["default"])
+    # 返回 1 开始的序号，0 表示没有找到
+    expression = f"{json.dumps(selector_list)}.findIndex(s => document.querySelector(s) !== null) + 1"
+
+    start_time = time.monotonic()
+    while True:
+        try:
+            result = await tab.evaluate(expression, return_by_value=True)
+        except Exception as e:
+            # 页面跳转时执行上下文会被销毁，继续等待
+            logger.debug(f"Cannot evaluate in page. Exception: {e.__class__.__name__}")
+            result = None
+        elapsed = time.monotonic() - start_time
+        if isinstance(result, (int, float)) and result > 0:
+            ready_time_dict[publisher].append(elapsed)
+            metrics.observe("page_ready", elapsed, publisher=publisher)
+            metrics.inc("page_ready_total", publisher=publisher, result="ready")
+            logger.debug(f"Page ready in {elapsed:.2f} s ({publisher}).")
+            return selector_list[int(result) - 1]
+        if elapsed >= deadline:
+            metrics.observe("page_ready", elapsed, publisher=publisher)
+            metrics.inc("page_ready_total", publisher=publisher, result="timeout")
+            raise asyncio.TimeoutError(
+                f"None of {selector_list} appeared in {deadline} s."
+            )
+        await asyncio.sleep(page_ready_poll_interval)
+
+
+def log_ready_stats():
+    """输出各出版社的页面就绪时间分布，用于调整 page_ready_deadline"""
+    for publisher, ready_time_list in ready_time_dict.items():
+        if not ready_time_list:
+            continue
+        sorted_list = sorted(ready_time_list)
+        p95 = sorted_list[min(len(sorted_list) - 1, int(len(sorted_list) * 0.95))]
+        logger.info(
+            f"Time to abstract ({publisher}): n={len(sorted_list)}, "
+            f"median={statistics.median(sorted_list):.2f} s, p95={p95:.2f} s, max={sorted_list[-1]:.2f} s."
+        )
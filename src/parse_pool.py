@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_pool: Executor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def configure_parse_pool(workers: int):
+    """设置解析进程的数量（--parse-workers），为0时在发起请求的线程中解析"""
+    global _pool_workers
+    shutdown_parse_pool()
+    _pool_workers = max(workers, 0)
+
+
+def get_parse_pool() -> Executor | None:
+    """返回进程内共享的解析进程池，首次调用时创建。未启用时返回None。"""
+    global _pool
+    if _pool_workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers)
+            logger.debug(f"Started {_pool_workers} parse workers.")
+    return _pool
+
+
+def run_parse(func, *args):
+    """在解析进程中执行 func(*args) 并等待结果，等待时不占用GIL，其他线程可以继续收发请求
+
+    func 和参数需要能被 pickle（模块级函数和字符串等），未启用进程池时直接调用。
+    """
+    pool = get_parse_pool()
+    if pool is None:
+        return func(*args)
+    return pool.submit(func, *args).result()
+
+
+async def run_parse_async(func, *args):
+    """与 run_parse 相同，但在事件循环中等待，不阻塞浏览器标签页等其他任务"""
+    pool = get_parse_pool()
+    if pool is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
@@ -0,0 +1,76 @@
+import threading
+
+from rich.progress import (BarColumn, MofNCompleteColumn, Progress,
+                           TaskProgressColumn, TextColumn, TimeElapsedColumn,
+                           TimeRemainingColumn)
+
+from src.rate_limit import get_interval_text
+
+# rich 同一时间只能显示一个 Live 进度条。多个任务同时运行时（--manifest）共用一个进度条，
+# 每个任务在其中添加自己的一行。
+_shared_progress: Progress | None = None
+_shared_lock = threading.Lock()
+
+
+def create_progress() -> Progress:
+    return Progress(
+        TextColumn("{task.description}"),
+        TaskProgressColumn(),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        TimeRemainingColumn(compact=True),
+        TextColumn("{task.fields[avg_sec_per_it]:>6.2f} s/it"),
+        # --adaptive 时当前的请求间隔
+        TextColumn("{task.fields[interval]}"),
+    )
+
+
+def use_shared_progress(enabled: bool):
+    """启用或关闭共用的进度条"""
+    global _shared_progress
+    with _shared_lock:
+        if enabled and _shared_progress is None:
+            _shared_progress = create_progress()
+            _shared_progress.start()
+        elif not enabled and _shared_progress is not None:
+            _shared_progress.stop()
+            _shared_progress = None
+
+
+def start_progress(description: str, total: int) -> tuple[Progress, int]:
+    """开始一个进度条任务
+
+    Returns:
+        tuple[Progress, int]: (进度条, 任务ID)
+    """
+    if _shared_progress is not None:
+        progress = _shared_progress
+    else:
+        progress = create_progress()
+        progress.start()
+    task_id = progress.add_task(description, total=total, avg_sec_per_it=0, interval="")
+    return progress, task_id
+
+
+def advance_progress(progress: Progress, task_id: int, host: str | None = None):
+    """前进一步，并更新平均每步用时和 host 当前的请求间隔"""
+    # set speed display
+    task_fields = next(task for task in progress.tasks if task.id == task_id)
+    avg_speed = (
+        task_fields.elapsed / (task_fields.completed + 1) if task_fields.elapsed else 0
+    )
+    progress.update(
+        task_id,
+        advance=1,
+        avg_sec_per_it=avg_speed,
+        interval=get_interval_text(host),
+    )
+
+
+def stop_progress(progress: Progress, task_id: int):
+    """结束进度条任务。共用的进度条只移除该任务的一行。"""
+    if progress is _shared_progress:
+        progress.remove_task(task_id)
+    else:
+        progress.stop()
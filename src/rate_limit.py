@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+
+from src.settings import (adaptive_backoff_factor, adaptive_decrease_step,
+                          adaptive_latency_factor, adaptive_max_factor,
+                          adaptive_throttle_status_codes)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器
+
+    每 interval 秒生成一个令牌，最多积累 burst 个令牌，因此空闲之后允许最多 burst 个请求连续发出，
+    长期平均速率仍为 1/interval。令牌不足时预约未来的令牌并在锁外等待，多个线程按调用顺序依次放行。
+    """
+
+    def __init__(self, interval: float, burst: int = 1):
+        """
+        Args:
+            interval (float): 生成一个令牌的时间（秒），即长期平均的请求间隔。
+            burst (int): 令牌桶容量，即允许连续发出的最大请求数。
+        """
+        self.interval = max(interval, 0)
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.last_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """取走一个令牌，返回需要等待的时间（秒）"""
+        with self.lock:
+            now = time.monotonic()
+            if self.interval > 0:
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_time) / self.interval,
+                )
+            else:
+                self.tokens = self.capacity
+            self.last_time = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens * self.interval
+
+    def set_interval(self, interval: float):
+        """修改生成令牌的时间（--adaptive）"""
+        with self.lock:
+            self.interval = max(interval, 0)
+
+    def acquire(self):
+        """阻塞直到可以发出下一个请求"""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class AdaptiveInterval:
+    """一个域名的自适应请求间隔（AIMD）
+
+    响应正常时请求间隔减少 adaptive_decrease_step 秒（加性增加速率），直到 min_interval；
+    被限流（429/503、人机验证页面、请求失败）或响应明显变慢时乘以 adaptive_backoff_factor（乘性减少速率），
+    最多到 max_interval。
+    """
+
+    def __init__(self, interval: float, min_interval: float, max_interval: float):
+        """
+        Args:
+            interval (float): 初始的请求间隔（秒）
+            min_interval (float): 请求间隔的下限（秒）
+            max_interval (float): 请求间隔的上限（秒）
+        """
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # 响应时间的指数移动平均，及其历史最小值
+        self.avg_latency: float | None = None
+        self.best_avg_latency: float | None = None
+        self.lock = threading.Lock()
+
+    def get(self) -> float:
+        return self.interval
+
+    def on_success(self, latency: float):
+        with self.lock:
+            if self.avg_latency is None:
+                self.avg_latency = latency
+            else:
+                self.avg_latency = 0.8 * self.avg_latency + 0.2 * latency
+            if (
+                self.best_avg_latency is None
+                or self.avg_latency < self.best_avg_latency
+            ):
+                self.best_avg_latency = self.avg_latency
+            if self.avg_latency > adaptive_latency_factor * self.best_avg_latency:
+                self._back_off()
+            else:
+                self.interval = max(
+                    self.min_interval, self.interval - adaptive_decrease_step
+                )
+
+    def on_throttle(self):
+        with self.lock:
+            self._back_off()
+
+    def _back_off(self):
+        self.interval = min(
+            self.max_interval,
+            max(self.interval, self.min_interval, 0.1) * adaptive_backoff_factor,
+        )
+
+
+_adaptive_enabled = False
+_min_interval: float | None = None
+_controller_dict: dict[str, AdaptiveInterval] = dict()
+_controller_lock = threading.Lock()
+
+
+def configure_adaptive(enabled: bool, min_interval: float | None = None):
+    """启用或禁用自适应请求间隔（--adaptive）
+
+    Args:
+        enabled (bool): 是否启用
+        min_interval (float | None): 请求间隔的下限（--min-interval）。为None时以用户设置的间隔为下限，
+            只在被限流时延长间隔，不会比 -t/-d 更快
+    """
+    global _adaptive_enabled, _min_interval
+    with _controller_lock:
+        _adaptive_enabled = enabled
+        _min_interval = max(min_interval, 0) if min_interval is not None else None
+        _controller_dict.clear()
+
+
+def get_controller(host: str, interval: float) -> AdaptiveInterval | None:
+    """返回域名的自适应请求间隔，首次调用时以 interval 为初始值。未启用或 interval 为0时返回None。"""
+    if not _adaptive_enabled or interval <= 0:
+        return None
+    with _controller_lock:
+        controller = _controller_dict.get(host)
+        if controller is None:
+            min_interval = interval if _min_interval is None else _min_interval
+            controller = AdaptiveInterval(
+                interval,
+                min(min_interval, interval),
+                interval * adaptive_max_factor,
+            )
+            _controller_dict[host] = controller
+    return controller
+
+
+def get_interval(host: str, interval: float) -> float:
+    """返回向域名发送下一个请求前应等待的时间（秒），未启用 --adaptive 时即为 interval"""
+    controller = get_controller(host, interval)
+    return controller.get() if controller is not None else interval
+
+
+def report_response(
+    host: str,
+    status_code: int | None,
+    latency: float,
+    challenged: bool = False,
+):
+    """根据一次请求的结果调整域名的请求间隔
+
+    Args:
+        host (str): 域名
+        status_code (int | None): 状态码，请求失败（发生异常）时为None
+        latency (float): 响应时间（秒）
+        challenged (bool): 是否遇到人机验证页面
+    """
+    with _controller_lock:
+        controller = _controller_dict.get(host)
+    if controller is None:
+        return
+    if (
+        status_code is None
+        or status_code in adaptive_throttle_status_codes
+        or challenged
+    ):
+        controller.on_throttle()
+        logger.debug(f"Throttled by {host}, interval {controller.get():.2f} sec.")
+    else:
+        controller.on_success(latency)
+
+
+def get_interval_text(host: str | None) -> str:
+    """进度条中显示的当前请求间隔，未启用 --adaptive 时为空"""
+    with _controller_lock:
+        controller = _controller_dict.get(host) if host is not None else None
+    if controller is None:
+        return ""
+    return f"{controller.get():.2f} s/req"
@@ -1,53 +1,320 @@
+import asyncio
 import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from time import sleep
+from urllib.parse import urlparse
 
 import requests
 
-from src.settings import retry_interval
+from src import metrics
+from src.http_cache import get_cache
+from src.rate_limit import (TokenBucket, get_controller, get_interval,
+                            report_response)
+from src.settings import (doi_prefix_host, html_content_types,
+                          permanent_failure_hosts, permanent_status_codes,
+                          retry_after_max_interval, retry_base_interval,
+                          retry_jitter, retry_max_attempts, retry_max_interval,
+                          retry_status_codes)
 
 logger = logging.getLogger(__name__)
 
 
-# Decorator
-# Reference: https://kingname.info/2023/06/11/retry-in-requests/
-def retry(func):
-    def wrap(*args, **kwargs):
-        for time in range(4):
+class RetryPolicy:
+    """失败请求的重试策略，同步请求和浏览器中的异步操作共用
+
+    发生异常或返回 retry_status_codes 中的状态码时按指数退避重试，等待时间带随机抖动，
+    服务器返回 Retry-After 时按其等待。permanent_status_codes 中的状态码和
+    permanent_failure_hosts 中的域名不会成功，直接放弃。
+    退避等待之后，每次重试仍像第一次请求一样等待该域名的请求间隔（-t/-d、--adaptive），
+    见 make_request 和 run_paced。
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = retry_max_attempts,
+        base_interval: float = retry_base_interval,
+        max_interval: float = retry_max_interval,
+        jitter: float = retry_jitter,
+        status_codes: set[int] = retry_status_codes,
+        permanent_codes: set[int] = permanent_status_codes,
+        permanent_hosts: set[str] = permanent_failure_hosts,
+    ):
+        """
+        Args:
+            max_attempts (int): 包括第一次在内的最大尝试次数
+            base_interval (float): 第一次重试前等待的时间（秒），之后每次加倍
+            max_interval (float): 退避等待时间的上限（秒）
+            jitter (float): 等待时间随机缩短的最大比例，避免多个请求同时重试
+            status_codes (set[int]): 需要重试的状态码
+            permanent_codes (set[int]): 不重试的状态码
+            permanent_hosts (set[str]): 无法访问的域名
+        """
+        self.max_attempts = max(max_attempts, 1)
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.status_codes = status_codes
+        self.permanent_codes = permanent_codes
+        self.permanent_hosts = permanent_hosts
+
+    def is_permanent_url(self, url: str) -> bool:
+        return urlparse(url).netloc in self.permanent_hosts
+
+    def is_permanent_status(self, status_code: int) -> bool:
+        return status_code in self.permanent_codes
+
+    def get_backoff(self, attempt: int) -> float:
+        """第 attempt 次重试（从1开始）前的退避等待时间"""
+        interval = min(self.max_interval, self.base_interval * 2 ** (attempt - 1))
+        return interval * (1 - random.uniform(0, self.jitter))
+
+    def get_delay(self, attempt: int, url: str, result, error) -> float | None:
+        """根据本次尝试的结果，返回重试前需要等待的时间（秒），不重试时返回None
+
+        Args:
+            attempt (int): 已经进行的尝试次数
+            url (str): 请求URL，用于日志
+            result: 本次尝试的返回值，可能是 requests.Response
+            error (Exception | None): 本次尝试抛出的异常
+        """
+        if error is None:
+            status_code = getattr(result, "status_code", None)
+            if status_code not in self.status_codes:
+                return None
+            reason = f"status code {status_code}"
+            reason_label = str(status_code)
+        else:
+            reason = f"exception {error.__class__.__name__}"
+            reason_label = error.__class__.__name__
+        host = get_host(url)
+        if attempt >= self.max_attempts:
+            logger.warning(
+                f"Cannot access {url} , {reason}. Gave up after {attempt} attempts."
+            )
+            metrics.inc("retry_give_up_total", host=host, reason=reason_label)
+            return None
+
+        delay = self.get_backoff(attempt)
+        retry_after = parse_retry_after(getattr(result, "headers", None))
+        if retry_after is not None:
+            if retry_after > retry_after_max_interval:
+                logger.warning(
+                    f"Cannot access {url} , {reason}. Retry-After {retry_after:.0f} sec is too long, gave up."
+                )
+                metrics.inc("retry_give_up_total", host=host, reason=reason_label)
+                return None
+            delay = retry_after
+        metrics.inc("retries_total", host=host, reason=reason_label)
+        logger.warning(
+            f"Cannot access {url} , {reason}. Retry {attempt}/{self.max_attempts - 1} after {delay:.1f} sec."
+        )
+        return delay
+
+    def call(self, func, url: str, *args, **kwargs):
+        """调用 func 发送请求，失败时阻塞等待后重试。最终仍抛出异常时返回None"""
+        if self.is_permanent_url(url):
+            logger.warning(f"Unsupported URL {url} , skipped.")
+            return None
+        attempt = 0
+        while True:
+            attempt += 1
+            result, error = None, None
             try:
                 result = func(*args, **kwargs)
+            except Exception as e:
+                error = e
+            delay = self.get_delay(attempt, url, result, error)
+            if delay is None:
                 return result
+            sleep(delay)
+
+    async def call_async(self, func, url: str, *args, **kwargs):
+        """与 call 相同，但 func 为协程函数，用 asyncio.sleep 等待，不阻塞事件循环"""
+        if self.is_permanent_url(url):
+            logger.warning(f"Unsupported URL {url} , skipped.")
+            return None
+        attempt = 0
+        while True:
+            attempt += 1
+            result, error = None, None
+            try:
+                result = await func(*args, **kwargs)
             except Exception as e:
-                if time < 3:
-                    logger.warning(
-                        f"Cannot access {args[1]} . Exception: {e.__class__.__name__} Retry {time + 1}/3 after {retry_interval} sec."
-                    )
-                    sleep(retry_interval)
+                error = e
+            delay = self.get_delay(attempt, url, result, error)
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
+
+
+def parse_retry_after(headers) -> float | None:
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_time = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
         return None
+    if retry_time.tzinfo is None:
+        retry_time = retry_time.replace(tzinfo=timezone.utc)
+    return max((retry_time - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+default_retry_policy = RetryPolicy()
 
-    return wrap
 
+def get_host(url: str) -> str:
+    """返回URL实际访问的出版社域名。doi.org 的链接根据DOI前缀映射到出版社域名。"""
+    parsed_url = urlparse(url)
+    if parsed_url.netloc in ("doi.org", "dx.doi.org"):
+        doi_prefix = parsed_url.path.lstrip("/").split("/", 1)[0]
+        return doi_prefix_host.get(doi_prefix, parsed_url.netloc)
+    return parsed_url.netloc
 
-@retry
-def make_request(session: requests.Session, url: str, headers=None):
-    if headers is None:
-        res = session.get(url)
-    else:
-        res = session.get(url, headers=headers)
+
+def _get(session: requests.Session, url: str, headers=None):
+    host = get_host(url)
+    start_time = time.monotonic()
+    try:
+        if headers is None:
+            res = session.get(url)
+        else:
+            res = session.get(url, headers=headers)
+    except Exception as e:
+        elapsed = time.monotonic() - start_time
+        report_response(host, None, elapsed)
+        metrics.observe("http", elapsed, host=host)
+        metrics.inc("requests_total", host=host, status=e.__class__.__name__)
+        raise
+    elapsed = time.monotonic() - start_time
+    report_response(
+        host,
+        res.status_code,
+        elapsed,
+        res.headers.get("cf-mitigated") == "challenge",
+    )
+    metrics.observe("http", elapsed, host=host)
+    metrics.inc("requests_total", host=host, status=res.status_code)
+    # doi.org 等跳转各自的耗时，按实际访问的域名记录
+    for hop in res.history:
+        metrics.observe(
+            "redirect", hop.elapsed.total_seconds(), host=urlparse(hop.url).netloc
+        )
     return res
 
 
-def retry_async(func):
-    async def wrap(*args, **kwargs):
-        for time in range(4):
-            try:
-                result = await func(*args, **kwargs)
-                return result
-            except Exception as e:
-                if time < 3:
-                    logger.warning(
-                        f"Cannot access {args[0]} . Exception: {e.__class__.__name__} Retry {time + 1}/3 after {retry_interval} sec."
-                    )
-                    sleep(retry_interval)
-        return None
+def make_request(
+    session: requests.Session,
+    url: str,
+    headers=None,
+    req_itv: float = 0,
+    limiter: TokenBucket | None = None,
+    content_types: tuple[str, ...] = html_content_types,
+):
+    """发送GET请求，优先使用持久化缓存
+
+    缓存命中且在有效期内时直接返回，不等待请求间隔。缓存过期时发送条件请求，
+    服务器返回304则继续使用缓存的响应；请求失败时也退回到过期的缓存响应。
+    发生异常或返回临时错误的状态码时按 default_retry_policy 重试，每次重试前也等待请求间隔或限速器。
+
+    Args:
+        session (requests.Session): 复用会话，建立连接
+        url (str): 请求URL
+        headers (dict | None): 请求头
+        req_itv (float): 实际发送请求前等待的时间（秒），设置 --adaptive 时为该域名的初始请求间隔
+        limiter (TokenBucket | None): 限速器，设置后代替 req_itv 控制请求速率
+        content_types (tuple[str, ...]): 预期的内容类型，只有这些类型的响应写入缓存
+
+    Returns:
+        requests.Response | None: 响应，重试后仍发生异常或URL无法访问时返回None。
+            直接使用缓存、没有发送请求时，响应的 from_cache 为True
+    """
+    cache = get_cache()
+    host = get_host(url)
+    cached_res, cond_headers = None, {}
+    if cache is not None:
+        cached_res, fresh, cond_headers = cache.lookup(url)
+        if cached_res is not None and fresh:
+            logger.debug(f"Cache hit: {url}")
+            metrics.inc("cache_lookups_total", host=host, result="hit")
+            # 与 requests-cache 相同，标记没有实际发送请求的响应
+            cached_res.from_cache = True
+            return cached_res
+
+    if cond_headers:
+        headers = {**(headers or {}), **cond_headers}
+
+    def send():
+        # 被限流后 --adaptive 会增大间隔，重试时按新的间隔等待
+        with metrics.timed("rate_limit_wait", host=host):
+            if limiter is not None:
+                controller = get_controller(host, limiter.interval)
+                if controller is not None:
+                    limiter.set_interval(controller.get())
+                limiter.acquire()
+            elif req_itv > 0:
+                sleep(get_interval(host, req_itv))
+        return _get(session, url, headers)
+
+    res = default_retry_policy.call(send, url)
+    if cache is None:
+        return res
+    if res is None or res.status_code in default_retry_policy.status_codes:
+        if cached_res is not None:
+            logger.warning(f"Request to {url} failed, use stale cached response.")
+            metrics.inc("cache_lookups_total", host=host, result="stale")
+            return cached_res
+        metrics.inc("cache_lookups_total", host=host, result="miss")
+        return res
+    if res.status_code == 304 and cached_res is not None:
+        logger.debug(f"Cache revalidated: {url}")
+        metrics.inc("cache_lookups_total", host=host, result="revalidated")
+        cache.refresh(url)
+        return cached_res
+    metrics.inc("cache_lookups_total", host=host, result="miss")
+    cache.store(url, res, content_types)
+    return res
+
+
+async def run_paced(url: str, req_itv: float, func, *args, wait_first: bool = True):
+    """等待请求间隔后在浏览器中执行 func，并根据结果调整该域名的请求间隔（--adaptive）
+
+    func 抛出异常（例如一直停留在人机验证页面，等不到摘要）时视为被限流，按 default_retry_policy
+    重试，每次重试前同样等待请求间隔。
+
+    Args:
+        url (str): 论文URL，用于确定域名
+        req_itv (float): 请求间隔（秒），设置 --adaptive 时为该域名的初始请求间隔
+        func: 协程函数，在浏览器中访问页面并返回摘要
+        wait_first (bool): 第一次尝试前是否等待。刚刚已经按请求间隔向该域名发送过请求时为False
+
+    Returns:
+        重试后仍失败时返回None
+    """
+    host = get_host(url)
+    attempt_count = 0
+
+    async def attempt():
+        nonlocal attempt_count
+        attempt_count += 1
+        if wait_first or attempt_count > 1:
+            await asyncio.sleep(get_interval(host, req_itv))
+        start_time = time.monotonic()
+        try:
+            result = await func(*args)
+        except Exception:
+            report_response(host, None, time.monotonic() - start_time)
+            raise
+        report_response(host, 200, time.monotonic() - start_time)
+        return result
 
-    return wrap
+    return await default_retry_policy.call_async(attempt, url)
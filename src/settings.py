@@ -1,12 +1,174 @@
 # chrome path
 chrome_path = "D:/pycode/Chrome-bin/chrome.exe"
 
-# Interval in seconds to wait for retrying after a failed request
-retry_interval = 15
+# Retry policy of failed requests: the n-th retry waits about retry_base_interval * 2^(n-1) seconds
+# (at most retry_max_interval), randomly shortened by up to retry_jitter of the interval.
+# After that, every retry waits for the host's request interval (-t/-d, --adaptive) like the first request
+retry_max_attempts = 4
+retry_base_interval = 2
+retry_max_interval = 60
+retry_jitter = 0.5
+# Transient HTTP status codes that are retried, waiting for Retry-After if the server sends it
+retry_status_codes = {429, 500, 502, 503, 504}
+# Longest Retry-After (seconds) to follow; a longer wait gives up the request instead
+retry_after_max_interval = 300
+# Status codes and hosts that will never succeed, failed at once without retrying
+permanent_status_codes = {404, 410}
+permanent_failure_hosts = {"doi.ieeecomputersociety.org"}
+
+# --adaptive: the request interval of every host starts at --interval/--dblp-interval,
+# shrinks by adaptive_decrease_step seconds after a healthy response (not below --min-interval,
+# which defaults to the initial interval, so by default it only ever backs off and recovers),
+# and is multiplied by adaptive_backoff_factor when throttled or slow (up to adaptive_max_factor times the initial interval)
+adaptive_decrease_step = 0.5
+adaptive_backoff_factor = 2
+adaptive_max_factor = 8
+# Status codes regarded as throttling
+adaptive_throttle_status_codes = {403, 429, 503}
+# A response is slow when the moving average latency exceeds this multiple of its lowest value
+adaptive_latency_factor = 3
+
+# Persistent HTTP response cache (SQLite), set to None to disable
+http_cache_path = "./http_cache.sqlite"
+# Max total size of compressed response bodies in the cache
+http_cache_max_bytes = 1024 * 1024 * 1024
+# Time to live (seconds) of cached responses per host, "default" for the other hosts
+http_cache_ttl = {
+    "default": 30 * 24 * 3600,
+    # table of contents may grow (e.g. online-first papers)
+    "dblp.uni-trier.de": 24 * 3600,
+    "dblp.org": 24 * 3600,
+}
+# Content types the cache keeps for each kind of request. A 200 response with another
+# type (e.g. a captive portal page in place of JSON) is returned but not cached
+html_content_types = ("text/html", "application/xhtml+xml")
+json_content_types = ("application/json",)
+bibtex_content_types = ("application/x-bibtex", "text/x-bibtex", "text/plain")
+
+# Connection pools of the shared HTTP client: number of hosts kept alive,
+# and max keep-alive connections per host ("default" for the other hosts)
+http_pool_hosts = 16
+http_pool_maxsize = {
+    "default": 4,
+    # concurrent bibtex requests with --dblp-workers
+    "dblp.org": 8,
+    "dblp.uni-trier.de": 8,
+}
+
+# With --parse-workers, TOC pages are split into chunks of this many papers parsed in parallel
+parse_toc_chunk_entries = 200
+# With --parse-workers, max number of papers waiting to be parsed and written to the bibtex file
+parse_queue_size = 32
+
+# Call fsync on the exported bibtex file after every N entries are appended
+bib_fsync_interval = 10
+
+# Max number of tabs opened at the same time for one publisher domain (--tabs)
+tab_domain_limits = {
+    "default": 4,
+    "www.sciencedirect.com": 2,
+    "journals.sagepub.com": 2,
+}
+
+# Requests blocked in browser tabs when --block-resources is set.
+# Rules under "default" apply to every publisher, rules under a publisher name are added for it.
+# Resource types of CDP Network.ResourceType, e.g. Image, Media, Font, Stylesheet, Script
+block_resource_types = {
+    "default": ["Image", "Media", "Font"],
+}
+# URL wildcard patterns ("*" matches anything), blocked for any resource type
+block_url_patterns = {
+    "default": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*facebook.net*",
+        "*hotjar.com*",
+        "*scorecardresearch.com*",
+        "*adobedtm.com*",
+        "*newrelic.com*",
+    ],
+}
+# URL wildcard patterns never blocked, e.g. human verification
+allow_url_patterns = {
+    "default": [
+        "*challenges.cloudflare.com*",
+        "*captcha*",
+    ],
+}
+
+# Overall time (seconds) to wait for the abstract to appear after opening a paper page
+page_ready_deadline = {
+    "default": 15,
+    "ieee": 15,
+    "acm": 15,
+    "elsevier": 20,
+    "iospress": 20,
+}
+# Interval (seconds) between two checks of the abstract selectors
+page_ready_poll_interval = 0.2
+
+# With --http-first, abstracts found in the static HTML that are shorter than this
+# (in characters) are treated as truncated and fetched with the browser instead
+static_abstract_min_length = 100
+
+# DOI-keyed abstract database shared by all runs (disable with --no-abstract-store or set to None)
+abstract_store_path = "./abstracts.sqlite"
+
+# zlib level (0-9) of pages saved to the --archive page archive
+page_archive_compress_level = 6
+# number of archived pages sent to the parse workers at a time by --reextract
+reextract_batch_size = 200
+
+# upper bounds (seconds) of the latency histogram buckets exported by --metrics-out
+metrics_latency_buckets = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+# prefix of the metric names in the Prometheus textfile
+metrics_prefix = "paperinfo"
+
+# number of papers read from the --store metadata database per query and committed per transaction,
+# and the window size in which abstracts are looked up, scheduled and written
+metadata_store_chunk_size = 500
+
+# Open scholarly metadata APIs queried by --doi-lookup before visiting publisher pages
+openalex_api_url = "https://api.openalex.org/works"
+crossref_api_url = "https://api.crossref.org/works"
+# max number of DOIs in one API request
+doi_lookup_batch_size = 50
+# interval (seconds) between two API requests
+doi_lookup_interval = 1
+# contact email sent with API requests to use the "polite pool" of OpenAlex/Crossref
+doi_lookup_mailto = ""
+
+# publisher -> host of its abstract pages, used to schedule --manifest jobs per host
+publisher_host = {
+    "ieee": "ieeexplore.ieee.org",
+    "acm": "dl.acm.org",
+    "springer": "link.springer.com",
+    "usenix": "www.usenix.org",
+    "ndss": "www.ndss-symposium.org",
+    "elsevier": "www.sciencedirect.com",
+    "iospress": "content.iospress.com",
+}
+
+# DOI prefix -> publisher host, used to find out the real host behind doi.org links
+doi_prefix_host = {
+    "10.1109": "ieeexplore.ieee.org",
+    "10.1145": "dl.acm.org",
+    "10.1016": "www.sciencedirect.com",
+    "10.1007": "link.springer.com",
+    "10.3233": "content.iospress.com",
+    "10.1177": "journals.sagepub.com",
+    "10.14722": "www.ndss-symposium.org",
+}
 
 # DBLP URL
 # dblp_url = "https://dblp.org/db/"
 dblp_url = "https://dblp.uni-trier.de/db/"
+# dblp search API, used to export bibtex of a whole table of contents
+dblp_api_url = "https://dblp.uni-trier.de/search/publ/api"
+# max number of hits per search API request (dblp allows up to 1000)
+dblp_bulk_page_size = 1000
 
 # header for requests
 req_headers = {
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+
+import src.browser_manager as browser_manager
+from src.request_wrap import get_host
+from src.resource_block import ResourceBlocker
+from src.settings import tab_domain_limits
+
+logger = logging.getLogger(__name__)
+
+
+class TabPool:
+    """同一个浏览器中的多个标签页，用于并发收集摘要
+
+    每个任务从池中取出一个空闲标签页，结束后放回。同一域名同时打开的标签页数量
+    受 settings.tab_domain_limits 限制。
+
+    标签页在第一次使用时才打开，浏览器也随之启动（见 browser_manager.get_browser）；
+    所有论文都不需要浏览器时（--http-first）不会启动 Chrome。
+    每个任务结束后标签页回到 about:blank，下一篇论文的页面加载完成前，
+    wait_for_any 不会在上一篇论文的页面中找到摘要的选择器。
+    """
+
+    def __init__(
+        self,
+        size: int,
+        blocker: ResourceBlocker | None = None,
+    ):
+        """
+        Args:
+            size (int): 标签页数量
+            blocker (ResourceBlocker | None): 设置后，在每个标签页上屏蔽不需要的请求
+        """
+        self.size = max(size, 1)
+        self.blocker = blocker
+        self.tab_list = list()
+        self.idle_tabs: asyncio.Queue = asyncio.Queue()
+        self.domain_semaphores: dict[str, asyncio.Semaphore] = dict()
+        self.open_lock = asyncio.Lock()
+        self.opened = False
+
+    async def open(self):
+        browser = await browser_manager.get_browser()
+        for _ in range(self.size):
+            tab = await browser.get("about:blank", new_tab=True)
+            if self.blocker is not None:
+                await self.blocker.install(tab)
+            self.tab_list.append(tab)
+            self.idle_tabs.put_nowait(tab)
+        logger.debug(f"Opened {self.size} tabs.")
+        self.opened = True
+
+    def get_domain_semaphore(self, url: str) -> asyncio.Semaphore:
+        domain = get_host(url)
+        if domain not in self.domain_semaphores:
+            limit = tab_domain_limits.get(domain, tab_domain_limits["default"])
+            self.domain_semaphores[domain] = asyncio.Semaphore(limit)
+        return self.domain_semaphores[domain]
+
+    async def run(self, url: str, func):
+        """在空闲标签页中执行 func(tab)
+
+        Args:
+            url (str): 要访问的URL，用于确定域名的并发上限
+            func (Callable[[nd.Tab], Awaitable]): 使用标签页的协程函数
+
+        Returns:
+            func 的返回值
+        """
+        async with self.open_lock:
+            if not self.opened:
+                await self.open()
+        async with self.get_domain_semaphore(url):
+            tab = await self.idle_tabs.get()
+            try:
+                return await func(tab)
+            finally:
+                try:
+                    await self.clear(tab)
+                finally:
+                    self.idle_tabs.put_nowait(tab)
+
+    async def clear(self, tab):
+        """离开当前论文的页面，避免下一篇论文匹配到旧页面的DOM"""
+        try:
+            await tab.get("about:blank")
+        except Exception as e:
+            logger.debug(f"Cannot clear tab. Exception: {e.__class__.__name__}")
+
+    async def close(self):
+        for tab in self.tab_list:
+            try:
+                await tab.close()
+            except Exception as e:
+                logger.debug(f"Cannot close tab. Exception: {e.__class__.__name__}")
+        self.tab_list.clear()
+        self.opened = False
@@ -0,0 +1,114 @@
+import os
+
+import bibtexparser.entrypoint
+import bibtexparser.model
+import pytest
+
+import src.bib_writer
+from src.bib_update import split_blocks
+from src.bib_writer import (StreamingBibWriter, escape_abstract,
+                            format_dblp_entry, format_entry)
+
+data_dir = os.path.join(os.path.dirname(__file__), "data")
+
+abstract_list = [
+    None,
+    "We present a new attack.",
+    'A "quoted" abstract with {braces}, 50% of $\\epsilon$,\na line break and Zürich.',
+]
+
+
+def load_dblp_export() -> list[str]:
+    with open(os.path.join(data_dir, "dblp_export.bib"), encoding="utf-8") as f:
+        return split_blocks(f.read())[1]
+
+
+def format_with_bibtexparser(bibtex_str: str, abstract: str | None) -> tuple:
+    """之前的做法：每条都经过 bibtexparser 解析再写出"""
+    library = bibtexparser.entrypoint.parse_string(bibtex_str)
+    if abstract is not None:
+        abstract_field = bibtexparser.model.Field("abstract", escape_abstract(abstract))
+        library.entries[0].set_field(abstract_field)
+    return library.entries[0].key, bibtexparser.entrypoint.write_string(library)
+
+
+@pytest.mark.parametrize("abstract", abstract_list)
+@pytest.mark.parametrize("bibtex_str", load_dblp_export())
+def test_format_entry_matches_bibtexparser(bibtex_str, abstract):
+    # dblp导出的条目不经过 bibtexparser
+    assert format_dblp_entry(bibtex_str, abstract) is not None
+    assert format_entry(bibtex_str, abstract) == format_with_bibtexparser(
+        bibtex_str, abstract
+    )
+
+
+def test_format_entry_replaces_abstract():
+    bibtex_str = load_dblp_export()[0]
+    with_abstract = format_entry(bibtex_str, "old")[1]
+    assert format_entry(with_abstract, "new") == format_with_bibtexparser(
+        with_abstract, "new"
+    )
+    assert "old" not in format_entry(with_abstract, "new")[1]
+
+
+def test_dblp_export_fields_are_kept():
+    bibtex_str = load_dblp_export()[2]
+    text = format_entry(bibtex_str, None)[1]
+    assert (
+        'Tobias M{\\"{u}}ller and\n                  J{\\"{o}}rg Schl{\\"u}ter' in text
+    )
+    for field_key in ("timestamp", "biburl", "bibsource"):
+        assert f"\t{field_key} = {{" in text
+
+
+def test_format_entry_falls_back_to_bibtexparser():
+    # 引号包围的值不是dblp格式
+    bibtex_str = '@misc{key,\n  title = "Quoted Title",\n  year = {2024}\n}\n'
+    assert format_dblp_entry(bibtex_str, None) is None
+    assert format_entry(bibtex_str, "abc") == format_with_bibtexparser(
+        bibtex_str, "abc"
+    )
+
+
+def test_duplicate_key_block_is_split_with_its_comment(tmp_path):
+    path = str(tmp_path / "out.bib")
+    bibtex_list = load_dblp_export()
+    writer = StreamingBibWriter(path, 0)
+    writer.write_raw("% my comment")
+    library = bibtexparser.entrypoint.parse_string("% my comment")
+    for bibtex_str in (bibtex_list[0], bibtex_list[1], bibtex_list[0]):
+        key, text = format_entry(bibtex_str, "abc")
+        writer.write_raw(text, key, bibtex_str)
+        entry = bibtexparser.entrypoint.parse_string(bibtex_str).entries[0]
+        entry.set_field(bibtexparser.model.Field("abstract", "abc"))
+        library.add(entry)
+    writer.close()
+
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    # 与 bibtexparser 一次性写入整个 Library 的结果相同
+    assert text == bibtexparser.entrypoint.write_string(library)
+
+    preamble, block_list = split_blocks(text)
+    assert preamble == "% my comment"
+    assert len(block_list) == 3
+    assert "WARNING" not in block_list[1]
+    assert block_list[2] == (
+        "% WARNING Parsing failed for the following 25 lines.\n" + bibtex_list[0]
+    )
+
+
+def test_fsync_only_after_entries(tmp_path, monkeypatch):
+    fsync_list = list()
+    monkeypatch.setattr(src.bib_writer.os, "fsync", fsync_list.append)
+    bibtex_str = load_dblp_export()[0]
+    writer = StreamingBibWriter(str(tmp_path / "out.bib"), 1)
+    writer.write_raw("% my comment")
+    assert len(fsync_list) == 0
+    key, text = format_entry(bibtex_str, None)
+    writer.write_raw(text, key, bibtex_str)
+    assert len(fsync_list) == 1
+    # key 重复的条目写为解析失败的块，也不计数
+    writer.write_raw(text, key, bibtex_str)
+    writer.write_raw("% another comment")
+    assert len(fsync_list) == 1
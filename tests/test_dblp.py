@@ -0,0 +1,48 @@
+import pytest
+
+from src.dblp import parse_toc_page, split_toc_page
+
+
+def make_toc_page(count: int) -> str:
+    item_list = [
+        f'<li class="entry inproceedings" id="conf/x/P{i}" itemscope itemtype="http://schema.org/ScholarlyArticle">'
+        '<nav class="publ"><ul><li class="drop-down"><div class="body"><ul>'
+        f'<li><a rel="nofollow" href="https://dblp.org/rec/conf/x/P{i}.html?view=bibtex">bib</a></li>'
+        "</ul></div></li></ul></nav>"
+        f'<cite class="data tts-content"><span class="title" itemprop="name">Paper {i} Title.</span></cite>'
+        f'<nav><ul><li class="ee"><a href="https://doi.org/10.1/{i}">doi</a></li></ul></nav></li>'
+        for i in range(count)
+    ]
+    return (
+        '<html><body><header class="h2">Session</header><ul class="publ-list">'
+        + "\n".join(item_list)
+        + "</ul></body></html>"
+    )
+
+
+@pytest.mark.parametrize(
+    "count, chunk_entries, chunk_count",
+    [(0, 3, 1), (1, 3, 1), (3, 3, 1), (4, 3, 2), (10, 3, 4), (10, 1, 10)],
+)
+def test_split_toc_page(count, chunk_entries, chunk_count):
+    html = make_toc_page(count)
+    chunk_list = split_toc_page(html, chunk_entries)
+    assert len(chunk_list) == chunk_count
+    assert "".join(chunk_list) == html
+    for chunk in chunk_list[1:]:
+        assert chunk.startswith('<li class="entry ')
+
+
+@pytest.mark.parametrize("chunk_entries", [1, 3, 7, 100])
+def test_split_toc_page_parses_same_entries(chunk_entries):
+    html = make_toc_page(10)
+    paper_entries = [
+        paper_entry
+        for chunk in split_toc_page(html, chunk_entries)
+        for paper_entry in parse_toc_page(chunk, "conf")
+    ]
+    assert paper_entries == parse_toc_page(html, "conf")
+    assert [dblp_key for dblp_key, _, _ in paper_entries] == [
+        f"conf/x/P{i}" for i in range(10)
+    ]
+    assert paper_entries[3][1] == ["Paper 3 Title", "https://doi.org/10.1/3"]
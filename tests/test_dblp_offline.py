@@ -0,0 +1,153 @@
+import os
+
+import bibtexparser.entrypoint
+import pytest
+
+from src.dblp_offline import DblpIndex, build_index
+
+data_dir = os.path.join(os.path.dirname(__file__), "data")
+
+# dblp.xml 中与 data/dblp_export.bib 对应的记录，作者名带有同名作者的编号
+dblp_xml = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE dblp SYSTEM "dblp.dtd">
+<dblp>
+<inproceedings mdate="2019-10-19" key="conf/sp/KocherHFGGHHLM019">
+<author>Paul Kocher</author>
+<author>Jann Horn</author>
+<author>Anders Fogh</author>
+<author>Daniel Genkin</author>
+<author>Daniel Gruss</author>
+<author>Werner Haas</author>
+<author>Mike Hamburg</author>
+<author>Moritz Lipp</author>
+<author>Stefan Mangard</author>
+<author>Thomas Prescher</author>
+<author>Michael Schwarz 0001</author>
+<author>Yuval Yarom</author>
+<title>Spectre Attacks: Exploiting Speculative Execution.</title>
+<pages>1-19</pages>
+<year>2019</year>
+<booktitle>SP</booktitle>
+<ee>https://doi.org/10.1109/SP.2019.00002</ee>
+<crossref>conf/sp/2019</crossref>
+<url>db/conf/sp/sp2019.html#KocherHFGGHHLM019</url>
+</inproceedings>
+<proceedings mdate="2019-10-19" key="conf/sp/2019">
+<title>2019 IEEE Symposium on Security and Privacy, SP 2019, San Francisco, CA, USA, May 19-23, 2019</title>
+<booktitle>SP</booktitle>
+<publisher>IEEE</publisher>
+<year>2019</year>
+<url>db/conf/sp/sp2019.html</url>
+</proceedings>
+<inproceedings mdate="2021-02-01" key="conf/uss/LippSGPHFHMKGYH18">
+<author>Moritz Lipp</author>
+<author>Michael Schwarz 0001</author>
+<author>Daniel Gruss</author>
+<author>Thomas Prescher</author>
+<author>Werner Haas</author>
+<author>Anders Fogh</author>
+<author>Jann Horn</author>
+<author>Stefan Mangard</author>
+<author>Paul Kocher</author>
+<author>Daniel Genkin</author>
+<author>Yuval Yarom</author>
+<author>Mike Hamburg</author>
+<title>Meltdown: Reading Kernel Memory from User Space.</title>
+<pages>973-990</pages>
+<year>2018</year>
+<booktitle>USENIX Security Symposium</booktitle>
+<ee>https://www.usenix.org/conference/usenixsecurity18/presentation/lipp</ee>
+<crossref>conf/uss/2018</crossref>
+<url>db/conf/uss/uss2018.html#LippSGPHFHMKGYH18</url>
+</inproceedings>
+<proceedings mdate="2021-02-01" key="conf/uss/2018">
+<editor>William Enck</editor>
+<editor>Adrienne Porter Felt</editor>
+<title>27th USENIX Security Symposium, USENIX Security 2018, Baltimore, MD, USA, August 15-17, 2018</title>
+<publisher>USENIX Association</publisher>
+<year>2018</year>
+<url>db/conf/uss/uss2018.html</url>
+</proceedings>
+<article mdate="2024-03-12" key="journals/tifs/MullerSH24">
+<author>Tobias M&uuml;ller 0001</author>
+<author>J&ouml;rg Schl&uuml;ter</author>
+<author>Ren&eacute; Rie&szlig;</author>
+<title>A DNN Study of TLS &amp; QUIC on IoT Devices in Z&uuml;rich.</title>
+<pages>1201-1214</pages>
+<year>2024</year>
+<volume>19</volume>
+<journal>IEEE Trans. Inf. Forensics Secur.</journal>
+<number>4</number>
+<ee>https://doi.org/10.1109/TIFS.2024.0000001</ee>
+<url>db/journals/tifs/tifs19.html#MullerSH24</url>
+</article>
+</dblp>
+"""
+
+
+@pytest.fixture(scope="module")
+def dblp_index(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("dblp")
+    dump_path = str(tmp_path / "dblp.xml")
+    with open(dump_path, "w", encoding="utf-8") as f:
+        f.write(dblp_xml)
+    index_path = str(tmp_path / "dblp.sqlite")
+    build_index(dump_path, index_path)
+    dblp_index = DblpIndex(index_path)
+    yield dblp_index
+    dblp_index.close()
+
+
+def get_field_list(bibtex_str: str) -> tuple[str, list[tuple[str, str]]]:
+    """(bibtex key, [(字段名, 值)])，值中的换行和缩进合并为一个空格"""
+    library = bibtexparser.entrypoint.parse_string(bibtex_str)
+    assert len(library.entries) == 1
+    entry = library.entries[0]
+    return entry.key, [
+        (field.key, " ".join(field.value.split())) for field in entry.fields
+    ]
+
+
+def load_expected() -> dict[str, list[tuple[str, str]]]:
+    with open(os.path.join(data_dir, "dblp_export.bib"), encoding="utf-8") as f:
+        library = bibtexparser.entrypoint.parse_string(f.read())
+    return dict(
+        get_field_list(bibtexparser.entrypoint.write_string(bibtexparser.Library([e])))
+        for e in library.entries
+    )
+
+
+@pytest.mark.parametrize(
+    "url, type",
+    [
+        ("https://dblp.org/db/conf/sp/sp2019.html", "conf"),
+        ("https://dblp.org/db/conf/uss/uss2018.html", "conf"),
+        ("https://dblp.org/db/journals/tifs/tifs19.html", "journal"),
+    ],
+)
+def test_offline_bibtex_matches_dblp_export(dblp_index, url, type):
+    entry_metadata_list = dblp_index.get_toc_content(url, type)
+    assert len(entry_metadata_list) == 1
+    key, field_list = get_field_list(entry_metadata_list[0][2])
+    expected_list = load_expected()[key]
+
+    # 字段的顺序与dblp相同
+    assert [name for name, _ in field_list] == [name for name, _ in expected_list]
+    for (name, value), (_, expected) in zip(field_list, expected_list):
+        if name == "timestamp":
+            # XML中只有修改日期，没有时间
+            assert (
+                value[: len("Sat, 19 Oct 2019")] == expected[: len("Sat, 19 Oct 2019")]
+            )
+            continue
+        # 测试数据中有一处用了简写的 {\"u}，用于测试 format_entry
+        expected = expected.replace('{\\"u}', '{\\"{u}}')
+        assert value == expected, name
+
+
+def test_offline_toc_entry(dblp_index):
+    paper_title, paper_url, _ = dblp_index.get_toc_content(
+        "https://dblp.org/db/conf/sp/sp2019.html", "conf"
+    )[0]
+    assert paper_title == "Spectre Attacks: Exploiting Speculative Execution"
+    assert paper_url == "https://doi.org/10.1109/SP.2019.00002"
@@ -0,0 +1,129 @@
+import http.server
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.doi_lookup import lookup_abstracts
+
+openalex_abstract = (
+    "Speculative execution leaks secrets through the cache of modern processors, "
+    "across process boundaries and through sandboxes."
+)
+crossref_abstract = (
+    "Meltdown breaks the most fundamental isolation between user applications "
+    "and the operating system kernel memory."
+)
+
+
+def make_inverted_index(text: str) -> dict[str, list[int]]:
+    inverted_index = dict()
+    for position, word in enumerate(text.split()):
+        inverted_index.setdefault(word, []).append(position)
+    return inverted_index
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """模拟 OpenAlex 和 Crossref 的 works API，记录每个请求查询的DOI"""
+
+    # OpenAlex 返回HTML而不是JSON（例如代理的登录页面）
+    openalex_html = False
+    query_list: list[tuple[str, list[str]]] = list()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        parsed_url = urlparse(self.path)
+        filter_str = parse_qs(parsed_url.query)["filter"][0]
+        if parsed_url.path == "/openalex":
+            doi_list = filter_str.removeprefix("doi:").split("|")
+            StubHandler.query_list.append(("openalex", doi_list))
+            if StubHandler.openalex_html:
+                self.send_body("<html><body>Sign in</body></html>", "text/html")
+                return
+            result_list = [
+                {
+                    "doi": f"https://doi.org/{doi.upper()}",
+                    "abstract_inverted_index": make_inverted_index(openalex_abstract),
+                }
+                for doi in doi_list
+                if doi.endswith("a")
+            ]
+            self.send_body(json.dumps({"results": result_list}), "application/json")
+        else:
+            doi_list = [doi.removeprefix("doi:") for doi in filter_str.split(",")]
+            StubHandler.query_list.append(("crossref", doi_list))
+            item_list = [
+                {
+                    "DOI": doi,
+                    "abstract": f"<jats:title>Abstract</jats:title><jats:p>{crossref_abstract}</jats:p>",
+                }
+                for doi in doi_list
+            ]
+            self.send_body(
+                json.dumps({"message": {"items": item_list}}), "application/json"
+            )
+
+    def send_body(self, body: str, content_type: str):
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.openalex_html = False
+    StubHandler.query_list = list()
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def lookup(entry_metadata_list: list, stub_url: str) -> dict:
+    return lookup_abstracts(
+        entry_metadata_list, f"{stub_url}/openalex", f"{stub_url}/crossref", 0
+    )
+
+
+entry_metadata_list = [
+    ["Spectre", "https://doi.org/10.1109/SP.2019.a", ""],
+    ["Meltdown", "https://doi.org/10.1109/SP.2019.b", ""],
+    ["Not a DOI", "https://www.usenix.org/conference/x/presentation/y", ""],
+]
+
+
+def test_lookup_abstracts(stub_url):
+    result_dict = lookup(entry_metadata_list, stub_url)
+    assert result_dict == {
+        "https://doi.org/10.1109/SP.2019.a": (openalex_abstract, "openalex"),
+        "https://doi.org/10.1109/SP.2019.b": (crossref_abstract, "crossref"),
+    }
+    # 只有 OpenAlex 没有摘要的DOI才查询 Crossref
+    assert StubHandler.query_list == [
+        ("openalex", ["10.1109/sp.2019.a", "10.1109/sp.2019.b"]),
+        ("crossref", ["10.1109/sp.2019.b"]),
+    ]
+
+
+def test_lookup_abstracts_skips_crossref(stub_url):
+    result_dict = lookup(entry_metadata_list[:1], stub_url)
+    assert result_dict == {
+        "https://doi.org/10.1109/SP.2019.a": (openalex_abstract, "openalex")
+    }
+    assert [source for source, _ in StubHandler.query_list] == ["openalex"]
+
+
+def test_lookup_abstracts_invalid_json(stub_url):
+    StubHandler.openalex_html = True
+    result_dict = lookup(entry_metadata_list, stub_url)
+    assert result_dict == {
+        "https://doi.org/10.1109/SP.2019.a": (crossref_abstract, "crossref"),
+        "https://doi.org/10.1109/SP.2019.b": (crossref_abstract, "crossref"),
+    }
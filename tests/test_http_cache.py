@@ -0,0 +1,86 @@
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import src.http_cache as http_cache
+from src.get_abstract_base import get_abstract_base
+from src.http_cache import HttpCache
+from src.settings import html_content_types, json_content_types
+
+
+def make_response(url: str, body: str, content_type: str | None) -> requests.Response:
+    res = requests.Response()
+    res.status_code = 200
+    res.url = url
+    res.encoding = "utf-8"
+    res.headers = CaseInsensitiveDict()
+    if content_type is not None:
+        res.headers["Content-Type"] = content_type
+    res._content = body.encode()
+    return res
+
+
+class StubSession:
+    """按URL返回固定响应的会话，记录请求次数"""
+
+    def __init__(self, res: requests.Response):
+        self.res = res
+        self.request_count = 0
+
+    def get(self, url, headers=None):
+        self.request_count += 1
+        return self.res
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = HttpCache(str(tmp_path / "cache.sqlite"), 1024 * 1024, {"default": 3600})
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    monkeypatch.setattr(http_cache, "_cache_enabled", True)
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize(
+    "content_type, content_types, stored",
+    [
+        ("text/html; charset=utf-8", html_content_types, True),
+        ("TEXT/HTML", html_content_types, True),
+        ("application/json", html_content_types, False),
+        (None, html_content_types, False),
+        ("text/html", json_content_types, False),
+        ("application/json; charset=utf-8", json_content_types, True),
+        ("text/html", None, True),
+    ],
+)
+def test_store_checks_content_type(cache, content_type, content_types, stored):
+    url = "https://example.org/paper"
+    cache.store(url, make_response(url, "body", content_type), content_types)
+    res, fresh, _ = cache.lookup(url)
+    assert (res is not None) == stored
+    if stored:
+        assert fresh and res.text == "body"
+
+
+def test_invalidate(cache):
+    url = "https://example.org/paper"
+    cache.store(url, make_response(url, "body", "text/html"), html_content_types)
+    assert cache.total_size > 0
+    cache.invalidate(url)
+    assert cache.lookup(url)[0] is None
+    assert cache.total_size == 0
+    cache.invalidate(url)
+    assert cache.total_size == 0
+
+
+def test_get_abstract_base_drops_rejected_page(cache):
+    url = "https://example.org/paper"
+    session = StubSession(make_response(url, "<html>Access denied</html>", "text/html"))
+    assert get_abstract_base(session, url, 0, lambda html: None) is None
+    assert cache.lookup(url)[0] is None
+
+    session.res = make_response(url, "<html>Abstract</html>", "text/html")
+    assert get_abstract_base(session, url, 0, lambda html: "abstract") == "abstract"
+    # 提取成功的页面保留在缓存中，之后不再请求
+    assert get_abstract_base(session, url, 0, lambda html: "abstract") == "abstract"
+    assert session.request_count == 2
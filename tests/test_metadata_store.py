@@ -0,0 +1,76 @@
+import pytest
+
+from src.main import iter_windows
+from src.metadata_store import MetadataStore, get_dblp_key
+
+
+def make_entry_list(count: int) -> list[list]:
+    return [
+        [
+            f"Paper {i} Title",
+            f"https://doi.org/10.1/{i}",
+            f"@inproceedings{{DBLP:conf/x/P{i},\n  title        = {{Paper {i} Title}}\n}}\n",
+        ]
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetadataStore(str(tmp_path / "metadata.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize("count", [0, 1, 4, 5, 13])
+def test_add_all_iter_entries(store, count):
+    entry_list = make_entry_list(count)
+    store.add_all("x", "2023", entry_list)
+    # 另一卷的论文不影响结果
+    store.add_all("x", "2024", make_entry_list(3))
+    assert store.count("x", "2023") == count
+    assert list(store.iter_entries("x", "2023", chunk_size=4)) == entry_list
+
+
+def test_add_all_replaces_part(store):
+    store.add_all("x", "2023", make_entry_list(10))
+    store.add_all("x", "2023", make_entry_list(3))
+    assert list(store.iter_entries("x", "2023")) == make_entry_list(3)
+
+
+def test_add_commit(store):
+    entry_list = make_entry_list(5)
+    for pos, entry_metadata in enumerate(entry_list):
+        store.add("x", "2023", pos, entry_metadata)
+    store.commit()
+    assert store.pending_count == 0
+    assert list(store.iter_entries("x", "2023", chunk_size=2)) == entry_list
+
+
+def test_paper_sequence(store):
+    entry_list = make_entry_list(13)
+    store.add_all("x", "2023", entry_list)
+    paper_sequence = store.get_papers("x", "2023")
+    assert len(paper_sequence) == 13
+    assert paper_sequence[0] == entry_list[0]
+    assert paper_sequence[-1] == entry_list[-1]
+    assert paper_sequence[3:7] == entry_list[3:7]
+    assert paper_sequence[::5] == entry_list[::5]
+    assert paper_sequence[10:20] == entry_list[10:20]
+    with pytest.raises(IndexError):
+        paper_sequence[13]
+    assert list(paper_sequence) == entry_list
+
+
+def test_paper_sequence_windows(store):
+    entry_list = make_entry_list(13)
+    store.add_all("x", "2023", entry_list)
+    window_list = list(iter_windows(store.get_papers("x", "2023"), 4))
+    assert [len(window) for window in window_list] == [4, 4, 4, 1]
+    assert [entry for window in window_list for entry in window] == entry_list
+
+
+def test_get_dblp_key():
+    assert get_dblp_key(make_entry_list(1)[0][2]) == "conf/x/P0"
+    assert get_dblp_key("@misc{key,\n}") is None
+    assert get_dblp_key(None) is None
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from src.request_wrap import parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [("120", 120.0), (" 5 ", 5.0), ("0", 0.0)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(CaseInsensitiveDict({"Retry-After": value})) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_time = datetime.now(timezone.utc) + timedelta(seconds=60)
+    headers = CaseInsensitiveDict({"retry-after": format_datetime(retry_time, True)})
+    assert 55 <= parse_retry_after(headers) <= 60
+
+
+def test_parse_retry_after_past_date():
+    headers = CaseInsensitiveDict({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert parse_retry_after(headers) == 0
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        None,
+        CaseInsensitiveDict(),
+        CaseInsensitiveDict({"Retry-After": "soon"}),
+        CaseInsensitiveDict({"Retry-After": "-1"}),
+        CaseInsensitiveDict({"Retry-After": "1.5"}),
+        CaseInsensitiveDict({"Retry-After": ""}),
+    ],
+)
+def test_parse_retry_after_invalid(headers):
+    assert parse_retry_after(headers) is None